@@ -0,0 +1,121 @@
+"""
+原生 GFM 渲染回归对比 - 检查 html_to_gfm 与 pandoc (-f html -t gfm --wrap=none) 的输出是否一致
+两者的 GFM 再分别由 pandoc 读回并写为 HTML 后比较，因此表格对齐空格、列表标记后的空格等
+不影响显示的格式差异不算不一致，而 img! 后接链接被读成图片这类差异会被发现。
+内置一组容易渲染出错的 HTML 片段（! 紧接链接或方括号、强调、转义字符、表格等），也可以在
+命令行追加 HTML 文件。原生渲染不支持的输入记为跳过；任一输入不一致时以退出码 1 结束，
+pandoc 不可用时跳过。
+"""
+
+import difflib
+import json
+import sys
+from pathlib import Path
+
+# 添加 scripts 目录到路径
+benchmarks_dir = Path(__file__).parent
+sys.path.insert(0, str(benchmarks_dir.parent / 'scripts'))
+
+from html_to_gfm import html_to_gfm, UnsupportedHtmlError
+
+
+CASES = {
+    'bang_before_link': '<p>img!<a href="https://example.com/u">x</a></p>',
+    'bang_before_bracket': '<p>a![b] and wow! [x] !done</p>',
+    'bang_before_span_bracket': '<p>a!<span>[b]</span></p>',
+    'escaped_bang_before_link': '<p>a\\!<a href="u">x</a></p>',
+    'bang_before_code': '<p>a!<code>[b]</code></p>',
+    'bang_across_paragraphs': '<p>end!</p><p>[start]</p>',
+    'bang_before_emphasis': '<p>a!<em>[b]</em></p>',
+    'bang_in_table': '<table><tr><th>h</th></tr><tr><td>x!<a href="u">y</a></td></tr></table>',
+    'special_chars': '<p>a_b _c_ *d* `e` &lt;f&gt; g|h ~~i~~ &amp; &lt;br&gt;</p>',
+    'emphasis_and_link': '<p><strong>bold</strong> <em>it</em> <a href="https://e.x/(p)">l</a></p>',
+    'list_and_heading': '<h2>Title</h2><ul><li>one</li><li>two<ol><li>a</li></ol></li></ul>',
+}
+
+
+def compare_html(name, html_content):
+    """
+    分别用 html_to_gfm 和 pandoc 渲染同一段 HTML 并比较输出
+
+    Args:
+        name (str): 输入名称
+        html_content (str): HTML 内容
+
+    Returns:
+        dict: {'name', 'supported', 'match', 'diff'}；不支持时 match 为 None
+    """
+    import pypandoc
+
+    try:
+        actual = html_to_gfm(html_content)
+    except UnsupportedHtmlError:
+        return {'name': name, 'supported': False, 'match': None, 'diff': []}
+
+    expected = pypandoc.convert_text(html_content, 'gfm', format='html', extra_args=['--wrap=none'])
+    # 比较读回后的 HTML；pypandoc 在 Windows 上可能返回 \r\n，按行比较
+    expected_html = pypandoc.convert_text(expected, 'html', format='gfm').splitlines()
+    actual_html = pypandoc.convert_text(actual, 'html', format='gfm').splitlines()
+    diff = list(difflib.unified_diff(expected_html, actual_html, 'pandoc', 'html_to_gfm', lineterm='', n=1))
+    return {'name': name, 'supported': True, 'match': not diff, 'diff': diff[:40]}
+
+
+def main():
+    """命令行入口"""
+    args = sys.argv[1:]
+    if args and args[0] in ('-h', '--help'):
+        print("用法:")
+        print("  python compare_html_to_gfm.py [input.html ...] [--output FILE]")
+        sys.exit(0)
+
+    inputs = dict(CASES)
+    output_file = None
+
+    i = 0
+    while i < len(args):
+        if args[i] == '--output' and i + 1 < len(args):
+            output_file = args[i + 1]
+            i += 2
+        else:
+            inputs[args[i]] = Path(args[i]).read_text(encoding='utf-8')
+            i += 1
+
+    try:
+        import pypandoc
+        pypandoc.get_pandoc_version()
+    except (ImportError, OSError):
+        print("[WARNING] pandoc 不可用，跳过对比")
+        return
+
+    results = []
+    for name, html_content in inputs.items():
+        result = compare_html(name, html_content)
+        results.append(result)
+        if not result['supported']:
+            print(f"[INFO] {name}: 原生渲染不支持，跳过")
+        else:
+            print(f"{'[OK]' if result['match'] else '[ERROR]'} {name}"
+                  f"{'' if result['match'] else ': 输出不一致'}")
+
+    report = {
+        'pandoc_version': pypandoc.get_pandoc_version(),
+        'inputs': results,
+        'mismatches': sum(1 for r in results if r['match'] is False),
+        'skipped': sum(1 for r in results if not r['supported']),
+    }
+
+    if output_file:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"[OK] 结果已写入: {output_file}")
+
+    if report['mismatches']:
+        for result in results:
+            if result['match'] is False:
+                print(f"\n[ERROR] {result['name']} 输出不一致:")
+                print('\n'.join(result['diff']))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+"""
+表格过滤器回归对比 - 检查单次转换 + table_filter.lua 与两步转换法的输出是否一致
+对语料中的每个 DOCX 分别用 convert_with_html_intermediate() 和
+convert_to_markdown(..., table_filter=True) 转换为 GFM，逐个比较输出并统计两者的耗时。
+每个文档同时报告 pandoc 会写出 width: 0% 的列数，没有零宽度列的语料无法检验过滤器。
+任一文档输出不一致时以退出码 1 结束，pandoc 不可用时跳过。
+"""
+
+import difflib
+import json
+import os
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+
+# 添加 scripts 目录到路径
+benchmarks_dir = Path(__file__).parent
+sys.path.insert(0, str(benchmarks_dir.parent / 'scripts'))
+sys.path.insert(0, str(benchmarks_dir))
+
+from generate_corpus import generate_corpus
+from docx_analyzer import scan_docx_tables
+
+
+def _timed(func, repeat):
+    """运行 repeat 次，返回最短耗时（秒）"""
+    durations = []
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+def compare_document(docx_file, work_dir, format_type='gfm', repeat=3):
+    """
+    分别用两步转换法和表格过滤器转换同一文档并比较输出
+
+    Args:
+        docx_file (str): DOCX 文件路径
+        work_dir (str): 输出目录
+        format_type (str): 输出格式
+        repeat (int): 计时重复次数
+
+    Returns:
+        dict: {'document', 'zero_width_cols', 'match', 'two_step_seconds', 'table_filter_seconds', 'speedup',
+            'diff'}
+    """
+    from convert_to_markdown import convert_to_markdown, convert_with_html_intermediate
+
+    name = Path(docx_file).stem
+    two_step_output = Path(work_dir) / f"{name}.two_step.md"
+    filter_output = Path(work_dir) / f"{name}.table_filter.md"
+
+    two_step_seconds = _timed(lambda: convert_with_html_intermediate(
+        docx_file, str(two_step_output), format_type=format_type), repeat)
+    filter_seconds = _timed(lambda: convert_to_markdown(
+        docx_file, str(filter_output), format_type=format_type, table_filter=True), repeat)
+
+    expected = two_step_output.read_text(encoding='utf-8').splitlines()
+    actual = filter_output.read_text(encoding='utf-8').splitlines()
+    diff = list(difflib.unified_diff(expected, actual, 'two_step', 'table_filter', lineterm='', n=1))
+
+    return {
+        'document': name,
+        'zero_width_cols': scan_docx_tables(docx_file)['zero_width_cols'],
+        'match': not diff,
+        'two_step_seconds': two_step_seconds,
+        'table_filter_seconds': filter_seconds,
+        'speedup': two_step_seconds / filter_seconds if filter_seconds else None,
+        # 只保留前 40 行差异，便于在报告中查看
+        'diff': diff[:40],
+    }
+
+
+def compare_corpus(corpus_dir, format_type='gfm', repeat=3):
+    """
+    对比语料目录中的全部 DOCX
+
+    Returns:
+        dict: {'pandoc_version', 'format', 'documents': 各文档结果, 'mismatches': 不一致的文档数,
+            'zero_width_cols': 零宽度列总数, 'two_step_seconds': 两步法总耗时,
+            'table_filter_seconds': 过滤器总耗时}
+    """
+    import pypandoc
+
+    corpus_path = Path(corpus_dir)
+    with open(corpus_path / 'manifest.json', 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix='pypandoc-filter-') as work_dir:
+        for document in manifest['documents']:
+            result = compare_document(str(corpus_path / document['docx']), work_dir, format_type, repeat)
+            results.append(result)
+            status = '[OK]' if result['match'] else '[ERROR]'
+            print(f"{status} {result['document']} (零宽度列 {result['zero_width_cols']}): "
+                  f"两步法 {result['two_step_seconds'] * 1000:.1f} ms，"
+                  f"过滤器 {result['table_filter_seconds'] * 1000:.1f} ms"
+                  f"{'' if result['match'] else '，输出不一致'}")
+
+    return {
+        'pandoc_version': pypandoc.get_pandoc_version(),
+        'format': format_type,
+        'documents': results,
+        'mismatches': sum(1 for r in results if not r['match']),
+        'zero_width_cols': sum(r['zero_width_cols'] for r in results),
+        'two_step_seconds': sum(r['two_step_seconds'] for r in results),
+        'table_filter_seconds': sum(r['table_filter_seconds'] for r in results),
+    }
+
+
+def main():
+    """命令行入口"""
+    args = sys.argv[1:]
+    if args and args[0] in ('-h', '--help'):
+        print("用法:")
+        print("  python compare_table_filter.py [--corpus DIR] [--scale small|medium|large] [--seed N]")
+        print("                                 [--format gfm] [--repeat N] [--output FILE]")
+        sys.exit(0)
+
+    corpus_dir = None
+    scale = 'small'
+    seed = 0
+    format_type = 'gfm'
+    repeat = 3
+    output_file = None
+
+    i = 0
+    while i < len(args):
+        if args[i] == '--corpus' and i + 1 < len(args):
+            corpus_dir = args[i + 1]
+            i += 2
+        elif args[i] == '--scale' and i + 1 < len(args):
+            scale = args[i + 1]
+            i += 2
+        elif args[i] == '--seed' and i + 1 < len(args):
+            seed = int(args[i + 1])
+            i += 2
+        elif args[i] == '--format' and i + 1 < len(args):
+            format_type = args[i + 1]
+            i += 2
+        elif args[i] == '--repeat' and i + 1 < len(args):
+            repeat = max(1, int(args[i + 1]))
+            i += 2
+        elif args[i] == '--output' and i + 1 < len(args):
+            output_file = args[i + 1]
+            i += 2
+        else:
+            i += 1
+
+    try:
+        import pypandoc
+        pypandoc.get_pandoc_version()
+    except (ImportError, OSError):
+        print("[WARNING] pandoc 不可用，跳过对比")
+        return
+
+    with tempfile.TemporaryDirectory(prefix='pypandoc-corpus-') as temp_corpus:
+        if corpus_dir is None:
+            print(f"[INFO] 生成 {scale} 规模语料...")
+            generate_corpus(temp_corpus, scale, seed)
+            corpus_dir = temp_corpus
+        report = compare_corpus(corpus_dir, format_type, repeat)
+
+    if not report['zero_width_cols']:
+        print("[WARNING] 语料中没有零宽度列，对比结果不能说明过滤器与两步转换法一致")
+
+    if report['table_filter_seconds']:
+        print(f"\n[INFO] 总耗时: 两步法 {report['two_step_seconds']:.2f} s，过滤器 {report['table_filter_seconds']:.2f} s "
+              f"({report['two_step_seconds'] / report['table_filter_seconds']:.2f}x)")
+
+    if output_file:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"[OK] 结果已写入: {output_file}")
+
+    if report['mismatches']:
+        for result in report['documents']:
+            if not result['match']:
+                print(f"\n[ERROR] {result['document']} 输出不一致:")
+                print('\n'.join(result['diff']))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
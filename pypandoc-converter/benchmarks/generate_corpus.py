@@ -0,0 +1,354 @@
+"""
+合成基准测试语料生成器
+按规模生成 DOCX 和 HTML 测试文档，覆盖文档长度、表格数量、行列数、
+colspan/rowspan 密度以及零宽度列等维度，供 run_benchmarks.py 使用。
+生成结果由随机种子决定，相同参数总是得到相同的文件。
+"""
+
+import json
+import random
+import sys
+import zipfile
+from html import escape
+from pathlib import Path
+from xml.sax.saxutils import escape as xml_escape
+
+
+# 各规模下的文档配置
+# paragraphs: 正文段落数; tables: 表格数; rows/cols: 每个表格的行列数;
+# colspan/rowspan: 单元格发生横向/纵向合并的概率; zero_width: 每个表格的零宽度列数
+SCALES = {
+    'small': [
+        {'name': 'text_only', 'paragraphs': 50, 'tables': 0, 'rows': 0, 'cols': 0,
+         'colspan': 0.0, 'rowspan': 0.0, 'zero_width': 0},
+        {'name': 'simple_tables', 'paragraphs': 20, 'tables': 3, 'rows': 5, 'cols': 4,
+         'colspan': 0.0, 'rowspan': 0.0, 'zero_width': 0},
+        {'name': 'merged_cells', 'paragraphs': 20, 'tables': 3, 'rows': 8, 'cols': 5,
+         'colspan': 0.15, 'rowspan': 0.1, 'zero_width': 1},
+    ],
+    'medium': [
+        {'name': 'long_text', 'paragraphs': 2000, 'tables': 0, 'rows': 0, 'cols': 0,
+         'colspan': 0.0, 'rowspan': 0.0, 'zero_width': 0},
+        {'name': 'many_tables', 'paragraphs': 200, 'tables': 50, 'rows': 10, 'cols': 6,
+         'colspan': 0.0, 'rowspan': 0.0, 'zero_width': 0},
+        {'name': 'wide_tables', 'paragraphs': 50, 'tables': 10, 'rows': 20, 'cols': 20,
+         'colspan': 0.05, 'rowspan': 0.05, 'zero_width': 2},
+        {'name': 'dense_merges', 'paragraphs': 100, 'tables': 20, 'rows': 15, 'cols': 8,
+         'colspan': 0.3, 'rowspan': 0.2, 'zero_width': 1},
+    ],
+    'large': [
+        {'name': 'huge_text', 'paragraphs': 20000, 'tables': 0, 'rows': 0, 'cols': 0,
+         'colspan': 0.0, 'rowspan': 0.0, 'zero_width': 0},
+        {'name': 'report', 'paragraphs': 2000, 'tables': 300, 'rows': 15, 'cols': 8,
+         'colspan': 0.1, 'rowspan': 0.05, 'zero_width': 1},
+        {'name': 'long_tables', 'paragraphs': 100, 'tables': 20, 'rows': 500, 'cols': 10,
+         'colspan': 0.02, 'rowspan': 0.02, 'zero_width': 0},
+        {'name': 'dense_merges', 'paragraphs': 500, 'tables': 200, 'rows': 20, 'cols': 12,
+         'colspan': 0.3, 'rowspan': 0.2, 'zero_width': 2},
+    ],
+}
+
+# DOCX 中零宽度列的宽度（twip）。pandoc 将列宽换算为占表格总宽的百分比并截断取整，
+# 不足 1% 的列才写出 width: 0%；w:w="0" 会被当作未指定宽度，写出不带宽度的 <col />
+ZERO_WIDTH_TWIPS = 50
+
+_WORDS = ('表格', '数据', '转换', '文档', '结构', '分析', 'pandoc', 'markdown',
+          'report', 'value', 'total', '2024', '合计', '说明', 'column', 'row')
+
+
+def _sentence(rng, words=12):
+    return ' '.join(rng.choice(_WORDS) for _ in range(words))
+
+
+def _table_layout(rng, profile):
+    """
+    生成表格布局
+
+    Returns:
+        list: 每行为 [(文本, colspan, rowspan), ...]，被上方单元格纵向合并占用的位置为 None
+    """
+    rows, cols = profile['rows'], profile['cols']
+    covered = set()
+    layout = []
+    for r in range(rows):
+        row = []
+        c = 0
+        while c < cols:
+            if (r, c) in covered:
+                row.append(None)
+                c += 1
+                continue
+            colspan = 1
+            rowspan = 1
+            if cols - c > 1 and rng.random() < profile['colspan']:
+                colspan = rng.randint(2, min(3, cols - c))
+                # 不与上方延伸下来的单元格重叠
+                while colspan > 1 and any((r, c + k) in covered for k in range(1, colspan)):
+                    colspan -= 1
+            if rows - r > 1 and rng.random() < profile['rowspan']:
+                rowspan = rng.randint(2, min(3, rows - r))
+            for dr in range(1, rowspan):
+                for dc in range(colspan):
+                    covered.add((r + dr, c + dc))
+            row.append((_sentence(rng, 3), colspan, rowspan))
+            c += colspan
+        layout.append(row)
+    return layout
+
+
+def _table_positions(rng, profile):
+    """表格插入在哪些段落之后"""
+    paragraphs = max(profile['paragraphs'], 1)
+    return sorted(rng.randrange(paragraphs) for _ in range(profile['tables']))
+
+
+def build_html(profile, seed=0):
+    """
+    生成与 pandoc 输出风格一致的 HTML 文档
+
+    Args:
+        profile (dict): SCALES 中的文档配置
+        seed (int): 随机种子
+
+    Returns:
+        str: HTML 内容
+    """
+    rng = random.Random(seed)
+    positions = _table_positions(rng, profile)
+    parts = ['<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8" />\n',
+             f'<title>{profile["name"]}</title>\n</head>\n<body>\n']
+
+    next_table = 0
+    for p in range(max(profile['paragraphs'], 1)):
+        parts.append(f'<p>{escape(_sentence(rng))}</p>\n')
+        while next_table < len(positions) and positions[next_table] == p:
+            next_table += 1
+            cols = profile['cols']
+            parts.append('<table>\n<colgroup>\n')
+            for c in range(cols):
+                width = '0%' if c < profile['zero_width'] else f'{100 // cols}%'
+                parts.append(f'<col style="width: {width}" />\n')
+            parts.append('</colgroup>\n<tbody>\n')
+            for row in _table_layout(rng, profile):
+                parts.append('<tr>\n')
+                for cell in row:
+                    if cell is None:
+                        continue
+                    text, colspan, rowspan = cell
+                    attrs = ''
+                    if colspan > 1:
+                        attrs += f' colspan="{colspan}"'
+                    if rowspan > 1:
+                        attrs += f' rowspan="{rowspan}"'
+                    parts.append(f'<td{attrs}>{escape(text)}</td>\n')
+                parts.append('</tr>\n')
+            parts.append('</tbody>\n</table>\n')
+
+    parts.append('</body>\n</html>\n')
+    return ''.join(parts)
+
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+
+
+def _docx_paragraph(text):
+    return f'<w:p><w:r><w:t xml:space="preserve">{xml_escape(text)}</w:t></w:r></w:p>'
+
+
+def build_docx(profile, output_file, seed=0):
+    """
+    生成最小可用的 DOCX 文档（只包含 document.xml 及必需的包关系）
+
+    Args:
+        profile (dict): SCALES 中的文档配置
+        output_file (str): 输出文件路径
+        seed (int): 随机种子
+    """
+    rng = random.Random(seed)
+    positions = _table_positions(rng, profile)
+    parts = ['<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+             '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+             '<w:body>']
+
+    next_table = 0
+    for p in range(max(profile['paragraphs'], 1)):
+        parts.append(_docx_paragraph(_sentence(rng)))
+        while next_table < len(positions) and positions[next_table] == p:
+            next_table += 1
+            cols = profile['cols']
+            parts.append('<w:tbl><w:tblPr><w:tblW w:w="0" w:type="auto"/></w:tblPr><w:tblGrid>')
+            for c in range(cols):
+                width = ZERO_WIDTH_TWIPS if c < profile['zero_width'] else 9000 // cols
+                parts.append(f'<w:gridCol w:w="{width}"/>')
+            parts.append('</w:tblGrid>')
+
+            layout = _table_layout(rng, profile)
+            # DOCX 中被纵向合并覆盖的位置需要写出 vMerge 延续单元格
+            spans = {}
+            for r, row in enumerate(layout):
+                parts.append('<w:tr>')
+                c = 0
+                for cell in row:
+                    if cell is None:
+                        # 合并区域只在最左列写出一个延续单元格
+                        colspan = spans.get((r, c))
+                        if colspan is not None:
+                            grid = f'<w:gridSpan w:val="{colspan}"/>' if colspan > 1 else ''
+                            parts.append(f'<w:tc><w:tcPr>{grid}<w:vMerge/></w:tcPr><w:p/></w:tc>')
+                        c += 1
+                        continue
+                    text, colspan, rowspan = cell
+                    props = ''
+                    if colspan > 1:
+                        props += f'<w:gridSpan w:val="{colspan}"/>'
+                    if rowspan > 1:
+                        props += '<w:vMerge w:val="restart"/>'
+                        for dr in range(1, rowspan):
+                            spans[(r + dr, c)] = colspan
+                    parts.append(f'<w:tc><w:tcPr>{props}</w:tcPr>{_docx_paragraph(text)}</w:tc>')
+                    c += colspan
+                parts.append('</w:tr>')
+            parts.append('</w:tbl>')
+            # 表格之间至少隔一个段落，避免相邻表格被合并
+            parts.append('<w:p/>')
+
+    parts.append('</w:body></w:document>')
+
+    with zipfile.ZipFile(output_file, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        archive.writestr('_rels/.rels', _ROOT_RELS)
+        archive.writestr('word/document.xml', ''.join(parts))
+
+
+def check_zero_width_columns(docx_file, profile):
+    """
+    用 pandoc 将生成的 DOCX 转为 HTML，确认零宽度列写出了 width: 0%
+
+    Args:
+        docx_file (str): build_docx() 生成的文件
+        profile (dict): SCALES 中的文档配置
+
+    Returns:
+        bool: 是否完成检查（pandoc 不可用或文档没有零宽度列时为 False）
+
+    Raises:
+        ValueError: 中间 HTML 中没有 width: 0% 的列
+    """
+    if not profile['tables'] or not profile['zero_width']:
+        return False
+    try:
+        import pypandoc
+        html = pypandoc.convert_file(str(docx_file), 'html')
+    except (ImportError, OSError):
+        return False
+    if 'width: 0%' not in html:
+        raise ValueError(f"{docx_file}: pandoc 生成的 HTML 中没有 width: 0% 的列")
+    return True
+
+
+def generate_corpus(output_dir, scale='small', seed=0):
+    """
+    生成一组基准测试文档和清单文件 manifest.json
+
+    Args:
+        output_dir (str): 输出目录
+        scale (str): 规模，SCALES 中的键
+        seed (int): 随机种子
+
+    Returns:
+        dict: 清单内容 {'scale', 'seed', 'documents': [{'name', 'profile', 'html', 'docx', ...}]}
+    """
+    if scale not in SCALES:
+        raise ValueError(f"未知的规模: {scale}，可选: {', '.join(SCALES)}")
+
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+
+    documents = []
+    for index, profile in enumerate(SCALES[scale]):
+        doc_seed = seed * 1000 + index
+        html_path = output_path / f"{profile['name']}.html"
+        docx_path = output_path / f"{profile['name']}.docx"
+
+        html_path.write_text(build_html(profile, doc_seed), encoding='utf-8')
+        build_docx(profile, docx_path, doc_seed)
+        check_zero_width_columns(docx_path, profile)
+
+        documents.append({
+            'name': profile['name'],
+            'profile': profile,
+            'html': html_path.name,
+            'html_bytes': html_path.stat().st_size,
+            'docx': docx_path.name,
+            'docx_bytes': docx_path.stat().st_size,
+        })
+        print(f"[OK] {profile['name']}: {html_path.name} ({html_path.stat().st_size} 字节), "
+              f"{docx_path.name} ({docx_path.stat().st_size} 字节)")
+
+    manifest = {'scale': scale, 'seed': seed, 'documents': documents}
+    with open(output_path / 'manifest.json', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def main():
+    """命令行入口"""
+    args = sys.argv[1:]
+    if not args or args[0] in ('-h', '--help'):
+        print("用法:")
+        print("  python generate_corpus.py <output_dir> [--scale small|medium|large] [--seed N]")
+        print("")
+        print("示例:")
+        print("  python generate_corpus.py corpus")
+        print("  python generate_corpus.py corpus-large --scale large --seed 42")
+        sys.exit(0 if args else 1)
+
+    output_dir = None
+    scale = 'small'
+    seed = 0
+
+    i = 0
+    while i < len(args):
+        if args[i] == '--scale' and i + 1 < len(args):
+            scale = args[i + 1]
+            i += 2
+        elif args[i] == '--seed' and i + 1 < len(args):
+            seed = int(args[i + 1])
+            i += 2
+        elif output_dir is None and not args[i].startswith('-'):
+            output_dir = args[i]
+            i += 1
+        else:
+            print(f"未知参数: {args[i]}")
+            sys.exit(1)
+
+    if output_dir is None:
+        print("错误: 需要指定输出目录")
+        sys.exit(1)
+
+    try:
+        generate_corpus(output_dir, scale, seed)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,297 @@
+"""
+基准测试 - 在合成语料上测量转换与预处理函数的耗时、吞吐量和峰值内存
+结果写入 JSON 文件，可与上一版本的结果对比以发现性能回退。
+需要 pandoc 的测试（convert_to_markdown、convert_with_html_intermediate、convert_with_table_filter）
+在 pandoc 不可用时自动跳过。
+"""
+
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime
+from pathlib import Path
+
+# 添加 scripts 目录到路径
+benchmarks_dir = Path(__file__).parent
+sys.path.insert(0, str(benchmarks_dir.parent / 'scripts'))
+sys.path.insert(0, str(benchmarks_dir))
+
+from generate_corpus import generate_corpus
+from preprocess_html import preprocess_html_table, validate_table_structure
+
+try:
+    import resource
+except ImportError:
+    # Windows 没有 resource 模块，不统计子进程内存
+    resource = None
+
+
+BENCHMARKS = ('validate_table_structure', 'preprocess_html_table',
+              'convert_to_markdown', 'convert_with_html_intermediate', 'convert_with_table_filter')
+
+PANDOC_BENCHMARKS = ('convert_to_markdown', 'convert_with_html_intermediate', 'convert_with_table_filter')
+
+
+def _pandoc_version():
+    """返回 pandoc 版本号，不可用时返回 None"""
+    try:
+        import pypandoc
+        return pypandoc.get_pandoc_version()
+    except (ImportError, OSError):
+        return None
+
+
+def _child_max_rss_kb():
+    """已结束子进程（pandoc）中的最大常驻内存 (KB)"""
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # macOS 以字节为单位，Linux 以 KB 为单位
+    return max_rss // 1024 if sys.platform == 'darwin' else max_rss
+
+
+def measure(func, repeat=3):
+    """
+    测量函数耗时和峰值内存
+
+    计时与内存统计分开进行，避免 tracemalloc 的开销影响计时结果
+
+    Args:
+        func (callable): 无参数的被测函数
+        repeat (int): 计时重复次数
+
+    Returns:
+        dict: {'seconds_min', 'seconds_mean', 'peak_memory_bytes'}
+    """
+    durations = []
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            durations.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        try:
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return {
+        'seconds_min': min(durations),
+        'seconds_mean': sum(durations) / len(durations),
+        'peak_memory_bytes': peak,
+    }
+
+
+def _benchmark_targets(name, document, corpus_path, work_dir):
+    """
+    返回被测函数及其输入大小
+
+    Returns:
+        tuple: (callable, 输入字节数)
+    """
+    if name in ('validate_table_structure', 'preprocess_html_table'):
+        html_content = (corpus_path / document['html']).read_text(encoding='utf-8')
+        func = validate_table_structure if name == 'validate_table_structure' else preprocess_html_table
+        return (lambda: func(html_content)), document['html_bytes']
+
+    from convert_to_markdown import convert_to_markdown, convert_with_html_intermediate
+
+    input_file = str(corpus_path / document['docx'])
+    output_file = str(Path(work_dir) / f"{document['name']}.{name}.md")
+    if name == 'convert_to_markdown':
+        return (lambda: convert_to_markdown(input_file, output_file, format_type='gfm')), document['docx_bytes']
+    if name == 'convert_with_table_filter':
+        return (lambda: convert_to_markdown(input_file, output_file, format_type='gfm',
+                                            table_filter=True)), document['docx_bytes']
+    return (lambda: convert_with_html_intermediate(input_file, output_file)), document['docx_bytes']
+
+
+def run_benchmarks(corpus_dir, benchmarks=BENCHMARKS, repeat=3):
+    """
+    在语料目录上运行基准测试
+
+    Args:
+        corpus_dir (str): generate_corpus.py 生成的语料目录（包含 manifest.json）
+        benchmarks (tuple): 要运行的测试名称
+        repeat (int): 每项计时重复次数
+
+    Returns:
+        dict: 可直接写入 JSON 的测试报告
+    """
+    corpus_path = Path(corpus_dir)
+    with open(corpus_path / 'manifest.json', 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    pandoc_version = _pandoc_version()
+    results = []
+    skipped = []
+
+    with tempfile.TemporaryDirectory(prefix='pypandoc-bench-') as work_dir:
+        for name in benchmarks:
+            if name in PANDOC_BENCHMARKS and pandoc_version is None:
+                skipped.append({'benchmark': name, 'reason': 'pandoc 不可用'})
+                print(f"[WARNING] 跳过 {name}: pandoc 不可用")
+                continue
+
+            for document in manifest['documents']:
+                func, input_bytes = _benchmark_targets(name, document, corpus_path, work_dir)
+                try:
+                    timing = measure(func, repeat)
+                except Exception as e:
+                    skipped.append({'benchmark': name, 'document': document['name'], 'reason': str(e)})
+                    print(f"[ERROR] {name} / {document['name']}: {e}")
+                    continue
+
+                result = {
+                    'benchmark': name,
+                    'document': document['name'],
+                    'profile': document['profile'],
+                    'input_bytes': input_bytes,
+                    'repeat': repeat,
+                    **timing,
+                    'throughput_mb_s': input_bytes / 1024 / 1024 / timing['seconds_min'] if timing['seconds_min'] else None,
+                }
+                if name in PANDOC_BENCHMARKS:
+                    result['child_max_rss_kb'] = _child_max_rss_kb()
+                results.append(result)
+                print(f"[OK] {name} / {document['name']}: {timing['seconds_min'] * 1000:.1f} ms, "
+                      f"峰值内存 {timing['peak_memory_bytes'] / 1024 / 1024:.2f} MB")
+
+    return {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'pandoc_version': pandoc_version,
+        'corpus': {'scale': manifest['scale'], 'seed': manifest['seed']},
+        'results': results,
+        'skipped': skipped,
+    }
+
+
+def compare_reports(baseline, current, threshold=0.2):
+    """
+    与基线报告对比，找出耗时或峰值内存增长超过阈值的测试项
+
+    Args:
+        baseline (dict): 基线报告
+        current (dict): 本次报告
+        threshold (float): 允许的相对增长（0.2 表示 20%）
+
+    Returns:
+        list: 回退项 [{'benchmark', 'document', 'metric', 'baseline', 'current', 'ratio'}]
+    """
+    baseline_results = {(r['benchmark'], r['document']): r for r in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        base = baseline_results.get((result['benchmark'], result['document']))
+        if base is None:
+            continue
+        for metric in ('seconds_min', 'peak_memory_bytes'):
+            if not base[metric]:
+                continue
+            ratio = result[metric] / base[metric]
+            if ratio > 1 + threshold:
+                regressions.append({
+                    'benchmark': result['benchmark'],
+                    'document': result['document'],
+                    'metric': metric,
+                    'baseline': base[metric],
+                    'current': result[metric],
+                    'ratio': ratio,
+                })
+    return regressions
+
+
+def main():
+    """命令行入口"""
+    args = sys.argv[1:]
+    if args and args[0] in ('-h', '--help'):
+        print("用法:")
+        print("  python run_benchmarks.py [--corpus DIR] [--scale small|medium|large] [--seed N]")
+        print("                           [--only NAME,...] [--repeat N] [--output FILE]")
+        print("                           [--baseline FILE] [--threshold 0.2]")
+        print("")
+        print(f"可选测试: {', '.join(BENCHMARKS)}")
+        print("")
+        print("示例:")
+        print("  python run_benchmarks.py --scale medium --output bench.json")
+        print("  python run_benchmarks.py --corpus corpus --baseline bench-v2.0.json")
+        sys.exit(0)
+
+    corpus_dir = None
+    scale = 'small'
+    seed = 0
+    benchmarks = BENCHMARKS
+    repeat = 3
+    output_file = 'benchmark_results.json'
+    baseline_file = None
+    threshold = 0.2
+
+    i = 0
+    while i < len(args):
+        if args[i] == '--corpus' and i + 1 < len(args):
+            corpus_dir = args[i + 1]
+            i += 2
+        elif args[i] == '--scale' and i + 1 < len(args):
+            scale = args[i + 1]
+            i += 2
+        elif args[i] == '--seed' and i + 1 < len(args):
+            seed = int(args[i + 1])
+            i += 2
+        elif args[i] == '--only' and i + 1 < len(args):
+            benchmarks = tuple(name.strip() for name in args[i + 1].split(',') if name.strip())
+            i += 2
+        elif args[i] == '--repeat' and i + 1 < len(args):
+            repeat = max(1, int(args[i + 1]))
+            i += 2
+        elif args[i] == '--output' and i + 1 < len(args):
+            output_file = args[i + 1]
+            i += 2
+        elif args[i] == '--baseline' and i + 1 < len(args):
+            baseline_file = args[i + 1]
+            i += 2
+        elif args[i] == '--threshold' and i + 1 < len(args):
+            threshold = float(args[i + 1])
+            i += 2
+        else:
+            i += 1
+
+    unknown = [name for name in benchmarks if name not in BENCHMARKS]
+    if unknown:
+        print(f"[ERROR] 未知的测试: {', '.join(unknown)}")
+        sys.exit(1)
+
+    with tempfile.TemporaryDirectory(prefix='pypandoc-corpus-') as temp_corpus:
+        if corpus_dir is None:
+            print(f"[INFO] 生成 {scale} 规模语料...")
+            generate_corpus(temp_corpus, scale, seed)
+            corpus_dir = temp_corpus
+        report = run_benchmarks(corpus_dir, benchmarks, repeat)
+
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n[OK] 结果已写入: {output_file}")
+
+    if baseline_file:
+        with open(baseline_file, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_reports(baseline, report, threshold)
+        if regressions:
+            print(f"\n[WARNING] 发现 {len(regressions)} 项性能回退 (阈值 {threshold:.0%}):")
+            for item in regressions:
+                print(f"  - {item['benchmark']} / {item['document']} {item['metric']}: "
+                      f"{item['baseline']:.4g} -> {item['current']:.4g} ({item['ratio']:.2f}x)")
+            sys.exit(1)
+        print(f"[OK] 与基线相比没有超过 {threshold:.0%} 的回退")
+
+
+if __name__ == '__main__':
+    main()
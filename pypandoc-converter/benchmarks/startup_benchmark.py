@@ -0,0 +1,136 @@
+"""
+启动耗时基准测试 - 测量命令行脚本从启动到退出的固定开销
+脚本在 shell 流水线中会被反复调用，--help、--validate 等不需要 pandoc 的调用
+不应为导入 pypandoc 和查找 pandoc 付出代价。每条命令在新的 Python 进程中运行多次，
+报告最短和平均耗时，并检查启动后是否加载了 pypandoc。
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+benchmarks_dir = Path(__file__).parent
+scripts_dir = benchmarks_dir.parent / 'scripts'
+
+SAMPLE_HTML = """<html><body>
+<table>
+<tr><th colspan="2">标题</th></tr>
+<tr><td>1</td><td>2</td></tr>
+</table>
+</body></html>
+"""
+
+
+def _commands(html_file):
+    """
+    返回要测量的命令
+
+    Returns:
+        list: [(名称, 参数列表)]
+    """
+    python = sys.executable
+    return [
+        ('python', [python, '-c', 'pass']),
+        ('convert_to_markdown --help', [python, str(scripts_dir / 'convert_to_markdown.py'), '--help']),
+        ('preprocess_html --validate', [python, str(scripts_dir / 'preprocess_html.py'), '--validate', html_file]),
+        ('preprocess_html', [python, str(scripts_dir / 'preprocess_html.py'), html_file, html_file + '.out']),
+        ('import convert_to_markdown', [python, '-c', 'import convert_to_markdown']),
+    ]
+
+
+def _loads_pypandoc(python_args):
+    """检查命令对应的模块导入后是否加载了 pypandoc（仅适用于 import 类命令）"""
+    code = python_args[-1] + "; import sys; print('pypandoc' in sys.modules)"
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                            cwd=str(scripts_dir))
+    return result.stdout.strip() == 'True'
+
+
+def measure_command(args, repeat=20):
+    """
+    在新进程中重复运行命令
+
+    Args:
+        args (list): 命令参数
+        repeat (int): 运行次数
+
+    Returns:
+        dict: {'ms_min', 'ms_mean', 'returncode'}
+    """
+    durations = []
+    returncode = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                cwd=str(scripts_dir))
+        durations.append((time.perf_counter() - start) * 1000)
+        returncode = result.returncode
+    return {
+        'ms_min': min(durations),
+        'ms_mean': sum(durations) / len(durations),
+        'returncode': returncode,
+    }
+
+
+def run_startup_benchmark(repeat=20):
+    """
+    测量所有命令的启动耗时
+
+    Returns:
+        dict: 可直接写入 JSON 的测试报告
+    """
+    results = []
+    with tempfile.TemporaryDirectory(prefix='pypandoc-startup-') as work_dir:
+        html_file = os.path.join(work_dir, 'sample.html')
+        with open(html_file, 'w', encoding='utf-8') as f:
+            f.write(SAMPLE_HTML)
+
+        for name, args in _commands(html_file):
+            timing = measure_command(args, repeat)
+            result = {'command': name, 'repeat': repeat, **timing}
+            if args[1] == '-c' and args[2].startswith('import'):
+                result['loads_pypandoc'] = _loads_pypandoc(args)
+            results.append(result)
+            print(f"[OK] {name}: 最短 {timing['ms_min']:.1f} ms，平均 {timing['ms_mean']:.1f} ms")
+
+    return {'python': sys.version.split()[0], 'results': results}
+
+
+def main():
+    """命令行入口"""
+    args = sys.argv[1:]
+    if args and args[0] in ('-h', '--help'):
+        print("用法:")
+        print("  python startup_benchmark.py [--repeat N] [--output FILE]")
+        sys.exit(0)
+
+    repeat = 20
+    output_file = None
+    i = 0
+    while i < len(args):
+        if args[i] == '--repeat' and i + 1 < len(args):
+            repeat = max(1, int(args[i + 1]))
+            i += 2
+        elif args[i] == '--output' and i + 1 < len(args):
+            output_file = args[i + 1]
+            i += 2
+        else:
+            i += 1
+
+    report = run_startup_benchmark(repeat)
+    for result in report['results']:
+        if result.get('loads_pypandoc'):
+            print(f"[WARNING] {result['command']} 在启动时导入了 pypandoc")
+
+    if output_file:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n[OK] 结果已写入: {output_file}")
+
+
+if __name__ == '__main__':
+    main()
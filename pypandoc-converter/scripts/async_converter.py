@@ -0,0 +1,399 @@
+"""
+异步转换接口 - 在 asyncio 服务中使用转换功能
+pandoc 通过 asyncio 子进程运行，HTML 预处理放到线程池执行，都不会阻塞事件循环。
+支持取消（取消时结束对应的 pandoc 进程）、超时和并发信号量。
+
+用法:
+    semaphore = asyncio.Semaphore(8)
+    await convert_to_markdown_async('a.docx', 'a.md', format_type='gfm', semaphore=semaphore)
+"""
+
+import asyncio
+import os
+import sys
+from contextlib import nullcontext
+from itertools import islice
+from pathlib import Path
+
+# 添加 scripts 目录到路径
+scripts_dir = Path(__file__).parent
+if str(scripts_dir) not in sys.path:
+    sys.path.insert(0, str(scripts_dir))
+
+from conversion_cache import make_cache_key, lookup_cache, store_cache
+from conversion_metrics import stage, aggregate_metrics
+from convert_to_markdown import preprocess_html_table, _batch_output_path
+from split_converter import _split_args
+from pandoc_probe import probe_pandoc, check_options
+from file_discovery import iter_files, pattern_base
+
+
+# 批量转换时每次在线程池中遍历出的文件数
+DISCOVERY_CHUNK = 64
+
+
+async def prepare_pandoc(format_type, extra_args):
+    """
+    在线程池中检查格式和参数并探测 pandoc
+
+    探测可能读取缓存文件或启动 pandoc 进程，不能在事件循环中直接执行。
+    批量转换时只调用一次，结果传给各文件的转换。
+
+    Args:
+        format_type (str): 输出格式
+        extra_args (list): 额外的 pandoc 参数
+
+    Returns:
+        dict: 探测结果（见 pandoc_probe.probe_pandoc）
+
+    Raises:
+        ValueError: 格式或参数不受支持
+        OSError: 找不到 pandoc
+    """
+    def prepare():
+        check_options(format_type, extra_args)
+        return probe_pandoc()
+
+    return await asyncio.get_running_loop().run_in_executor(None, prepare)
+
+
+async def run_pandoc(args, input_text=None, timeout=None, pandoc_path=None):
+    """
+    以 asyncio 子进程运行 pandoc
+
+    任务被取消或超时时结束 pandoc 进程，不会留下孤儿进程。
+
+    Args:
+        args (list): pandoc 命令行参数
+        input_text (str, optional): 经标准输入传给 pandoc 的内容
+        timeout (float, optional): 超时时间（秒）
+        pandoc_path (str, optional): pandoc 路径，默认在线程池中探测
+
+    Returns:
+        str: pandoc 的标准输出
+
+    Raises:
+        RuntimeError: pandoc 返回非零退出码
+        asyncio.TimeoutError: 超时
+    """
+    if pandoc_path is None:
+        pandoc_path = (await asyncio.get_running_loop().run_in_executor(None, probe_pandoc))['path']
+    process = await asyncio.create_subprocess_exec(
+        pandoc_path, *args,
+        stdin=asyncio.subprocess.PIPE if input_text is not None else asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(
+            process.communicate(input_text.encode('utf-8') if input_text is not None else None),
+            timeout
+        )
+    except asyncio.TimeoutError:
+        raise asyncio.TimeoutError(f"pandoc 在 {timeout} 秒内未完成转换") from None
+    finally:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+
+    if process.returncode != 0:
+        raise RuntimeError(
+            f'Pandoc died with exitcode "{process.returncode}" during conversion: '
+            f'{stderr.decode("utf-8", errors="replace").strip()}'
+        )
+    return stdout.decode('utf-8')
+
+
+async def _cache_lookup(cache_dir, input_path, output_path, format_type, extra_args, metrics, pandoc_version,
+                        **key_fields):
+    """在线程池中计算缓存键并查找缓存，返回 (缓存键, 是否命中)"""
+    loop = asyncio.get_running_loop()
+    with stage(metrics, 'cache_lookup', input=str(input_path)) as record:
+        cache_key = await loop.run_in_executor(
+            None,
+            lambda: make_cache_key(input_path, format_type, extra_args, pandoc_version=pandoc_version, **key_fields)
+        )
+        cache_hit = await loop.run_in_executor(None, lookup_cache, cache_dir, cache_key, output_path)
+        record['result'] = 'hit' if cache_hit else 'miss'
+    return cache_key, cache_hit
+
+
+async def convert_to_markdown_async(input_file, output_file=None, format_type='markdown', extra_args=None,
+                                    cache_dir=None, semaphore=None, timeout=None, metrics=None, probe=None):
+    """
+    convert_to_markdown() 的异步版本
+
+    Args:
+        input_file (str): 输入文件路径
+        output_file (str, optional): 输出文件路径。如果为 None，则自动生成 .md 文件名
+        format_type (str): 输出格式，默认为 'markdown'
+        extra_args (list, optional): 额外的 pandoc 参数
+        cache_dir (str, optional): 转换缓存目录
+        semaphore (asyncio.Semaphore, optional): 限制同时运行的 pandoc 进程数
+        timeout (float, optional): pandoc 超时时间（秒）
+        metrics (callable, optional): 指标回调（见 conversion_metrics）
+        probe (dict, optional): prepare_pandoc() 的结果，传入时不再检查参数和探测 pandoc
+
+    Returns:
+        str: 与同步版本一致，写入输出文件后返回空字符串
+    """
+    input_path = Path(input_file).absolute()
+
+    if not input_path.exists():
+        raise FileNotFoundError(f"输入文件不存在: {input_file}")
+
+    if output_file is None:
+        output_file = str(input_path.with_suffix('.md'))
+    output_path = Path(output_file).absolute()
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    if extra_args is None:
+        extra_args = ['--wrap=none']
+
+    try:
+        if probe is None:
+            probe = await prepare_pandoc(format_type, extra_args)
+
+        cache_key = None
+        if cache_dir is not None:
+            cache_key, cache_hit = await _cache_lookup(cache_dir, input_path, output_path, format_type, extra_args,
+                                                       metrics, probe['version'])
+            if cache_hit:
+                print(f"[CACHE] 命中缓存: {input_path} -> {output_path} (格式: {format_type})")
+                return ''
+
+        async with semaphore or nullcontext():
+            with stage(metrics, 'convert', input=str(input_path), format=format_type, backend='pandoc') as record:
+                record['input_bytes'] = input_path
+                await run_pandoc([str(input_path), '-t', format_type, '-o', str(output_path), *extra_args],
+                                 timeout=timeout, pandoc_path=probe['path'])
+                record['output_bytes'] = output_path
+
+        if cache_key is not None:
+            await asyncio.get_running_loop().run_in_executor(None, store_cache, cache_dir, cache_key, output_path)
+
+        print(f"[OK] 转换成功: {input_path} -> {output_path} (格式: {format_type})")
+        return ''
+
+    except asyncio.CancelledError:
+        print(f"[WARNING] 转换已取消: {input_path}")
+        raise
+    except Exception as e:
+        print(f"[ERROR] 转换失败: {e}")
+        raise
+
+
+async def convert_with_html_intermediate_async(input_file, output_file=None, format_type='gfm', extra_args=None,
+                                               preprocess=True, cache_dir=None, semaphore=None, timeout=None,
+                                               metrics=None, probe=None):
+    """
+    convert_with_html_intermediate() 的异步版本
+
+    始终使用内存模式：第一步的 HTML 从 pandoc 标准输出读取，在线程池中预处理后
+    经标准输入交给第二步。两次 pandoc 调用各自占用一次信号量，等待预处理时不占用。
+
+    Args:
+        input_file (str): 输入文件路径（通常是 DOCX）
+        output_file (str, optional): 输出 MD 文件路径
+        format_type (str): 最终输出格式，默认 'gfm'
+        extra_args (list, optional): 额外的 pandoc 参数
+        preprocess (bool): 是否预处理 HTML 表格，默认 True
+        cache_dir (str, optional): 转换缓存目录
+        semaphore (asyncio.Semaphore, optional): 限制同时运行的 pandoc 进程数
+        timeout (float, optional): 每次 pandoc 调用的超时时间（秒）
+        metrics (callable, optional): 指标回调（见 conversion_metrics）
+        probe (dict, optional): prepare_pandoc() 的结果，传入时不再检查参数和探测 pandoc
+
+    Returns:
+        str: 与同步版本一致，写入输出文件后返回空字符串
+    """
+    input_path = Path(input_file).absolute()
+
+    if not input_path.exists():
+        raise FileNotFoundError(f"输入文件不存在: {input_file}")
+
+    if output_file is None:
+        output_file = str(input_path.with_suffix('.md'))
+    output_path = Path(output_file).absolute()
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    if extra_args is None:
+        extra_args = ['--wrap=none']
+
+    loop = asyncio.get_running_loop()
+
+    # 读取阶段的参数（如 --extract-media）只在第一步读取输入文件时生效
+    reader_args, writer_args = _split_args(extra_args)
+
+    try:
+        if probe is None:
+            probe = await prepare_pandoc(format_type, extra_args)
+
+        cache_key = None
+        if cache_dir is not None:
+            cache_key, cache_hit = await _cache_lookup(cache_dir, input_path, output_path, format_type, extra_args,
+                                                       metrics, probe['version'], two_step=True,
+                                                       preprocess=preprocess)
+            if cache_hit:
+                print(f"[CACHE] 命中缓存: {input_path} -> {output_path} ({format_type})")
+                return ''
+
+        # 第一步: DOCX -> HTML
+        print(f"[STEP 1] 转换: {input_path} -> 内存 (HTML)")
+        async with semaphore or nullcontext():
+            with stage(metrics, 'to_html', input=str(input_path), backend='pandoc') as record:
+                record['input_bytes'] = input_path
+                html_content = await run_pandoc([str(input_path), '-t', 'html', '--standalone', *reader_args],
+                                                timeout=timeout, pandoc_path=probe['path'])
+                record['output_bytes'] = html_content
+
+        # 预处理 HTML 表格（CPU 密集，放到线程池执行）
+        if preprocess:
+            print("[STEP 1.5] 预处理 HTML 表格...")
+            with stage(metrics, 'preprocess', input=str(input_path)) as record:
+                record['input_bytes'] = html_content
+                html_content = await loop.run_in_executor(None, preprocess_html_table, html_content)
+                record['output_bytes'] = html_content
+            print("[STEP 1.5] HTML 表格预处理完成")
+
+        # 第二步: HTML -> MD
+        print(f"[STEP 2] 转换: 内存 -> {output_path} ({format_type})")
+        async with semaphore or nullcontext():
+            with stage(metrics, 'to_markdown', input=str(input_path), format=format_type, backend='pandoc') as record:
+                record['input_bytes'] = html_content
+                await run_pandoc(['-f', 'html', '-t', format_type, '-o', str(output_path), *writer_args],
+                                 input_text=html_content, timeout=timeout, pandoc_path=probe['path'])
+                record['output_bytes'] = output_path
+
+        if cache_key is not None:
+            await loop.run_in_executor(None, store_cache, cache_dir, cache_key, output_path)
+
+        print(f"[OK] 两步转换成功: {input_path} -> {output_path}")
+        return ''
+
+    except asyncio.CancelledError:
+        print(f"[WARNING] 两步转换已取消: {input_path}")
+        raise
+    except Exception as e:
+        print(f"[ERROR] 两步转换失败: {e}")
+        raise
+
+
+async def batch_convert_async(input_pattern, output_dir=None, format_type='markdown', extra_args=None,
+                              use_two_step=False, concurrency=None, cache_dir=None, timeout=None, metrics=None):
+    """
+    batch_convert() 的异步版本，所有文件在同一个事件循环中并发转换
+
+    目录遍历在线程池中分块进行，匹配的文件经有界队列交给固定数量的工作协程，
+    不预先收集完整的文件列表，也不为每个文件各创建一个任务。
+
+    Args:
+        input_pattern (str): 输入文件模式（支持通配符，** 匹配任意层目录）
+        output_dir (str, optional): 输出目录
+        format_type (str): 输出格式，默认 'markdown'
+        extra_args (list, optional): 额外的 pandoc 参数
+        use_two_step (bool): 是否使用两步转换法
+        concurrency (int, optional): 工作协程数（即同时运行的 pandoc 进程数上限），默认为 CPU 核心数
+        cache_dir (str, optional): 转换缓存目录
+        timeout (float, optional): 每次 pandoc 调用的超时时间（秒）
+        metrics (callable, optional): 指标回调（见 conversion_metrics）
+
+    Returns:
+        dict: 与 batch_convert() 相同结构的汇总结果。异步版本不支持恢复、去重和共享媒体库，
+            'skipped' 和 'duplicates' 始终为 0，'media' 为 None
+    """
+    # 在启动任何 pandoc 进程之前检查格式和参数，探测结果供所有文件使用
+    probe = await prepare_pandoc(format_type, extra_args)
+
+    concurrency = concurrency or os.cpu_count() or 1
+    print(f"开始批量转换: {input_pattern} (并发数: {concurrency})")
+
+    convert = convert_with_html_intermediate_async if use_two_step else convert_to_markdown_async
+
+    base_dir = pattern_base(input_pattern)
+
+    async def convert_one(file_path):
+        input_path = Path(file_path)
+        output_path = Path(_batch_output_path(file_path, output_dir, base_dir))
+
+        result = {'input': str(input_path), 'output': str(output_path), 'success': False, 'error': None,
+                  'log': '', 'metrics': []}
+        collect = result['metrics'].append if metrics is not None else None
+        try:
+            with stage(collect, 'file', input=str(input_path), two_step=use_two_step) as record:
+                record['input_bytes'] = input_path
+                await convert(str(input_path), str(output_path), format_type=format_type, extra_args=extra_args,
+                              cache_dir=cache_dir, timeout=timeout, metrics=collect, probe=probe)
+                record['output_bytes'] = output_path
+            result['success'] = True
+        except Exception as e:
+            result['error'] = str(e) or type(e).__name__
+        for item in result['metrics']:
+            metrics(item)
+        return result
+
+    loop = asyncio.get_running_loop()
+    pending = asyncio.Queue(maxsize=concurrency * 4)
+    finished = object()
+    # (文件序号, 结果)，汇总时按遍历顺序排列
+    collected = []
+
+    async def discover():
+        files = iter_files(input_pattern)
+        index = 0
+        while True:
+            chunk = await loop.run_in_executor(None, lambda: list(islice(files, DISCOVERY_CHUNK)))
+            if not chunk:
+                break
+            for file_path in chunk:
+                # 队列满时遍历暂停，等待工作协程取走文件
+                await pending.put((index, file_path))
+                index += 1
+        for _ in range(concurrency):
+            await pending.put(finished)
+
+    async def work():
+        while True:
+            item = await pending.get()
+            if item is finished:
+                return
+            index, file_path = item
+            collected.append((index, await convert_one(file_path)))
+
+    workers = [asyncio.ensure_future(work()) for _ in range(concurrency)]
+    try:
+        await discover()
+        await asyncio.gather(*workers)
+    finally:
+        # 遍历出错或任务被取消时结束所有工作协程
+        for worker in workers:
+            worker.cancel()
+
+    if not collected:
+        print(f"未找到匹配的文件: {input_pattern}")
+        return {'total': 0, 'succeeded': 0, 'failed': 0, 'skipped': 0, 'duplicates': 0, 'results': [],
+                'media': None, 'metrics': None}
+
+    results = [result for _, result in sorted(collected, key=lambda item: item[0])]
+    failed = [r for r in results if not r['success']]
+    summary = {
+        'total': len(results),
+        'succeeded': len(results) - len(failed),
+        'failed': len(failed),
+        'skipped': 0,
+        'duplicates': 0,
+        'results': list(results),
+        'media': None,
+        'metrics': None
+    }
+    if metrics is not None:
+        summary['metrics'] = aggregate_metrics([item for r in results for item in r['metrics']])
+
+    if failed:
+        print(f"[WARNING] 批量转换完成: 成功 {summary['succeeded']}/{summary['total']}，失败 {summary['failed']}")
+        for r in failed:
+            print(f"  - {r['input']}: {r['error']}")
+    else:
+        print(f"[OK] 批量转换完成: 成功 {summary['succeeded']}/{summary['total']}")
+
+    return summary
@@ -0,0 +1,411 @@
+"""
+内存转换接口 - 输入为字节串，输出为字节串或写入 writer，调用方不需要临时文件
+适用于上传文档的服务: 文档内容经标准输入交给 pandoc，结果从标准输出逐块读取。
+DOCX 等 ZIP 容器格式需要可随机访问的输入文件，写入匿名内存文件（Linux 的 memfd）后
+以 /dev/fd/N 路径交给 pandoc；不支持 memfd 的平台退回为临时文件。
+
+用法:
+    markdown = convert_bytes(upload, 'docx', 'gfm')
+    convert_bytes_with_html_intermediate(upload, 'docx', 'gfm', writer=response)
+
+    # 命令行: 从标准输入读取，写到标准输出
+    python bytes_converter.py --from docx --to gfm [--two-step] [--fast-gfm] < input.docx > output.md
+"""
+
+import io
+import os
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager, redirect_stdout
+from pathlib import Path
+
+# 添加 scripts 目录到路径
+scripts_dir = Path(__file__).parent
+if str(scripts_dir) not in sys.path:
+    sys.path.insert(0, str(scripts_dir))
+
+from conversion_metrics import stage
+from pandoc_probe import probe_pandoc, check_options
+from pandoc_server import BINARY_FORMATS, try_convert
+
+
+# 每次从 pandoc 标准输出读取、写入 writer 的字节数
+CHUNK_SIZE = 64 * 1024
+
+# pandoc 需要以可随机访问的文件读取的输入格式（ZIP 容器）
+SEEKABLE_FORMATS = BINARY_FORMATS | {'pptx', 'xlsx'}
+
+
+def _base_format(format_type):
+    """去掉扩展选项后的格式名（如 'docx+styles' 为 'docx'）"""
+    for separator in ('+', '-'):
+        format_type = format_type.split(separator, 1)[0]
+    return format_type
+
+
+@contextmanager
+def _pandoc_input(data, input_format):
+    """
+    为 pandoc 准备输入
+
+    Yields:
+        tuple: (输入文件参数列表, 经标准输入传入的数据或 None, 子进程需要继承的文件描述符)
+    """
+    base_format = _base_format(input_format)
+    if base_format not in SEEKABLE_FORMATS:
+        yield [], data, ()
+        return
+
+    if hasattr(os, 'memfd_create'):
+        fd = os.memfd_create(f'pypandoc-input.{base_format}')
+        try:
+            with open(fd, 'wb', closefd=False) as f:
+                f.write(data)
+            os.lseek(fd, 0, os.SEEK_SET)
+            yield [f'/dev/fd/{fd}'], None, (fd,)
+        finally:
+            os.close(fd)
+        return
+
+    from tempfile import NamedTemporaryFile
+
+    # Windows 上打开中的临时文件不能被其他进程读取，写完关闭后再交给 pandoc
+    with NamedTemporaryFile(suffix=f'.{base_format}', delete=False) as f:
+        f.write(data)
+    try:
+        yield [f.name], None, ()
+    finally:
+        os.unlink(f.name)
+
+
+def _spawn(args, stdin, pass_fds=()):
+    """
+    启动 pandoc 子进程，标准错误在后台线程中读取，避免管道写满导致死锁
+
+    Returns:
+        tuple: (进程, 读取标准错误的线程, 保存标准错误内容的列表)
+    """
+    process = subprocess.Popen([probe_pandoc()['path'], *args], stdin=stdin, stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE, pass_fds=pass_fds)
+    errors = []
+    thread = threading.Thread(target=lambda: errors.append(process.stderr.read()), daemon=True)
+    thread.start()
+    return process, thread, errors
+
+
+def _background(target, *args):
+    """
+    在后台线程中执行 target，异常保存在返回的列表中
+
+    Returns:
+        tuple: (线程, 异常列表)
+    """
+    failures = []
+
+    def run():
+        try:
+            target(*args)
+        except BaseException as e:
+            failures.append(e)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread, failures
+
+
+def _feed(stream, data):
+    """将数据写入 pandoc 的标准输入后关闭；pandoc 提前退出时错误信息在其标准错误中"""
+    try:
+        view = memoryview(data)
+        for offset in range(0, len(view), CHUNK_SIZE):
+            stream.write(view[offset:offset + CHUNK_SIZE])
+        stream.close()
+    except BrokenPipeError:
+        pass
+
+
+def _pipe_html(source, target, preprocess):
+    """第一步的 HTML 逐块预处理后写入第二步的标准输入（见 convert_to_markdown._stream_two_step）"""
+    import shutil
+
+    from convert_to_markdown import _preprocess_html_stream
+
+    reader = io.TextIOWrapper(source, encoding='utf-8')
+    writer = io.TextIOWrapper(target, encoding='utf-8')
+    try:
+        if preprocess:
+            _preprocess_html_stream(reader, writer)
+        else:
+            shutil.copyfileobj(reader, writer)
+        writer.close()
+    except BrokenPipeError:
+        pass
+    reader.close()
+
+
+def _drain(stream, writer):
+    """将 pandoc 标准输出逐块写入 writer，返回字节数"""
+    total = 0
+    for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+        writer.write(chunk)
+        total += len(chunk)
+    return total
+
+
+def _run(first, writer, second_args=None, preprocess=True, deadline=None):
+    """
+    运行 pandoc，输出写入 writer；指定 second_args 时再启动第二个 pandoc，
+    第一个进程输出的 HTML 逐块预处理后经管道流入第二个进程，写入 writer 的是第二个进程的输出
+
+    Args:
+        first (tuple): (pandoc 参数, 标准输入数据或 None, 需要继承的文件描述符)
+        writer: 接收输出字节的对象
+        second_args (list, optional): 第二个 pandoc 进程的参数
+        preprocess (bool): 两个进程之间是否预处理 HTML
+        deadline (float, optional): time.monotonic() 截止时间，到期时结束 pandoc 进程
+
+    Returns:
+        int: 输出字节数
+
+    Raises:
+        RuntimeError: pandoc 返回非零退出码
+        TimeoutError: 超过截止时间
+    """
+    args, data, pass_fds = first
+    processes = []
+    pumps = []
+    expired = threading.Event()
+
+    def kill():
+        expired.set()
+        for process, _, _ in processes:
+            process.kill()
+
+    watchdog = None
+    if deadline is not None:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("转换超时，未启动 pandoc")
+        watchdog = threading.Timer(remaining, kill)
+        watchdog.daemon = True
+    try:
+        processes.append(_spawn(args, subprocess.PIPE if data is not None else subprocess.DEVNULL, pass_fds))
+        if data is not None:
+            pumps.append(_background(_feed, processes[0][0].stdin, data))
+        if second_args is not None:
+            processes.append(_spawn(second_args, subprocess.PIPE))
+            pumps.append(_background(_pipe_html, processes[0][0].stdout, processes[1][0].stdin, preprocess))
+        if watchdog is not None:
+            watchdog.start()
+        output_bytes = _drain(processes[-1][0].stdout, writer)
+    except BaseException:
+        for process, _, _ in processes:
+            process.kill()
+        raise
+    finally:
+        if watchdog is not None:
+            watchdog.cancel()
+        for thread, _ in pumps:
+            thread.join()
+        for process, thread, _ in processes:
+            process.stdout.close()
+            process.wait()
+            thread.join()
+
+    if expired.is_set():
+        raise TimeoutError("pandoc 未在截止时间前完成转换，已结束进程")
+    for process, _, errors in processes:
+        if process.returncode != 0:
+            message = b''.join(errors).decode('utf-8', errors='replace').strip()
+            raise RuntimeError(f'Pandoc died with exitcode "{process.returncode}" during conversion: {message}')
+    for _, failures in pumps:
+        if failures:
+            raise failures[0]
+    return output_bytes
+
+
+def _write_result(result, writer):
+    """将完整结果交给调用方: 未提供 writer 时直接返回，否则写入后返回字节数"""
+    if writer is None:
+        return result
+    writer.write(result)
+    return len(result)
+
+
+def convert_bytes(data, input_format, output_format='markdown', extra_args=None, writer=None,
+                  pandoc_server=None, metrics=None, timeout=None):
+    """
+    转换内存中的文档，不需要输入或输出文件
+
+    Args:
+        data (bytes | str): 文档内容，str 按 UTF-8 编码
+        input_format (str): 输入格式（如 'docx'、'html'）
+        output_format (str): 输出格式，默认为 'markdown'
+        extra_args (list, optional): 额外的 pandoc 参数
+        writer (optional): 接收输出的二进制写入对象（如 HTTP 响应、sys.stdout.buffer）。
+            提供时输出按 CHUNK_SIZE 逐块写入，不在内存中保留完整结果
+        pandoc_server (str, optional): 常驻 pandoc server 地址，可用时优先通过服务转换
+        metrics (callable, optional): 指标回调（见 conversion_metrics）
+        timeout (float, optional): 超时时间（秒），超时时结束 pandoc 进程并抛出 TimeoutError
+
+    Returns:
+        bytes | int: 未提供 writer 时返回转换结果，否则返回写入的字节数
+    """
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    if extra_args is None:
+        extra_args = ['--wrap=none']
+    check_options(output_format, extra_args, input_format=input_format)
+
+    if pandoc_server:
+        content = data if _base_format(input_format) in BINARY_FORMATS else data.decode('utf-8')
+        with stage(metrics, 'convert', input='<bytes>', format=output_format, backend='server') as record:
+            record['input_bytes'] = data
+            output = try_convert(pandoc_server, content, input_format, output_format, extra_args,
+                                 timeout=deadline - time.monotonic() if deadline is not None else None)
+            if output is None:
+                record['result'] = 'fallback'
+            else:
+                output = output.encode('utf-8')
+                record['output_bytes'] = output
+        if output is not None:
+            return _write_result(output, writer)
+
+    output = io.BytesIO() if writer is None else writer
+    with stage(metrics, 'convert', input='<bytes>', format=output_format, backend='pandoc') as record:
+        record['input_bytes'] = data
+        with _pandoc_input(data, input_format) as (input_args, stdin_data, pass_fds):
+            args = [*input_args, '-f', input_format, '-t', output_format, *extra_args]
+            record['output_bytes'] = _run((args, stdin_data, pass_fds), output, deadline=deadline)
+    return output.getvalue() if writer is None else record['output_bytes']
+
+
+def convert_bytes_with_html_intermediate(data, input_format='docx', output_format='gfm', extra_args=None,
+                                         preprocess=True, writer=None, fast_gfm=False, metrics=None, timeout=None):
+    """
+    convert_bytes() 的两步转换法版本（DOCX -> HTML -> MD）
+
+    两个 pandoc 进程以管道相连，HTML 逐块预处理后直接流入第二步，
+    输出与 convert_with_html_intermediate(..., in_memory=True) 一致。
+
+    Args:
+        data (bytes | str): 文档内容
+        input_format (str): 输入格式，默认 'docx'
+        output_format (str): 最终输出格式，默认 'gfm'
+        extra_args (list, optional): 第二步的 pandoc 参数，默认 ['--wrap=none']
+        preprocess (bool): 是否预处理 HTML 中的表格
+        writer (optional): 接收输出的二进制写入对象，见 convert_bytes()
+        fast_gfm (bool): 输出 GFM 时第二步使用原生渲染（见 html_to_gfm），只启动一个 pandoc 进程；
+            HTML 超出支持的子集时回退为 pandoc
+        metrics (callable, optional): 指标回调
+        timeout (float, optional): 整个转换的超时时间（秒），见 convert_bytes()
+
+    Returns:
+        bytes | int: 未提供 writer 时返回转换结果，否则返回写入的字节数
+    """
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    if extra_args is None:
+        extra_args = ['--wrap=none']
+    check_options(output_format, extra_args, input_format=input_format)
+    to_markdown_args = ['-f', 'html', '-t', output_format, *extra_args]
+
+    with _pandoc_input(data, input_format) as (input_args, stdin_data, pass_fds):
+        to_html = ([*input_args, '-f', input_format, '-t', 'html', '--standalone'], stdin_data, pass_fds)
+
+        if fast_gfm:
+            from html_to_gfm import native_gfm_supported, render_gfm, UnsupportedHtmlError
+
+            fast_gfm = native_gfm_supported(output_format, extra_args)
+        if fast_gfm:
+            # 原生渲染可能在中途发现不支持的内容，HTML 和渲染结果先保留在内存中，回退时不会输出半个文档
+            html = io.BytesIO()
+            with stage(metrics, 'to_html', input='<bytes>', backend='pandoc') as record:
+                record['input_bytes'] = data
+                record['output_bytes'] = _run(to_html, html, deadline=deadline)
+            html_content = html.getvalue().decode('utf-8')
+            try:
+                with stage(metrics, 'to_markdown', input='<bytes>', format=output_format,
+                           backend='native') as record:
+                    rendered = io.StringIO()
+                    render_gfm(io.StringIO(html_content), rendered)
+                    result = rendered.getvalue().encode('utf-8')
+                    record['output_bytes'] = result
+                return _write_result(result, writer)
+            except UnsupportedHtmlError as e:
+                print(f"[INFO] {e}，第二步改用 pandoc")
+
+            from convert_to_markdown import preprocess_html_table
+
+            # 回退: 已生成的 HTML 预处理后经标准输入交给第二步
+            if preprocess:
+                html_content = preprocess_html_table(html_content)
+            output = io.BytesIO() if writer is None else writer
+            with stage(metrics, 'to_markdown', input='<bytes>', format=output_format, backend='pandoc') as record:
+                record['output_bytes'] = _run((to_markdown_args, html_content.encode('utf-8'), ()), output,
+                                               deadline=deadline)
+            return output.getvalue() if writer is None else record['output_bytes']
+
+        output = io.BytesIO() if writer is None else writer
+        with stage(metrics, 'pipeline', input='<bytes>', format=output_format, backend='pandoc') as record:
+            record['input_bytes'] = data
+            record['output_bytes'] = _run(to_html, output, to_markdown_args, preprocess, deadline)
+    return output.getvalue() if writer is None else record['output_bytes']
+
+
+def main():
+    """命令行入口: 从标准输入读取文档，转换结果写到标准输出"""
+    args = sys.argv[1:]
+    if args and args[0] in ('-h', '--help'):
+        print("用法:")
+        print("  python bytes_converter.py --from docx [--to gfm] [--two-step] [--fast-gfm] < input > output")
+        sys.exit(0)
+
+    input_format = None
+    output_format = 'markdown'
+    use_two_step = False
+    fast_gfm = False
+
+    i = 0
+    while i < len(args):
+        if args[i] == '--from' and i + 1 < len(args):
+            input_format = args[i + 1]
+            i += 2
+        elif args[i] == '--to' and i + 1 < len(args):
+            output_format = args[i + 1]
+            i += 2
+        elif args[i] == '--two-step':
+            use_two_step = True
+            i += 1
+        elif args[i] == '--fast-gfm':
+            use_two_step = True
+            fast_gfm = True
+            i += 1
+        else:
+            print(f"未知参数: {args[i]}", file=sys.stderr)
+            sys.exit(1)
+
+    if input_format is None:
+        print("错误: 需要用 --from 指定输入格式", file=sys.stderr)
+        sys.exit(1)
+
+    data = sys.stdin.buffer.read()
+    try:
+        # 日志输出到标准错误，标准输出只包含转换结果
+        with redirect_stdout(sys.stderr):
+            if use_two_step:
+                convert_bytes_with_html_intermediate(data, input_format, output_format, writer=sys.stdout.buffer,
+                                                     fast_gfm=fast_gfm)
+            else:
+                convert_bytes(data, input_format, output_format, writer=sys.stdout.buffer)
+    except (OSError, RuntimeError, ValueError) as e:
+        print(f"[ERROR] 转换失败: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
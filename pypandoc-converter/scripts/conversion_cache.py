@@ -0,0 +1,215 @@
+"""
+转换结果缓存 - 基于内容寻址的磁盘缓存
+以输入文件内容哈希 + 转换选项 + pandoc 版本作为键，命中时直接复用上次的输出，
+避免对未修改的文档重复调用 pandoc
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+
+# 缓存格式版本，变更缓存键或存储布局时递增，使旧条目自动失效
+CACHE_FORMAT_VERSION = 1
+
+# 默认缓存容量上限: 1 GB
+DEFAULT_CACHE_MAX_BYTES = 1024 ** 3
+
+
+def hash_file(file_path, chunk_size=1024 * 1024):
+    """
+    分块计算文件内容的 SHA-256 哈希
+
+    Args:
+        file_path (str): 文件路径
+        chunk_size (int): 每次读取的字节数
+
+    Returns:
+        str: 十六进制哈希值
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _lua_filter_hashes(extra_args):
+    """
+    参数中各 Lua 过滤器文件的内容哈希
+
+    过滤器的输出取决于脚本内容而不是路径，修改过滤器后旧的缓存条目不能再命中。
+
+    Args:
+        extra_args (list): pandoc 参数
+
+    Returns:
+        list: 按参数顺序排列的哈希值，文件无法读取时为 None
+    """
+    paths = []
+    args = list(extra_args or [])
+    i = 0
+    while i < len(args):
+        if args[i].startswith('--lua-filter='):
+            paths.append(args[i].split('=', 1)[1])
+        elif args[i] in ('--lua-filter', '-L') and i + 1 < len(args):
+            paths.append(args[i + 1])
+            i += 1
+        i += 1
+
+    hashes = []
+    for path in paths:
+        try:
+            hashes.append(hash_file(path))
+        except OSError:
+            hashes.append(None)
+    return hashes
+
+
+def make_cache_key(input_file, format_type, extra_args, two_step=False, preprocess=False, pandoc_version=None,
+                   split=False, native_gfm=False, input_hash=None):
+    """
+    生成缓存键
+
+    Args:
+        input_file (str): 输入文件路径
+        format_type (str): 输出格式
+        extra_args (list): 实际使用的 pandoc 参数（其中的 Lua 过滤器按文件内容计入键）
+        two_step (bool): 是否为两步转换法
+        preprocess (bool): 两步转换法是否预处理 HTML 表格
+        pandoc_version (str, optional): pandoc 版本号
+        split (bool): 是否为分段并行转换
+        native_gfm (bool): 两步转换法第二步是否使用原生 GFM 渲染
+        input_hash (str, optional): 已计算的输入文件哈希（hash_file() 的结果），
+            同一输入生成多个缓存键时传入，避免重复读取文件
+
+    Returns:
+        str: 十六进制缓存键
+    """
+    fields = {
+        'cache_format': CACHE_FORMAT_VERSION,
+        'input_hash': input_hash or hash_file(input_file),
+        'format_type': format_type,
+        'extra_args': list(extra_args or []),
+        'two_step': bool(two_step),
+        'preprocess': bool(preprocess),
+        'pandoc_version': pandoc_version,
+    }
+    # 只在启用时加入，不影响已有缓存条目的键
+    if split:
+        fields['split'] = True
+    if native_gfm:
+        fields['native_gfm'] = True
+    lua_filters = _lua_filter_hashes(extra_args)
+    if lua_filters:
+        fields['lua_filters'] = lua_filters
+    payload = json.dumps(fields, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _entry_path(cache_dir, key):
+    """缓存条目路径，按键前两位分目录，避免单目录文件过多"""
+    return Path(cache_dir) / key[:2] / key
+
+
+def lookup_cache(cache_dir, key, output_file):
+    """
+    查找缓存，命中时将缓存内容复制到输出文件
+
+    先复制到输出文件旁的临时文件再原子替换，复制中断或并发读写时输出文件不会只有部分内容。
+
+    Args:
+        cache_dir (str): 缓存目录
+        key (str): 缓存键
+        output_file (str): 输出文件路径
+
+    Returns:
+        bool: 是否命中
+    """
+    import shutil
+    import threading
+
+    entry = _entry_path(cache_dir, key)
+    output_path = Path(output_file)
+    # 同一进程的多个线程可能同时写同一个输出文件，临时文件名同时包含进程号和线程号
+    temp_output = output_path.with_name(f".{output_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        shutil.copyfile(entry, temp_output)
+        os.replace(temp_output, output_path)
+    except BaseException as e:
+        if temp_output.exists():
+            temp_output.unlink()
+        if isinstance(e, FileNotFoundError):
+            return False
+        raise
+
+    # 更新修改时间，作为 LRU 淘汰的依据
+    try:
+        os.utime(entry)
+    except OSError:
+        pass
+    return True
+
+
+def store_cache(cache_dir, key, output_file):
+    """
+    将输出文件存入缓存（先写临时文件再原子替换，支持多进程并发写入）
+
+    Args:
+        cache_dir (str): 缓存目录
+        key (str): 缓存键
+        output_file (str): 已生成的输出文件路径
+    """
+    import shutil
+
+    entry = _entry_path(cache_dir, key)
+    entry.parent.mkdir(parents=True, exist_ok=True)
+    temp_entry = entry.with_name(f"{entry.name}.{os.getpid()}.tmp")
+    try:
+        shutil.copyfile(output_file, temp_entry)
+        os.replace(temp_entry, entry)
+    except OSError as e:
+        print(f"[WARNING] 无法写入缓存: {e}")
+        if temp_entry.exists():
+            temp_entry.unlink()
+
+
+def prune_cache(cache_dir, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+    """
+    按最近使用时间淘汰缓存条目，使缓存总大小不超过上限
+
+    Args:
+        cache_dir (str): 缓存目录
+        max_bytes (int): 缓存容量上限（字节）
+
+    Returns:
+        int: 删除的条目数
+    """
+    cache_path = Path(cache_dir)
+    if not cache_path.is_dir():
+        return 0
+
+    entries = []
+    total = 0
+    for entry in cache_path.glob('??/*'):
+        try:
+            stat = entry.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, entry))
+        total += stat.st_size
+
+    removed = 0
+    entries.sort()
+    for _, size, entry in entries:
+        if total <= max_bytes:
+            break
+        try:
+            entry.unlink()
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+
+    return removed
@@ -0,0 +1,209 @@
+"""
+转换日志 - 记录批量转换中每个文件的进度，崩溃或重启后可从中断处继续
+日志为只追加的 JSON Lines 文件，每个文件开始转换时写入一条 start 记录，
+结束时写入 done 或 failed 记录（包含转换选项指纹、输入文件签名和输出哈希）。
+写入后立即 flush，fsync 按条数或时间间隔批量执行，兼顾持久性和吞吐量。
+
+恢复时按文件取最后一条记录: done 且选项、输入和输出均未变化的文件跳过，
+只有 start（转换中途中断）或 failed 的文件重新转换。
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+
+# 默认日志文件名（位于输出目录中）
+DEFAULT_JOURNAL_FILE = '.convert_journal.jsonl'
+
+# 默认每写入多少条记录或经过多少秒执行一次 fsync
+DEFAULT_FSYNC_EVERY = 64
+DEFAULT_FSYNC_INTERVAL = 1.0
+
+
+def options_fingerprint(format_type, extra_args, use_two_step=False, split=False, fast_gfm=False,
+                        table_filter=False, media_store=None):
+    """
+    影响输出内容的转换选项指纹，选项变化后已完成的记录不再视为完成
+
+    Returns:
+        str: 十六进制指纹
+    """
+    fields = {
+        'format_type': format_type,
+        'extra_args': list(extra_args) if extra_args is not None else None,
+        'two_step': bool(use_two_step),
+        'split': bool(split),
+    }
+    # 只在启用时加入，不影响已有日志记录的指纹
+    if fast_gfm:
+        fields['fast_gfm'] = True
+    if table_filter:
+        fields['table_filter'] = True
+    if media_store is not None:
+        # 输出中的图片路径指向媒体库
+        fields['media_store'] = str(Path(media_store).absolute())
+    payload = json.dumps(fields, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def _file_signature(path):
+    """文件的 [修改时间, 大小]，文件不存在时返回 None"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def load_journal(journal_file):
+    """
+    读取日志，按输入文件保留最后一条记录
+
+    崩溃时最后一行可能只写了一半，无法解析的行直接忽略。
+
+    Args:
+        journal_file (str): 日志文件路径
+
+    Returns:
+        dict: {输入文件绝对路径: 最后一条记录}
+    """
+    entries = {}
+    try:
+        with open(journal_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(entry, dict) and 'input' in entry:
+                    entries[entry['input']] = entry
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def is_completed(entry, input_file, output_file, fingerprint):
+    """
+    判断日志记录是否表示该文件已按相同选项转换完成，且之后输入和输出都没有变化
+
+    只比较文件的修改时间和大小，不重新计算哈希，恢复十万级文件的任务只需数秒。
+
+    Args:
+        entry (dict | None): load_journal() 中该文件的最后一条记录
+        input_file (str): 输入文件路径
+        output_file (str): 输出文件路径
+        fingerprint (str): options_fingerprint() 的结果
+
+    Returns:
+        bool: 是否可以跳过
+    """
+    if entry is None or entry.get('status') != 'done' or entry.get('options') != fingerprint:
+        return False
+    if entry.get('output') != str(Path(output_file).absolute()):
+        return False
+    if entry.get('input_signature') != _file_signature(input_file):
+        return False
+    output_signature = _file_signature(output_file)
+    return output_signature is not None and output_signature[1] == entry.get('output_bytes')
+
+
+class ConversionJournal:
+    """
+    只追加的转换日志
+
+    用法:
+        with ConversionJournal('journal.jsonl') as journal:
+            journal.start(input_file, output_file, fingerprint)
+            ...
+            journal.finish(input_file, output_file, fingerprint, success=True)
+    """
+
+    def __init__(self, path, fsync_every=DEFAULT_FSYNC_EVERY, fsync_interval=DEFAULT_FSYNC_INTERVAL):
+        """
+        Args:
+            path (str): 日志文件路径
+            fsync_every (int): 每写入多少条记录执行一次 fsync
+            fsync_interval (float): 距上次 fsync 超过多少秒时执行 fsync
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        # 上次崩溃时最后一行可能只写了一半，换行后再追加，避免与新记录粘连
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b'\n'
+        except OSError:
+            # 文件不存在或为空
+            needs_newline = False
+        self._file = open(self.path, 'a', encoding='utf-8')
+        if needs_newline:
+            self._file.write('\n')
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _write(self, entry):
+        entry['time'] = time.time()
+        self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._file.flush()
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.sync()
+
+    def sync(self):
+        """将已写入的记录落盘"""
+        if self._unsynced:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def start(self, input_file, output_file, fingerprint):
+        """记录文件开始转换"""
+        self._write({
+            'status': 'start',
+            'input': str(Path(input_file).absolute()),
+            'output': str(Path(output_file).absolute()),
+            'options': fingerprint,
+        })
+
+    def finish(self, input_file, output_file, fingerprint, success, error=None):
+        """
+        记录文件转换结束
+
+        Args:
+            input_file (str): 输入文件路径
+            output_file (str): 输出文件路径
+            fingerprint (str): options_fingerprint() 的结果
+            success (bool): 是否成功
+            error (str, optional): 错误信息
+        """
+        entry = {
+            'status': 'done' if success else 'failed',
+            'input': str(Path(input_file).absolute()),
+            'output': str(Path(output_file).absolute()),
+            'options': fingerprint,
+            'input_signature': _file_signature(input_file),
+        }
+        if success:
+            from conversion_cache import hash_file
+
+            entry['output_bytes'] = os.path.getsize(output_file)
+            entry['output_hash'] = hash_file(output_file)
+        else:
+            entry['error'] = error
+        self._write(entry)
+
+    def close(self):
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,141 @@
+"""
+转换指标 - 记录每个转换阶段的耗时、输入/输出字节数和结果
+转换函数通过 metrics 回调逐条上报记录（dict），可写入 JSON Lines 文件
+供监控面板使用，也可在批量转换结束后按阶段汇总。
+
+记录字段:
+    stage: 阶段名称（cache_lookup、convert、to_html、preprocess、to_markdown、pipeline、read_ast、
+        render_formats、media_store、duplicate、file）
+    input: 输入文件路径
+    duration: 耗时（秒）
+    time: 阶段结束时的时间戳
+    input_bytes / output_bytes: 该阶段读入和产出的字节数（无法确定时不包含）
+    backend: 实际执行转换的方式（server 或 pandoc）
+    result: ok、error、hit、miss 或 reused
+    error: 错误信息（仅失败时）
+"""
+
+import json
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+
+def _byte_size(value):
+    """将文件路径、文本或字节串换算为字节数"""
+    if value is None or isinstance(value, int):
+        return value
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, Path):
+        try:
+            return value.stat().st_size
+        except OSError:
+            return None
+    return len(value.encode('utf-8'))
+
+
+@contextmanager
+def stage(metrics, name, **fields):
+    """
+    记录一个转换阶段
+
+    在 with 块中可向返回的记录写入 input_bytes / output_bytes，值可以是
+    字节数、文件路径 (Path)、文本或字节串，退出时统一换算为字节数。
+    未提供 metrics 回调时不做任何统计。
+
+    Args:
+        metrics (callable): 接收记录的回调，None 表示不记录
+        name (str): 阶段名称
+        **fields: 写入记录的其他字段（如 input、backend）
+
+    Yields:
+        dict: 本阶段的记录
+    """
+    record = {'stage': name, **fields}
+    if metrics is None:
+        yield record
+        return
+
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record['result'] = 'error'
+        record['error'] = str(e)
+        raise
+    finally:
+        record['duration'] = time.perf_counter() - start
+        record['time'] = time.time()
+        record.setdefault('result', 'ok')
+        for key in ('input_bytes', 'output_bytes'):
+            if key in record:
+                record[key] = _byte_size(record[key])
+        metrics(record)
+
+
+def aggregate_metrics(records):
+    """
+    按阶段汇总指标记录
+
+    Args:
+        records (list): 指标记录列表
+
+    Returns:
+        dict: {阶段名称: {'count', 'errors', 'total_seconds', 'mean_seconds', 'p95_seconds',
+            'max_seconds', 'input_bytes', 'output_bytes'}}
+    """
+    durations = {}
+    summary = {}
+    for record in records:
+        name = record['stage']
+        item = summary.setdefault(name, {
+            'count': 0,
+            'errors': 0,
+            'total_seconds': 0.0,
+            'input_bytes': 0,
+            'output_bytes': 0,
+        })
+        item['count'] += 1
+        if record.get('result') == 'error':
+            item['errors'] += 1
+        item['total_seconds'] += record.get('duration', 0.0)
+        item['input_bytes'] += record.get('input_bytes') or 0
+        item['output_bytes'] += record.get('output_bytes') or 0
+        durations.setdefault(name, []).append(record.get('duration', 0.0))
+
+    for name, item in summary.items():
+        values = sorted(durations[name])
+        item['mean_seconds'] = item['total_seconds'] / item['count']
+        item['p95_seconds'] = values[min(len(values) - 1, int(len(values) * 0.95))]
+        item['max_seconds'] = values[-1]
+    return summary
+
+
+class JsonLinesMetrics:
+    """
+    将指标记录逐行追加写入 JSON Lines 文件的回调
+
+    用法:
+        with JsonLinesMetrics('metrics.jsonl') as metrics:
+            convert_to_markdown('a.docx', metrics=metrics)
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def __call__(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
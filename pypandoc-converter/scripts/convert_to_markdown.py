@@ -6,27 +6,80 @@
 特别功能: 两步转换法处理复杂表格问题 (DOCX -> HTML -> MD)
 """
 
-import pypandoc
 import sys
 import os
 import re
+import io
+import time
+from contextlib import redirect_stdout, nullcontext
 from pathlib import Path
-from tempfile import NamedTemporaryFile
 
+# 添加 scripts 目录到路径
+scripts_dir = Path(__file__).parent
+if str(scripts_dir) not in sys.path:
+    sys.path.insert(0, str(scripts_dir))
 
-def convert_to_markdown(input_file, output_file=None, format_type='markdown', extra_args=None):
+from conversion_cache import (
+    DEFAULT_CACHE_MAX_BYTES,
+    hash_file,
+    make_cache_key,
+    lookup_cache,
+    store_cache,
+    prune_cache
+)
+from pandoc_server import PandocServer, try_convert, try_convert_file
+from pandoc_probe import probe_pandoc, check_options
+from conversion_metrics import stage, aggregate_metrics, JsonLinesMetrics
+from multi_format import parse_formats, format_output_path, convert_formats
+from conversion_journal import (
+    ConversionJournal,
+    DEFAULT_JOURNAL_FILE,
+    is_completed,
+    load_journal,
+    options_fingerprint
+)
+
+
+# 两步转换法预处理后添加在 HTML 开头的标记注释
+PREPROCESS_MARKER = '<!-- HTML tables have been preprocessed for conversion -->\n'
+
+# 在 AST 上完成两步转换法表格修复的 Lua 过滤器（见 table_filter.lua）
+TABLE_FILTER = scripts_dir / 'table_filter.lua'
+
+
+def convert_to_markdown(input_file, output_file=None, format_type='markdown', extra_args=None, cache_dir=None,
+                        pandoc_server=None, metrics=None, split=False, split_jobs=None, return_content=True,
+                        table_filter=False):
     """
     将文件转换为指定格式
 
     Args:
         input_file (str): 输入文件路径
         output_file (str, optional): 输出文件路径。如果为 None，则自动生成 .md 文件名
-        format_type (str): 输出格式，默认为 'markdown'，可选 'gfm', 'html' 等
+        format_type (str | list): 输出格式，默认为 'markdown'，可选 'gfm', 'html' 等。
+            指定多个格式（列表或逗号分隔，如 'gfm,markdown,grid'）时输入文件只解析一次，
+            从 JSON AST 分别渲染，各格式写入 doc.gfm.md、doc.grid.md 等文件（见 multi_format）
         extra_args (list, optional): 额外的 pandoc 参数
+        cache_dir (str, optional): 转换缓存目录，命中时直接复用上次的输出
+        pandoc_server (str, optional): 常驻 pandoc server 地址，服务不可用或参数不受支持时
+            自动回退为启动 pandoc 进程
+        metrics (callable, optional): 指标回调，每个阶段结束时收到一条记录（见 conversion_metrics）
+        split (bool): 分段并行转换，文档读取一次后按一级标题切分、并发写出再拼接（见 split_converter），
+            只支持 Markdown 输出格式，不使用 pandoc server
+        split_jobs (int, optional): 分段转换的并发 pandoc 进程数，默认为 CPU 核心数
+        return_content (bool): 为 False 时只返回输出文件的元数据（见 Returns）
+        table_filter (bool): 使用 table_filter.lua 在 AST 上完成两步转换法的表格修复（只有含零宽度列的
+            表格经 HTML 往返），一次 pandoc 转换即可得到与 --two-step 相同的表格，需要 pandoc 2.17 以上版本
 
     Returns:
-        str: 如果 output_file 为 None，返回转换内容；否则返回 None
+        str | dict: return_content 为 True 时与 pypandoc 一致（写入输出文件后为空字符串）；
+            为 False 时返回 {'input', 'output', 'output_bytes', 'duration', 'cache_hit'}。
+            多个格式时总是返回元数据，并包含 'outputs': {格式: 输出文件路径}
     """
+    # 在需要转换时才导入 pypandoc，--help 等不转换的调用无需付出导入和查找 pandoc 的开销
+    import pypandoc
+
+    start = time.perf_counter()
     input_path = Path(input_file).absolute()
 
     if not input_path.exists():
@@ -46,18 +99,79 @@ def convert_to_markdown(input_file, output_file=None, format_type='markdown', ex
         extra_args = [
             '--wrap=none',  # 不自动换行
         ]
+    if table_filter:
+        # 过滤器作为 pandoc 参数传入，缓存键随之区分
+        extra_args = list(extra_args) + [f'--lua-filter={TABLE_FILTER}']
 
     try:
+        # 先根据 pandoc 能力探测结果检查格式和参数，无效时不启动 pandoc
+        formats = parse_formats(format_type)
+        for name in formats:
+            check_options(name, extra_args)
+
+        if len(formats) > 1:
+            if split:
+                raise ValueError("分段转换不支持多种输出格式")
+            result = convert_formats(input_path, output_path, formats, extra_args, cache_dir=cache_dir,
+                                     pandoc_version=probe_pandoc()['version'], metrics=metrics)
+            outputs = result['outputs']
+            return {
+                'input': str(input_path),
+                'output': str(output_path),
+                'outputs': {name: str(path) for name, path in outputs.items()},
+                'output_bytes': sum(os.path.getsize(path) for path in outputs.values()),
+                'duration': time.perf_counter() - start,
+                'cache_hit': len(result['cache_hits']) == len(formats),
+            }
+        format_type = formats[0]
+
+        # 查找缓存
+        cache_key = None
+        if cache_dir is not None:
+            with stage(metrics, 'cache_lookup', input=str(input_path)) as record:
+                cache_key = make_cache_key(
+                    input_path, format_type, extra_args,
+                    pandoc_version=probe_pandoc()['version'],
+                    split=split
+                )
+                cache_hit = lookup_cache(cache_dir, cache_key, output_path)
+                record['result'] = 'hit' if cache_hit else 'miss'
+            if cache_hit:
+                print(f"[CACHE] 命中缓存: {input_path} -> {output_path} (格式: {format_type})")
+                return '' if return_content else _output_metadata(input_path, output_path, start, cache_hit=True)
+
         # 执行转换
-        content = pypandoc.convert_file(
-            str(input_path),
-            format_type,
-            outputfile=str(output_path),
-            extra_args=extra_args
-        )
+        with stage(metrics, 'convert', input=str(input_path), format=format_type) as record:
+            record['input_bytes'] = input_path
+            content = None
+            if split:
+                from split_converter import convert_split
+
+                split_result = convert_split(input_path, output_path, format_type, extra_args, jobs=split_jobs,
+                                             metrics=metrics)
+                record['backend'] = 'split'
+                record['sections'] = split_result['sections']
+                content = ''
+            elif pandoc_server is not None:
+                content = try_convert_file(pandoc_server, input_path, format_type, extra_args,
+                                           outputfile=str(output_path))
+                record['backend'] = 'pandoc' if content is None else 'server'
+            else:
+                record['backend'] = 'pandoc'
+            if content is None:
+                content = pypandoc.convert_file(
+                    str(input_path),
+                    format_type,
+                    outputfile=str(output_path),
+                    extra_args=extra_args
+                )
+            record['output_bytes'] = output_path
+
+        if cache_key is not None:
+            store_cache(cache_dir, cache_key, output_path)
 
         print(f"[OK] 转换成功: {input_path} -> {output_path} (格式: {format_type})")
-        return content
+        return content if return_content else _output_metadata(input_path, output_path, start)
 
     except Exception as e:
         print(f"[ERROR] 转换失败: {e}")
@@ -84,12 +198,138 @@ def preprocess_html_table(html_content):
     html_content = re.sub(r'<colgroup>\s*</colgroup>', '', html_content)
 
     # 添加注释标记，提示需要人工审查
-    html_content = '<!-- HTML tables have been preprocessed for conversion -->\n' + html_content
+    html_content = PREPROCESS_MARKER + html_content
 
     return html_content
 
 
-def convert_with_html_intermediate(input_file, output_file=None, temp_html=None, format_type='gfm', extra_args=None, preprocess=True):
+def _preprocess_html_stream(reader, writer):
+    """
+    preprocess_html_table() 的流式版本: 按块读取 reader、预处理后写入 writer，
+    结果与 preprocess_html_table() 相同，内存占用与文档大小无关
+    """
+    from preprocess_html import preprocess_html_stream
+
+    writer.write(PREPROCESS_MARKER)
+    preprocess_html_stream(reader, writer, collapse_whitespace=False, comment=False)
+
+
+def _output_metadata(input_path, output_path, start, cache_hit=False):
+    """return_content=False 时返回的元数据"""
+    return {
+        'input': str(input_path),
+        'output': str(output_path),
+        'output_bytes': os.path.getsize(output_path),
+        'duration': time.perf_counter() - start,
+        'cache_hit': cache_hit,
+    }
+
+
+def _stream_two_step(input_path, output_path, format_type, extra_args, preprocess, html_args=('--standalone',)):
+    """
+    两步转换的流式管道: 第一步 pandoc 输出的 HTML 从标准输出逐块读取、预处理后
+    直接写入第二步 pandoc 的标准输入，第二步将结果写入输出文件。
+    Python 中同时只保留一个块，内存占用由 pandoc 进程决定，与文档大小无关。
+    extra_args 用于第二步，html_args 用于第一步。
+    """
+    import shutil
+    import subprocess
+    from tempfile import TemporaryFile
+
+    pandoc_path = probe_pandoc()['path']
+    # 标准错误写入临时文件，避免 pandoc 输出大量警告时管道写满导致死锁
+    with TemporaryFile() as html_errors, TemporaryFile() as markdown_errors:
+        to_html = subprocess.Popen([pandoc_path, str(input_path), '-t', 'html', *html_args],
+                                   stdout=subprocess.PIPE, stderr=html_errors)
+        to_markdown = subprocess.Popen([pandoc_path, '-f', 'html', '-t', format_type, '-o', str(output_path),
+                                        *extra_args],
+                                       stdin=subprocess.PIPE, stderr=markdown_errors)
+        try:
+            reader = io.TextIOWrapper(to_html.stdout, encoding='utf-8')
+            writer = io.TextIOWrapper(to_markdown.stdin, encoding='utf-8')
+            try:
+                if preprocess:
+                    _preprocess_html_stream(reader, writer)
+                else:
+                    shutil.copyfileobj(reader, writer)
+                writer.close()
+            except BrokenPipeError:
+                # 第二步提前退出，错误信息在其标准错误中
+                pass
+            reader.close()
+        except BaseException:
+            to_html.kill()
+            to_markdown.kill()
+            raise
+        finally:
+            to_html.wait()
+            to_markdown.wait()
+
+        for process, errors in ((to_html, html_errors), (to_markdown, markdown_errors)):
+            if process.returncode != 0:
+                errors.seek(0)
+                message = errors.read().decode('utf-8', errors='replace').strip()
+                raise RuntimeError(f'Pandoc died with exitcode "{process.returncode}" during conversion: {message}')
+
+
+def _render_native_gfm(reader, output_path, before_replace=None):
+    """
+    用 html_to_gfm 原生渲染 reader 中的 HTML: 先写入输出文件旁的临时文件，成功后再替换，
+    不支持的内容导致回退时不会留下不完整的输出
+
+    Raises:
+        UnsupportedHtmlError: HTML 超出原生渲染支持的子集
+    """
+    from html_to_gfm import render_gfm
+
+    partial_path = output_path.with_name(output_path.name + '.partial')
+    try:
+        with open(partial_path, 'w', encoding='utf-8') as writer:
+            render_gfm(reader, writer)
+        if before_replace is not None:
+            before_replace()
+        os.replace(partial_path, output_path)
+    finally:
+        if partial_path.exists():
+            partial_path.unlink()
+
+
+def _stream_native_gfm(input_path, output_path, html_args=('--standalone',)):
+    """
+    只启动一个 pandoc 进程的管道转换: 第一步的 HTML 从标准输出逐块交给原生 GFM 渲染。
+    渲染器忽略列定义和注释，预处理不影响结果，因此这里跳过预处理。
+
+    Raises:
+        UnsupportedHtmlError: HTML 超出原生渲染支持的子集（pandoc 进程已结束，可以回退）
+    """
+    import subprocess
+    from tempfile import TemporaryFile
+
+    pandoc_path = probe_pandoc()['path']
+    with TemporaryFile() as errors:
+        to_html = subprocess.Popen([pandoc_path, str(input_path), '-t', 'html', *html_args],
+                                   stdout=subprocess.PIPE, stderr=errors)
+
+        def check_pandoc():
+            # 替换输出文件之前确认第一步成功，避免用截断的 HTML 渲染结果覆盖输出
+            to_html.stdout.close()
+            if to_html.wait() != 0:
+                errors.seek(0)
+                message = errors.read().decode('utf-8', errors='replace').strip()
+                raise RuntimeError(f'Pandoc died with exitcode "{to_html.returncode}" during conversion: {message}')
+
+        try:
+            _render_native_gfm(io.TextIOWrapper(to_html.stdout, encoding='utf-8'), output_path, check_pandoc)
+        except BaseException:
+            to_html.kill()
+            raise
+        finally:
+            to_html.wait()
+
+
+def convert_with_html_intermediate(input_file, output_file=None, temp_html=None, format_type='gfm', extra_args=None, preprocess=True, cache_dir=None,
+                                   in_memory=False, pandoc_server=None, html_content=None, metrics=None,
+                                   return_content=True, fast_gfm=False):
     """
     使用 HTML 作为中间格式的两步转换法
     专门用于处理复杂表格的转换问题
@@ -99,17 +339,39 @@ def convert_with_html_intermediate(input_file, output_file=None, temp_html=None,
         output_file (str, optional): 输出 MD 文件路径
         temp_html (str, optional): 中间 HTML 文件路径，如果为 None 则使用临时文件
         format_type (str): 最终输出格式，默认 'gfm' (GitHub Flavored Markdown)
-        extra_args (list, optional): 额外的 pandoc 参数
+        extra_args (list, optional): 额外的 pandoc 参数。读取阶段的参数（如 --extract-media，
+            见 split_converter.READER_OPTIONS）用于第一步，其余用于第二步
         preprocess (bool): 是否预处理 HTML 表格，默认 True
+        cache_dir (str, optional): 转换缓存目录，命中时直接复用上次的输出。
+            指定 temp_html 时不使用缓存（需要实际生成中间文件）
+        in_memory (bool): 内存模式，第一步的 HTML 从 pandoc 标准输出读取、在内存中预处理后
+            经标准输入交给第二步，不写中间文件；不能与 temp_html 同时使用
+        pandoc_server (str, optional): 常驻 pandoc server 地址，服务不可用或参数不受支持时
+            自动回退为启动 pandoc 进程
+        html_content (str, optional): 已有的第一步 HTML 结果（例如交互式分析时生成的），
+            提供时跳过第一步转换
+        metrics (callable, optional): 指标回调，每个阶段结束时收到一条记录（见 conversion_metrics）
+        return_content (bool): 为 False 时只返回输出文件的元数据。内存模式下（未使用 pandoc server
+            且未提供 html_content 时）两个 pandoc 进程直接以管道相连，HTML 逐块预处理，
+            不在 Python 中保留完整文档
+        fast_gfm (bool): 第二步使用 html_to_gfm 原生渲染，不再启动 pandoc。只用于 format_type 为 gfm
+            且参数只有 --wrap=none / ATX 标题的情况，HTML 超出支持的子集时自动回退为 pandoc
 
     Returns:
-        str: 转换后的 Markdown 内容
+        str | dict: return_content 为 True 时与 pypandoc 一致（写入输出文件后为空字符串）；
+            为 False 时返回 {'input', 'output', 'output_bytes', 'duration', 'cache_hit'}
     """
+    import pypandoc
+
+    start = time.perf_counter()
     input_path = Path(input_file).absolute()
 
     if not input_path.exists():
         raise FileNotFoundError(f"输入文件不存在: {input_file}")
 
+    if in_memory and temp_html is not None:
+        raise ValueError("内存模式不生成中间文件，不能同时指定 temp_html")
+
     # 如果未指定输出文件，自动生成
     if output_file is None:
         output_file = str(input_path.with_suffix('.md'))
@@ -119,61 +381,189 @@ def convert_with_html_intermediate(input_file, output_file=None, temp_html=None,
     # 确保输出目录存在
     output_path.parent.mkdir(parents=True, exist_ok=True)
 
-    # 确定中间 HTML 文件路径
-    if temp_html is None:
+    # 默认额外参数（推荐用于表格转换）
+    if extra_args is None:
+        extra_args = ['--wrap=none']
+
+    check_options(format_type, extra_args)
+
+    from split_converter import _split_args
+
+    # 读取阶段的参数（如 --extract-media）只在第一步读取输入文件时生效
+    reader_args, writer_args = _split_args(extra_args)
+    html_args = ['--standalone', *reader_args]
+
+    native = False
+    if fast_gfm:
+        from html_to_gfm import native_gfm_supported, UnsupportedHtmlError
+
+        native = native_gfm_supported(format_type, writer_args)
+        if not native:
+            print("[INFO] 原生 GFM 渲染只支持 gfm 格式和 --wrap=none 参数，第二步使用 pandoc")
+
+    # 查找缓存
+    cache_key = None
+    if cache_dir is not None and temp_html is None:
+        with stage(metrics, 'cache_lookup', input=str(input_path)) as record:
+            cache_key = make_cache_key(
+                input_path, format_type, extra_args,
+                two_step=True, preprocess=preprocess,
+                pandoc_version=probe_pandoc()['version'],
+                native_gfm=native
+            )
+            cache_hit = lookup_cache(cache_dir, cache_key, output_path)
+            record['result'] = 'hit' if cache_hit else 'miss'
+        if cache_hit:
+            print(f"[CACHE] 命中缓存: {input_path} -> {output_path} ({format_type})")
+            return '' if return_content else _output_metadata(input_path, output_path, start, cache_hit=True)
+
+    if in_memory and not return_content and pandoc_server is None and html_content is None:
+        # 不需要返回内容时，两步以管道相连，输出直接写入文件
+        print(f"[STEP 1-2] 管道转换: {input_path} -> HTML -> {output_path} ({format_type})")
+        try:
+            with stage(metrics, 'pipeline', input=str(input_path), format=format_type) as record:
+                record['input_bytes'] = input_path
+                record['backend'] = 'pandoc'
+                if native:
+                    try:
+                        _stream_native_gfm(input_path, output_path, html_args)
+                        record['backend'] = 'native'
+                    except UnsupportedHtmlError as e:
+                        print(f"[INFO] {e}，改用 pandoc 转换")
+                if record['backend'] == 'pandoc':
+                    _stream_two_step(input_path, output_path, format_type, writer_args, preprocess, html_args)
+                record['output_bytes'] = output_path
+        except Exception as e:
+            print(f"[ERROR] 两步转换失败: {e}")
+            raise
+        if cache_key is not None:
+            store_cache(cache_dir, cache_key, output_path)
+        print(f"[OK] 两步转换成功: {input_path} -> {output_path}")
+        return _output_metadata(input_path, output_path, start)
+
+    # 确定中间 HTML 文件路径（内存模式不使用中间文件）
+    remove_temp = temp_html is None and not in_memory
+    if in_memory:
+        temp_html_path = None
+    elif temp_html is None:
+        from tempfile import NamedTemporaryFile
+
         temp_file = NamedTemporaryFile(mode='w', suffix='.html', delete=False, encoding='utf-8')
         temp_html_path = Path(temp_file.name)
         temp_file.close()
     else:
         temp_html_path = Path(temp_html).absolute()
 
-    # 默认额外参数（推荐用于表格转换）
-    if extra_args is None:
-        extra_args = ['--wrap=none']
-
     try:
         # 第一步: DOCX -> HTML（保留完整表格结构）
-        print(f"[STEP 1] 转换: {input_path} -> {temp_html_path} (HTML)")
-        html_content = pypandoc.convert_file(
-            str(input_path),
-            'html',
-            outputfile=str(temp_html_path),
-            extra_args=['--standalone']
-        )
+        step1_output = None if in_memory else str(temp_html_path)
+        with stage(metrics, 'to_html', input=str(input_path)) as record:
+            record['input_bytes'] = input_path
+            if html_content is not None:
+                print(f"[STEP 1] 复用已有的 HTML 结果: {input_path}")
+                record['result'] = 'reused'
+                if step1_output is not None:
+                    with open(step1_output, 'w', encoding='utf-8') as f:
+                        f.write(html_content)
+            else:
+                print(f"[STEP 1] 转换: {input_path} -> {'内存' if in_memory else temp_html_path} (HTML)")
+                if pandoc_server is not None:
+                    html_content = try_convert_file(pandoc_server, input_path, 'html', html_args,
+                                                    outputfile=step1_output)
+                record['backend'] = 'pandoc' if html_content is None else 'server'
+                if html_content is None:
+                    html_content = pypandoc.convert_file(
+                        str(input_path),
+                        'html',
+                        outputfile=step1_output,
+                        extra_args=html_args
+                    )
+            record['output_bytes'] = html_content if in_memory else temp_html_path
 
         # 预处理 HTML 表格
         if preprocess:
             print("[STEP 1.5] 预处理 HTML 表格...")
-            with open(temp_html_path, 'r', encoding='utf-8') as f:
-                html_content = f.read()
-
-            processed_html = preprocess_html_table(html_content)
-
-            with open(temp_html_path, 'w', encoding='utf-8') as f:
-                f.write(processed_html)
+            with stage(metrics, 'preprocess', input=str(input_path)) as record:
+                if in_memory:
+                    record['input_bytes'] = html_content
+                    html_content = preprocess_html_table(html_content)
+                    record['output_bytes'] = html_content
+                else:
+                    # 逐块预处理到相邻的临时文件再替换，不把整个 HTML 读入内存
+                    record['input_bytes'] = temp_html_path
+                    processed_path = temp_html_path.with_name(temp_html_path.name + '.preprocessed')
+                    try:
+                        with open(temp_html_path, 'r', encoding='utf-8') as reader, \
+                                open(processed_path, 'w', encoding='utf-8') as writer:
+                            _preprocess_html_stream(reader, writer)
+                        os.replace(processed_path, temp_html_path)
+                    finally:
+                        if processed_path.exists():
+                            processed_path.unlink()
+                    record['output_bytes'] = temp_html_path
             print("[STEP 1.5] HTML 表格预处理完成")
 
         # 第二步: HTML -> MD（强制输出管道表）
-        print(f"[STEP 2] 转换: {temp_html_path} -> {output_path} ({format_type})")
-        markdown_content = pypandoc.convert_file(
-            str(temp_html_path),
-            format_type,
-            outputfile=str(output_path),
-            extra_args=extra_args
-        )
+        markdown_content = None
+        with stage(metrics, 'to_markdown', input=str(input_path), format=format_type) as record:
+            if native:
+                source = io.StringIO(html_content) if in_memory else open(temp_html_path, 'r', encoding='utf-8')
+                try:
+                    with source:
+                        _render_native_gfm(source, output_path)
+                    print(f"[STEP 2] 原生渲染: {'内存' if in_memory else temp_html_path} -> {output_path} (gfm)")
+                    markdown_content = ''
+                    record['input_bytes'] = html_content if in_memory else temp_html_path
+                    record['backend'] = 'native'
+                except UnsupportedHtmlError as e:
+                    print(f"[INFO] {e}，改用 pandoc 转换")
+
+            if markdown_content is None and in_memory:
+                print(f"[STEP 2] 转换: 内存 -> {output_path} ({format_type})")
+                record['input_bytes'] = html_content
+                if pandoc_server is not None:
+                    markdown_content = try_convert(pandoc_server, html_content, 'html', format_type, writer_args,
+                                                   outputfile=str(output_path))
+                record['backend'] = 'pandoc' if markdown_content is None else 'server'
+                if markdown_content is None:
+                    markdown_content = pypandoc.convert_text(
+                        html_content,
+                        format_type,
+                        format='html',
+                        outputfile=str(output_path),
+                        extra_args=writer_args
+                    )
+            elif markdown_content is None:
+                print(f"[STEP 2] 转换: {temp_html_path} -> {output_path} ({format_type})")
+                record['input_bytes'] = temp_html_path
+                if pandoc_server is not None:
+                    markdown_content = try_convert_file(pandoc_server, temp_html_path, format_type, writer_args,
+                                                        outputfile=str(output_path))
+                record['backend'] = 'pandoc' if markdown_content is None else 'server'
+                if markdown_content is None:
+                    markdown_content = pypandoc.convert_file(
+                        str(temp_html_path),
+                        format_type,
+                        outputfile=str(output_path),
+                        extra_args=writer_args
+                    )
+            record['output_bytes'] = output_path
+
+        if cache_key is not None:
+            store_cache(cache_dir, cache_key, output_path)
 
         print(f"[OK] 两步转换成功: {input_path} -> {output_path}")
-        return markdown_content
+        return markdown_content if return_content else _output_metadata(input_path, output_path, start)
 
     except Exception as e:
         print(f"[ERROR] 两步转换失败: {e}")
         # 清理临时文件
-        if temp_html is None and temp_html_path.exists():
+        if remove_temp and temp_html_path.exists():
             temp_html_path.unlink()
         raise
     finally:
         # 清理临时文件（如果不是用户指定的）
-        if temp_html is None and temp_html_path.exists():
+        if remove_temp and temp_html_path.exists():
             try:
                 temp_html_path.unlink()
                 print(f"[INFO] 已删除临时文件: {temp_html_path}")
@@ -181,79 +571,567 @@ def convert_with_html_intermediate(input_file, output_file=None, temp_html=None,
                 print(f"[WARNING] 无法删除临时文件: {e}")
 
 
-def batch_convert(input_pattern, output_dir=None, format_type='markdown', extra_args=None, use_two_step=False):
+def _init_worker(pandoc_path):
+    """批量转换工作进程的初始化: pypandoc 直接使用主进程已探测到的 pandoc，不再各自查找"""
+    os.environ.setdefault('PYPANDOC_PANDOC', pandoc_path)
+
+
+def _convert_one(input_file, output_file, use_two_step, options, capture_output=False, collect_metrics=False):
+    """
+    批量转换中的单个文件任务，可在工作进程中执行
+
+    Args:
+        input_file (str): 输入文件路径
+        output_file (str): 输出文件路径
+        use_two_step (bool): 是否使用两步转换法
+        options (dict): 传给转换函数的关键字参数（format_type、extra_args 等）
+        capture_output (bool): 是否捕获该文件的日志输出，由调用方统一打印
+        collect_metrics (bool): 是否收集各阶段的指标记录，随结果返回给调用方
+
+    Returns:
+        dict: {
+            'input': 输入文件路径,
+            'output': 输出文件路径,
+            'success': 是否成功,
+            'error': 错误信息（成功时为 None）,
+            'log': 捕获的日志文本（未捕获时为空字符串）,
+            'metrics': 指标记录列表（未收集时为空列表）,
+            'output_bytes': 输出文件大小（成功时）,
+            'duration': 转换耗时（秒，成功时）,
+            'media': 共享媒体库统计（成功且 options 中指定 media_store 时，见 media_store.collect_media）
+        }
+
+    说明:
+        options 中未指定 return_content 时按 False 转换: 输出直接写入文件，
+        结果只包含元数据，工作进程不保留转换后的完整文档
+    """
+    result = {
+        'input': input_file,
+        'output': output_file,
+        'success': False,
+        'error': None,
+        'log': '',
+        'metrics': []
+    }
+
+    metrics = result['metrics'].append if collect_metrics else None
+    buffer = io.StringIO() if capture_output else None
+    with redirect_stdout(buffer) if capture_output else nullcontext():
+        try:
+            with stage(metrics, 'file', input=input_file, two_step=use_two_step) as record:
+                record['input_bytes'] = Path(input_file)
+                convert = convert_with_html_intermediate if use_two_step else convert_to_markdown
+                options = {'return_content': False, **options}
+                if 'media_store' in options:
+                    converted = _convert_with_media_store(convert, input_file, output_file, metrics, options)
+                else:
+                    converted = convert(input_file, output_file, metrics=metrics, **options)
+                record['output_bytes'] = Path(output_file)
+            result['success'] = True
+            if isinstance(converted, dict):
+                result['output_bytes'] = converted['output_bytes']
+                result['duration'] = converted['duration']
+                if 'media' in converted:
+                    result['media'] = converted['media']
+        except Exception as e:
+            result['error'] = str(e)
+
+    if buffer is not None:
+        result['log'] = buffer.getvalue()
+
+    return result
+
+
+def _convert_with_media_store(convert, input_file, output_file, metrics, options):
+    """
+    转换单个文件，图片提取到共享媒体库（见 media_store）而不是每个文档各保存一份
+
+    图片先由 --extract-media 写入媒体库内的临时目录，转换完成后按内容哈希入库，
+    输出文档（多格式输出时为每个格式）中的图片路径改写为库中文件的相对路径
+
+    Returns:
+        dict: 转换函数返回的元数据，附加 'media' 统计
+    """
+    from media_store import extraction_dir, collect_media
+
+    options = dict(options)
+    store_dir = options.pop('media_store')
+    extra_args = options.get('extra_args')
+    if extra_args is None:
+        # 与转换函数的默认参数一致
+        extra_args = ['--wrap=none']
+
+    with extraction_dir(store_dir) as extract_dir:
+        options['extra_args'] = list(extra_args) + [f'--extract-media={extract_dir}']
+        converted = convert(input_file, output_file, metrics=metrics, **options)
+        output_files = list(converted.get('outputs', {}).values()) or [output_file]
+        with stage(metrics, 'media_store', input=input_file) as record:
+            media = collect_media(store_dir, extract_dir, output_files)
+            record.update(media)
+
+    converted['media'] = media
+    converted['output_bytes'] = sum(Path(path).stat().st_size for path in output_files)
+    return converted
+
+
+def _reuse_output(input_file, output_file, original, original_output, formats, collect_metrics=False):
+    """
+    重复的输入文件复用内容相同的原件的输出（见 batch_convert 的 dedupe 参数）
+
+    Returns:
+        dict: 与 _convert_one 相同结构的结果，附加 'duplicate_of'（原件路径）
+    """
+    result = {
+        'input': input_file,
+        'output': output_file,
+        'success': False,
+        'error': None,
+        'log': '',
+        'metrics': [],
+        'duplicate_of': original['input']
+    }
+    if not original['success']:
+        result['error'] = f"与 {original['input']} 内容相同，该文件转换失败: {original['error']}"
+        return result
+
+    if len(formats) > 1:
+        pairs = [(format_output_path(original_output, name), format_output_path(output_file, name))
+                 for name in formats]
+    else:
+        pairs = [(original_output, output_file)]
+    try:
+        with stage(result['metrics'].append if collect_metrics else None, 'duplicate',
+                   input=input_file) as record:
+            record['input_bytes'] = Path(input_file)
+            for source, target in pairs:
+                _link_output(source, target)
+            result['output_bytes'] = sum(Path(target).stat().st_size for _, target in pairs)
+            record['output_bytes'] = result['output_bytes']
+            record['result'] = 'reused'
+        result['success'] = True
+        print(f"[OK] 内容与 {original['input']} 相同，复用输出: {input_file} -> {output_file}")
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+
+def _batch_output_path(input_file, output_dir, base_dir='.'):
+    """
+    批量转换中输入文件对应的输出路径
+
+    指定输出目录时保留输入文件相对模式基础目录的子目录结构（如 'docs/**/*.docx' 中
+    docs/a/x.docx 输出为 <output_dir>/a/x.md），避免不同子目录中的同名文件互相覆盖
+    """
+    input_path = Path(input_file)
+    if output_dir:
+        relative = Path(os.path.relpath(input_path, base_dir))
+        if relative.parts and relative.parts[0] == os.pardir:
+            relative = Path(input_path.name)
+        return str(Path(output_dir) / relative.with_suffix('.md'))
+    return str(input_path.with_suffix('.md'))
+
+
+def _link_output(source, target):
+    """
+    将已生成的输出文件硬链接（不支持时复制）到另一个输出路径，已有的目标文件被原子替换
+    """
+    import shutil
+
+    target_path = Path(target)
+    target_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = target_path.with_name(f"{target_path.name}.{os.getpid()}.tmp")
+    try:
+        try:
+            os.link(source, temp_path)
+        except OSError:
+            shutil.copyfile(source, temp_path)
+        os.replace(temp_path, target_path)
+    finally:
+        if temp_path.exists():
+            temp_path.unlink()
+
+
+def batch_convert(input_pattern, output_dir=None, format_type='markdown', extra_args=None, use_two_step=False, jobs=1,
+                  cache_dir=None, cache_max_bytes=DEFAULT_CACHE_MAX_BYTES, in_memory=False, pandoc_server=None,
+                  metrics=None, split=False, journal=None, resume=False, include=None, exclude=None,
+                  max_in_flight=None, fast_gfm=False, table_filter=False, media_store=None, dedupe=False):
     """
     批量转换文件
 
     Args:
-        input_pattern (str): 输入文件模式（支持通配符）
+        input_pattern (str): 输入文件模式（支持通配符，** 匹配任意层目录，如 'docs/**/*.docx'）
         output_dir (str, optional): 输出目录
-        format_type (str): 输出格式，默认 'markdown'
+        format_type (str | list): 输出格式，默认 'markdown'；多个格式时每个文件只解析一次
+            （见 convert_to_markdown），不能与两步转换法或转换日志同时使用
         extra_args (list, optional): 额外的 pandoc 参数
         use_two_step (bool): 是否使用两步转换法（处理表格问题）
+        jobs (int): 并发工作进程数，默认 1（顺序执行）；0 或 None 表示使用全部 CPU 核心
+        cache_dir (str, optional): 转换缓存目录，未修改的文件直接复用上次的输出
+        cache_max_bytes (int): 缓存容量上限，批量结束后按最近使用时间淘汰超出部分
+        in_memory (bool): 两步转换法使用内存模式，不写中间 HTML 文件
+        pandoc_server (str, optional): 常驻 pandoc server 地址；传入 'auto' 时在本机启动一个服务，
+            批量结束后关闭，所有文件（包括各工作进程）共用该服务
+        metrics (callable, optional): 指标回调。各文件（包括工作进程中）的阶段记录统一由主进程
+            转发给该回调，批量结束时再发送一条 stage 为 'batch' 的汇总记录
+        split (bool): 单步转换时对每个文件使用分段并行转换（见 convert_to_markdown 的 split 参数）
+        journal (str, optional): 转换日志文件路径，逐个记录文件的开始和结束（见 conversion_journal）
+        resume (bool): 从日志恢复，跳过已按相同选项完成且输入输出均未变化的文件，
+            只重新转换中断或失败的文件；未指定 journal 时使用输出目录下的 .convert_journal.jsonl
+        include (list, optional): 包含过滤，文件名或相对路径须匹配其中之一（见 file_discovery.iter_files）
+        exclude (list, optional): 排除过滤，匹配的文件跳过，匹配的目录不遍历
+        max_in_flight (int, optional): 同时提交给工作进程的文件数上限，默认为 jobs 的 4 倍。
+            文件边遍历边转换: 遍历在后台线程中进行，结果放入同样容量的有界队列，队列满时暂停
+        fast_gfm (bool): 两步转换法的第二步使用原生 GFM 渲染（见 convert_with_html_intermediate）
+        table_filter (bool): 单步转换时使用表格规范化过滤器（见 convert_to_markdown 的 table_filter 参数）
+        media_store (str, optional): 共享媒体库目录。文档中的图片按内容哈希存入该目录，相同的图片
+            只保存一份，输出中的图片路径改写为库中文件的相对路径（见 media_store）。
+            输出引用库中的文件，因此不使用转换缓存
+        dedupe (bool): 检测内容相同的输入文件。文件在遍历时计算内容哈希，每种内容只转换一次，
+            其余副本在整批转换结束后将该次的输出硬链接（不支持时复制）到各自的输出路径；
+            原件转换失败时副本同样记为失败
+
+    Returns:
+        dict: {
+            'total': 本次转换的文件数,
+            'succeeded': 成功数量,
+            'failed': 失败数量,
+            'skipped': 恢复时跳过的已完成文件数,
+            'duplicates': 内容与其他文件相同、直接复用输出的文件数（即节省的转换次数）,
+            'results': 每个文件的转换结果列表（按文件发现顺序，复用输出的重复文件排在最后，
+                带有 'duplicate_of' 字段）,
+            'media': 共享媒体库汇总（见 media_store.collect_media，未指定 media_store 时为 None）,
+            'metrics': 按阶段汇总的指标（见 aggregate_metrics，未指定 metrics 时为 None）
+        }
     """
-    from glob import glob
+    from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+    from itertools import chain
+
+    from file_discovery import iter_files, pattern_base, prefetch
 
-    files = glob(input_pattern)
-    if not files:
-        print(f"未找到匹配的文件: {input_pattern}")
-        return
+    # 在转换任何文件之前检查格式和参数，无效时整批立即失败，而不是每个文件各启动一次 pandoc 后失败
+    try:
+        pandoc_path = probe_pandoc()['path']
+        filter_args = [f'--lua-filter={TABLE_FILTER}'] if table_filter else []
+        if media_store is not None:
+            if any(arg.split('=', 1)[0] == '--extract-media' for arg in extra_args or []):
+                raise ValueError("共享媒体库不能与 --extract-media 参数同时使用")
+            filter_args.append(f'--extract-media={media_store}')
+        formats = parse_formats(format_type)
+        for name in formats:
+            check_options(name, list(extra_args or []) + filter_args)
+        if len(formats) > 1 and (use_two_step or journal is not None or resume):
+            raise ValueError("多种输出格式不能与两步转换法或转换日志同时使用")
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] 无法开始批量转换: {e}")
+        raise
 
-    print(f"找到 {len(files)} 个文件待转换")
+    if resume and journal is None:
+        journal = str(Path(output_dir or '.') / DEFAULT_JOURNAL_FILE)
+    fingerprint = options_fingerprint(format_type, extra_args, use_two_step, split and not use_two_step,
+                                      fast_gfm and use_two_step, table_filter and not use_two_step, media_store)
+    entries = load_journal(journal) if resume else None
 
-    for file_path in files:
-        input_path = Path(file_path)
+    if not jobs or jobs < 0:
+        jobs = os.cpu_count() or 1
+    if not max_in_flight or max_in_flight < 0:
+        max_in_flight = jobs * 4
 
-        # 确定输出文件路径
-        if output_dir:
-            output_path = Path(output_dir) / f"{input_path.stem}.md"
+    options = {
+        'format_type': format_type,
+        'extra_args': extra_args,
+        'cache_dir': cache_dir,
+        'pandoc_server': pandoc_server
+    }
+    if use_two_step:
+        options['in_memory'] = in_memory
+        if fast_gfm:
+            options['fast_gfm'] = True
+    else:
+        if split:
+            options['split'] = True
+            # 多进程批量时平分 CPU，避免进程数成倍超额
+            options['split_jobs'] = max(1, (os.cpu_count() or 1) // jobs)
+        if table_filter:
+            options['table_filter'] = True
+    if media_store is not None:
+        options['media_store'] = media_store
+        if cache_dir is not None:
+            # 缓存的输出引用的是已删除的临时提取目录
+            print("[INFO] 使用共享媒体库时不使用转换缓存")
+            options['cache_dir'] = None
+
+    # 边遍历边转换: 匹配的文件经有界队列逐个交给转换循环，不预先收集完整的文件列表
+    counts = {'skipped': 0}
+    base_dir = pattern_base(input_pattern)
+    # 重复检测: 内容哈希 -> 首个该内容文件的 (输入路径, 输出路径)，以及等待复用输出的重复文件
+    originals = {}
+    duplicates = []
+
+    def discover():
+        for file_path in iter_files(input_pattern, include, exclude):
+            output_file = _batch_output_path(file_path, output_dir, base_dir)
+            # 恢复模式: 跳过日志中已完成的文件
+            if entries is not None and is_completed(entries.get(str(Path(file_path).absolute())), file_path,
+                                                    output_file, fingerprint):
+                counts['skipped'] += 1
+                continue
+            if dedupe:
+                # 在遍历线程中计算哈希，与转换并行进行
+                try:
+                    digest = bytes.fromhex(hash_file(file_path))
+                except OSError:
+                    digest = None
+                original = originals.get(digest)
+                # 使用共享媒体库时图片链接是相对输出目录的路径，只在同一目录内复用输出
+                if original is not None and (media_store is None
+                                             or Path(original[1]).parent == Path(output_file).parent):
+                    duplicates.append((file_path, output_file, original))
+                    continue
+                if digest is not None:
+                    originals.setdefault(digest, (file_path, output_file))
+            yield (file_path, output_file, use_two_step, options)
+
+    discovery = prefetch(discover(), max_in_flight)
+    first_task = next(discovery, None)
+    if first_task is None:
+        if counts['skipped']:
+            print(f"[OK] 批量转换完成: 所有 {counts['skipped']} 个文件均已转换 ({journal})")
         else:
-            output_path = input_path.with_suffix('.md')
+            print(f"未找到匹配的文件: {input_pattern}")
+        return {'total': 0, 'succeeded': 0, 'failed': 0, 'skipped': counts['skipped'], 'duplicates': 0,
+                'results': [], 'media': None, 'metrics': None}
+    tasks = chain([first_task], discovery)
+
+    print(f"开始批量转换: {input_pattern}" + (f" (并发进程数: {jobs})" if jobs > 1 else ""))
+    if resume:
+        print(f"[INFO] 从日志恢复，已完成的文件将被跳过: {journal}")
+
+    launched_server = None
+    if pandoc_server == 'auto':
+        try:
+            launched_server = PandocServer.launch()
+            options['pandoc_server'] = launched_server.url
+            print(f"[INFO] 已启动 pandoc server: {launched_server.url}")
+        except Exception as e:
+            print(f"[WARNING] 无法启动 pandoc server: {e}，回退为逐个启动 pandoc")
+            options['pandoc_server'] = None
 
-        # 选择转换方法
-        if use_two_step:
-            convert_with_html_intermediate(str(input_path), str(output_path), format_type=format_type, extra_args=extra_args)
+    conversion_journal = ConversionJournal(journal) if journal is not None else None
+    collect_metrics = metrics is not None
+    results = []
+
+    def start_task(task):
+        if conversion_journal is not None:
+            conversion_journal.start(task[0], task[1], fingerprint)
+        results.append(None)
+        return len(results) - 1
+
+    def finish_task(index, result):
+        results[index] = result
+        # 日志和指标记录只由主进程写出，避免多个进程同时写同一个文件
+        if conversion_journal is not None:
+            conversion_journal.finish(result['input'], result['output'], fingerprint, result['success'],
+                                      result['error'])
+        if result['log']:
+            sys.stdout.write(result['log'])
+            sys.stdout.flush()
+        for record in result['metrics']:
+            metrics(record)
+
+    batch_start = time.perf_counter()
+    try:
+        if jobs == 1:
+            for task in tasks:
+                index = start_task(task)
+                finish_task(index, _convert_one(*task, collect_metrics=collect_metrics))
         else:
-            convert_to_markdown(str(input_path), str(output_path), format_type=format_type, extra_args=extra_args)
+            # 每个文件的日志在工作进程中捕获，完成后整块输出，避免多进程日志交错；
+            # 同时提交的任务不超过 max_in_flight 个，等待中的任务不会无限堆积
+            with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                     initargs=(pandoc_path,)) as executor:
+                in_flight = {}
+
+                def collect(return_when):
+                    done, _ = wait(in_flight, return_when=return_when)
+                    for future in done:
+                        index, task = in_flight.pop(future)
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            # 工作进程异常退出等无法在任务内部捕获的错误
+                            result = {'input': task[0], 'output': task[1], 'success': False, 'error': str(e),
+                                      'log': '', 'metrics': []}
+                        finish_task(index, result)
+
+                for task in tasks:
+                    if len(in_flight) >= max_in_flight:
+                        collect(FIRST_COMPLETED)
+                    future = executor.submit(_convert_one, *task, capture_output=True,
+                                             collect_metrics=collect_metrics)
+                    in_flight[future] = (start_task(task), task)
+                while in_flight:
+                    collect(FIRST_COMPLETED)
+
+        if duplicates:
+            # 所有原件都已转换完成，重复文件直接复用其输出
+            by_input = {r['input']: r for r in results}
+            for file_path, output_file, (original_input, original_output) in duplicates:
+                index = start_task((file_path, output_file))
+                finish_task(index, _reuse_output(file_path, output_file, by_input[original_input],
+                                                 original_output, formats, collect_metrics))
+    finally:
+        # 提前结束时（例如 Ctrl+C）停止后台遍历
+        discovery.close()
+        if conversion_journal is not None:
+            conversion_journal.close()
+        if launched_server is not None:
+            launched_server.close()
+
+    skipped = counts['skipped']
+    if duplicates:
+        print(f"[INFO] 重复的输入文件: {len(duplicates)} 个，节省 {len(duplicates)} 次转换")
+
+    if cache_dir is not None:
+        removed = prune_cache(cache_dir, cache_max_bytes)
+        if removed:
+            print(f"[INFO] 已淘汰 {removed} 个缓存条目: {cache_dir}")
+
+    failed = [r for r in results if not r['success']]
+    summary = {
+        'total': len(results),
+        'succeeded': len(results) - len(failed),
+        'failed': len(failed),
+        'skipped': skipped,
+        'duplicates': len(duplicates),
+        'results': results,
+        'media': None,
+        'metrics': None
+    }
+
+    if media_store is not None:
+        media = {'files': 0, 'stored': 0, 'deduplicated': 0, 'bytes_saved': 0}
+        for r in results:
+            for key, value in r.get('media', {}).items():
+                media[key] += value
+        summary['media'] = media
+        print(f"[INFO] 共享媒体库: 提取 {media['files']} 个文件，新写入 {media['stored']} 个，"
+              f"去重 {media['deduplicated']} 个（节省 {media['bytes_saved'] / 1024 / 1024:.1f} MB）: {media_store}")
+
+    if collect_metrics:
+        summary['metrics'] = aggregate_metrics([record for r in results for record in r['metrics']])
+        metrics({
+            'stage': 'batch',
+            'input': input_pattern,
+            'duration': time.perf_counter() - batch_start,
+            'time': time.time(),
+            'jobs': jobs,
+            'total': summary['total'],
+            'succeeded': summary['succeeded'],
+            'failed': summary['failed'],
+            'skipped': skipped,
+            'result': 'ok' if not failed else 'error',
+            'stages': summary['metrics'],
+        })
+
+    skipped_note = f"，跳过已完成 {skipped}" if skipped else ""
+    if failed:
+        print(f"[WARNING] 批量转换完成: 成功 {summary['succeeded']}/{summary['total']}，失败 {summary['failed']}"
+              f"{skipped_note}")
+        for r in failed:
+            print(f"  - {r['input']}: {r['error']}")
+    else:
+        print(f"[OK] 批量转换完成: 成功 {summary['succeeded']}/{summary['total']}{skipped_note}")
+
+    return summary
+
+
+def _print_usage():
+    """输出命令行用法"""
+    print("用法:")
+    print("  # 单文件转换（默认 Markdown）")
+    print("  python convert_to_markdown.py <input_file> [output_file]")
+    print("")
+    print("  # 指定输出格式")
+    print("  python convert_to_markdown.py --format gfm <input_file> [output_file]")
+    print("")
+    print("  # 两步转换法（处理复杂表格）")
+    print("  python convert_to_markdown.py --two-step <input_file> [output_file]")
+    print("  python convert_to_markdown.py --two-step --in-memory <input_file> [output_file]  # 不写中间 HTML 文件")
+    print("  python convert_to_markdown.py --fast-gfm <input_file> [output_file]  # 两步法输出 GFM，第二步原生渲染")
+    print("")
+    print("  # 单次转换完成两步法的表格修复（pandoc Lua 过滤器）")
+    print("  python convert_to_markdown.py --table-filter --format gfm <input_file> [output_file]")
+    print("")
+    print("  # 一次解析，输出多种格式（doc.gfm.md、doc.markdown.md、doc.grid.md）")
+    print("  python convert_to_markdown.py --format gfm,markdown,grid <input_file> [output_file]")
+    print("")
+    print("  # 超大文档分段并行转换（按一级标题切分）")
+    print("  python convert_to_markdown.py --split [--jobs N] <input_file> [output_file]")
+    print("")
+    print("  # 分步执行（高级用法）")
+    print("  python convert_to_markdown.py --step1 --format html <input_file> temp.html")
+    print("  python convert_to_markdown.py --step2 --format gfm temp.html output.md")
+    print("")
+    print("  # 批量转换")
+    print("  python convert_to_markdown.py --batch <input_pattern> [output_dir]")
+    print("  python convert_to_markdown.py --batch --two-step <input_pattern> [output_dir]")
+    print("  python convert_to_markdown.py --batch --jobs 4 <input_pattern> [output_dir]")
+    print("  python convert_to_markdown.py --batch 'docs/**/*.docx' --exclude drafts --include '*.docx' [output_dir]  # 递归匹配与过滤")
+    print("  python convert_to_markdown.py --batch --cache-dir <cache_dir> <input_pattern> [output_dir]")
+    print("  python convert_to_markdown.py --batch --pandoc-server auto <input_pattern> [output_dir]")
+    print("  python convert_to_markdown.py --batch --metrics metrics.jsonl <input_pattern> [output_dir]")
+    print("  python convert_to_markdown.py --batch --journal journal.jsonl <input_pattern> [output_dir]")
+    print("  python convert_to_markdown.py --batch --resume [--journal journal.jsonl] <input_pattern> [output_dir]  # 中断后继续")
+    print("  python convert_to_markdown.py --batch --extract-media <media_dir> <input_pattern> [output_dir]  # 图片按内容去重存入共享目录")
+    print("  python convert_to_markdown.py --batch --dedupe <input_pattern> [output_dir]  # 内容相同的文件只转换一次")
+    print("")
+    print("  # 监视模式（只转换新增或修改的文件）")
+    print("  python convert_to_markdown.py --watch <input_pattern> [output_dir]")
+    print("  python convert_to_markdown.py --watch --interval 5 --on-delete remove <input_pattern> [output_dir]")
+    print("  python convert_to_markdown.py --watch --once <input_pattern> [output_dir]  # 处理完当前变化后退出")
+    print("")
+    print("示例:")
+    print("  python convert_to_markdown.py document.docx")
+    print("  python convert_to_markdown.py document.docx output.md")
+    print("  python convert_to_markdown.py --format gfm document.docx")
+    print("  python convert_to_markdown.py --two-step docx_with_tables.docx output.md")
+    print("  python convert_to_markdown.py --step1 --format html doc.docx temp.html")
+    print("  python convert_to_markdown.py --step2 --format gfm temp.html output.md")
+    print("  python convert_to_markdown.py --batch '*.docx' ./output/")
+    print("  python convert_to_markdown.py --batch --two-step '*.docx' ./output/")
+    print("  python convert_to_markdown.py --batch --jobs 0 '*.docx' ./output/   # 0 表示使用全部 CPU 核心")
 
 
 def main():
     """命令行入口"""
-    if len(sys.argv) < 2:
-        print("用法:")
-        print("  # 单文件转换（默认 Markdown）")
-        print("  python convert_to_markdown.py <input_file> [output_file]")
-        print("")
-        print("  # 指定输出格式")
-        print("  python convert_to_markdown.py --format gfm <input_file> [output_file]")
-        print("")
-        print("  # 两步转换法（处理复杂表格）")
-        print("  python convert_to_markdown.py --two-step <input_file> [output_file]")
-        print("")
-        print("  # 分步执行（高级用法）")
-        print("  python convert_to_markdown.py --step1 --format html <input_file> temp.html")
-        print("  python convert_to_markdown.py --step2 --format gfm temp.html output.md")
-        print("")
-        print("  # 批量转换")
-        print("  python convert_to_markdown.py --batch <input_pattern> [output_dir]")
-        print("  python convert_to_markdown.py --batch --two-step <input_pattern> [output_dir]")
-        print("")
-        print("示例:")
-        print("  python convert_to_markdown.py document.docx")
-        print("  python convert_to_markdown.py document.docx output.md")
-        print("  python convert_to_markdown.py --format gfm document.docx")
-        print("  python convert_to_markdown.py --two-step docx_with_tables.docx output.md")
-        print("  python convert_to_markdown.py --step1 --format html doc.docx temp.html")
-        print("  python convert_to_markdown.py --step2 --format gfm temp.html output.md")
-        print("  python convert_to_markdown.py --batch '*.docx' ./output/")
-        print("  python convert_to_markdown.py --batch --two-step '*.docx' ./output/")
-        sys.exit(1)
+    if len(sys.argv) < 2 or sys.argv[1] in ('-h', '--help'):
+        _print_usage()
+        sys.exit(0 if len(sys.argv) >= 2 else 1)
 
     # 解析参数
     args = sys.argv[1:]
-    mode = 'single'  # single, batch, step1, step2
+    mode = 'single'  # single, batch, watch, step1, step2
     format_type = 'markdown'
     use_two_step = False
+    split = False
+    jobs = 1
+    cache_dir = None
+    in_memory = False
+    fast_gfm = False
+    table_filter = False
+    media_store = None
+    dedupe = False
+    pandoc_server = None
+    metrics_file = None
+    journal_file = None
+    resume = False
+    include = []
+    exclude = []
+    watch_interval = 2.0
+    watch_settle = 2.0
+    watch_once = False
+    state_file = None
+    on_delete = 'flag'
     input_file = None
     output_file = None
     input_pattern = None
@@ -265,67 +1143,204 @@ def main():
 
         if arg == '--batch':
             mode = 'batch'
+        elif arg == '--watch':
+            mode = 'watch'
+        elif arg == '--once':
+            watch_once = True
+        elif arg in ('--interval', '--settle'):
+            if i + 1 < len(args):
+                try:
+                    value = float(args[i + 1])
+                except ValueError:
+                    print(f"错误: {arg} 需要数字参数: {args[i + 1]}")
+                    sys.exit(1)
+                if arg == '--interval':
+                    watch_interval = value
+                else:
+                    watch_settle = value
+                i += 1
+        elif arg == '--state-file':
+            if i + 1 < len(args):
+                state_file = args[i + 1]
+                i += 1
+        elif arg == '--on-delete':
+            if i + 1 < len(args):
+                on_delete = args[i + 1]
+                if on_delete not in ('remove', 'flag'):
+                    print(f"错误: --on-delete 只能是 remove 或 flag: {on_delete}")
+                    sys.exit(1)
+                i += 1
         elif arg == '--step1':
             mode = 'step1'
         elif arg == '--step2':
             mode = 'step2'
         elif arg == '--two-step':
             use_two_step = True
+        elif arg == '--split':
+            split = True
+        elif arg == '--in-memory':
+            in_memory = True
+        elif arg == '--fast-gfm':
+            fast_gfm = True
+        elif arg == '--table-filter':
+            table_filter = True
         elif arg == '--format':
             if i + 1 < len(args):
                 format_type = args[i + 1]
                 i += 1
+        elif arg == '--jobs':
+            if i + 1 < len(args):
+                try:
+                    jobs = int(args[i + 1])
+                except ValueError:
+                    print(f"错误: --jobs 需要整数参数: {args[i + 1]}")
+                    sys.exit(1)
+                i += 1
+        elif arg == '--cache-dir':
+            if i + 1 < len(args):
+                cache_dir = args[i + 1]
+                i += 1
+        elif arg == '--extract-media':
+            if i + 1 < len(args):
+                media_store = args[i + 1]
+                i += 1
+        elif arg == '--pandoc-server':
+            if i + 1 < len(args):
+                pandoc_server = args[i + 1]
+                i += 1
+        elif arg == '--metrics':
+            if i + 1 < len(args):
+                metrics_file = args[i + 1]
+                i += 1
+        elif arg == '--journal':
+            if i + 1 < len(args):
+                journal_file = args[i + 1]
+                i += 1
+        elif arg == '--resume':
+            resume = True
+        elif arg == '--dedupe':
+            dedupe = True
+        elif arg in ('--include', '--exclude'):
+            if i + 1 < len(args):
+                (include if arg == '--include' else exclude).append(args[i + 1])
+                i += 1
+        elif arg in ('-h', '--help'):
+            _print_usage()
+            sys.exit(0)
         elif arg.startswith('-'):
             print(f"未知参数: {arg}")
             sys.exit(1)
-        elif input_file is None and mode != 'batch':
+        elif input_file is None and mode not in ('batch', 'watch'):
             input_file = arg
-        elif output_file is None and mode != 'batch':
+        elif output_file is None and mode not in ('batch', 'watch'):
             output_file = arg
-        elif input_pattern is None and mode == 'batch':
+        elif input_pattern is None and mode in ('batch', 'watch'):
             input_pattern = arg
-        elif output_dir is None and mode == 'batch':
+        elif output_dir is None and mode in ('batch', 'watch'):
             output_dir = arg
 
         i += 1
 
-    # 根据模式执行转换
-    if mode == 'batch':
-        # 批量转换模式
-        if input_pattern is None:
-            input_pattern = '*.docx'
-        batch_convert(input_pattern, output_dir, format_type=format_type, use_two_step=use_two_step)
-
-    elif mode == 'step1':
-        # 第一步：转换为 HTML
-        if input_file is None:
-            print("错误: --step1 模式需要指定输入文件")
-            sys.exit(1)
-        if output_file is None:
-            output_file = str(Path(input_file).with_suffix('.html'))
-        convert_to_markdown(input_file, output_file, format_type='html')
-
-    elif mode == 'step2':
-        # 第二步：HTML 转 MD
-        if input_file is None:
-            print("错误: --step2 模式需要指定输入文件")
-            sys.exit(1)
-        if output_file is None:
-            output_file = str(Path(input_file).with_suffix('.md'))
-        convert_to_markdown(input_file, output_file, format_type=format_type)
+    if fast_gfm:
+        # 原生渲染是两步转换法第二步的快速路径，只输出 GFM
+        use_two_step = True
+        if '--format' not in args:
+            format_type = 'gfm'
 
-    else:
-        # 单文件转换模式
-        if input_file is None:
-            print("错误: 需要指定输入文件")
-            sys.exit(1)
+    if split and use_two_step:
+        print("错误: --split 不能与 --two-step 同时使用")
+        sys.exit(1)
+    if len(parse_formats(format_type)) > 1 and (use_two_step or mode in ('watch', 'step1', 'step2')):
+        print("错误: 多种输出格式只用于单步的单文件和批量转换")
+        sys.exit(1)
+    if table_filter and use_two_step:
+        print("错误: --table-filter 用于替代两步转换法，不能与 --two-step 同时使用")
+        sys.exit(1)
+    if media_store is not None and mode != 'batch':
+        print("错误: --extract-media 共享媒体库只用于批量转换")
+        sys.exit(1)
+
+    # 根据模式执行转换，指标记录以 JSON Lines 格式追加写入 --metrics 指定的文件
+    with JsonLinesMetrics(metrics_file) if metrics_file else nullcontext() as metrics:
+        if mode == 'batch':
+            # 批量转换模式
+            if input_pattern is None:
+                input_pattern = '*.docx'
+            try:
+                summary = batch_convert(input_pattern, output_dir, format_type=format_type, use_two_step=use_two_step,
+                                        jobs=jobs, cache_dir=cache_dir, in_memory=in_memory,
+                                        pandoc_server=pandoc_server, metrics=metrics, split=split,
+                                        journal=journal_file, resume=resume, include=include,
+                                        exclude=exclude, fast_gfm=fast_gfm, table_filter=table_filter,
+                                        media_store=media_store, dedupe=dedupe)
+            except (OSError, ValueError):
+                sys.exit(1)
+            if summary['failed']:
+                sys.exit(1)
+
+        elif mode == 'watch':
+            # 监视模式
+            from watch_converter import Watcher
+
+            if input_pattern is None:
+                input_pattern = '*.docx'
+            # 监视模式只连接已运行的服务
+            if pandoc_server == 'auto':
+                pandoc_server = None
+            options = {'format_type': format_type, 'cache_dir': cache_dir, 'pandoc_server': pandoc_server}
+            if use_two_step:
+                options['in_memory'] = in_memory
+                if fast_gfm:
+                    options['fast_gfm'] = True
+            elif table_filter:
+                options['table_filter'] = True
+            watcher = Watcher(input_pattern, output_dir, state_file=state_file, use_two_step=use_two_step,
+                              options=options, settle=watch_settle, on_delete=on_delete, metrics=metrics,
+                              include=include, exclude=exclude)
+            watcher.run(interval=watch_interval, once=watch_once)
+
+        elif mode == 'step1':
+            # 第一步：转换为 HTML
+            if input_file is None:
+                print("错误: --step1 模式需要指定输入文件")
+                sys.exit(1)
+            if output_file is None:
+                output_file = str(Path(input_file).with_suffix('.html'))
+            convert_to_markdown(input_file, output_file, format_type='html', metrics=metrics)
+
+        elif mode == 'step2':
+            # 第二步：HTML 转 MD
+            if input_file is None:
+                print("错误: --step2 模式需要指定输入文件")
+                sys.exit(1)
+            if output_file is None:
+                output_file = str(Path(input_file).with_suffix('.md'))
+            convert_to_markdown(input_file, output_file, format_type=format_type, metrics=metrics)
 
-        if use_two_step:
-            # 使用两步转换法
-            convert_with_html_intermediate(input_file, output_file, format_type=format_type)
         else:
-            # 普通转换
-            convert_to_markdown(input_file, output_file, format_type=format_type)
+            # 单文件转换模式
+            if input_file is None:
+                print("错误: 需要指定输入文件")
+                sys.exit(1)
+
+            # 单文件转换只连接已运行的服务，不为一次转换启动服务
+            if pandoc_server == 'auto':
+                pandoc_server = None
+
+            if use_two_step:
+                # 使用两步转换法
+                convert_with_html_intermediate(input_file, output_file, format_type=format_type, cache_dir=cache_dir,
+                                               in_memory=in_memory, pandoc_server=pandoc_server, metrics=metrics,
+                                               fast_gfm=fast_gfm)
+            else:
+                # 普通转换
+                # 单文件模式下 --jobs 为分段转换的并发数
+                convert_to_markdown(input_file, output_file, format_type=format_type, cache_dir=cache_dir,
+                                    pandoc_server=pandoc_server, metrics=metrics, split=split,
+                                    split_jobs=jobs if jobs != 1 else None, table_filter=table_filter)
+
+            if cache_dir is not None:
+                prune_cache(cache_dir)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,279 @@
+"""
+DOCX 表格快速分析 - 无需 pandoc
+直接打开 DOCX 压缩包，流式解析 word/document.xml 中的表格结构
+（w:tbl、w:gridSpan、w:vMerge、w:gridCol），毫秒级给出与
+analyze_file_complexity() 相同结构的分析结果和转换建议，
+便于在投入 pandoc 转换时间之前对整批文档进行分类。
+"""
+
+import json
+import sys
+import zipfile
+from xml.parsers import expat
+
+
+# expat 以 '命名空间 本地名' 的形式报告元素和属性名
+_W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main '
+_TBL = f'{_W_NS}tbl'
+_GRID_SPAN = f'{_W_NS}gridSpan'
+_V_MERGE = f'{_W_NS}vMerge'
+_TC_PR = f'{_W_NS}tcPr'
+_TBL_GRID = f'{_W_NS}tblGrid'
+_GRID_COL = f'{_W_NS}gridCol'
+_VAL = f'{_W_NS}val'
+_WIDTH = f'{_W_NS}w'
+
+DOCUMENT_PART = 'word/document.xml'
+
+# pandoc 换算列宽时使用的最小总宽度（twip，即 6.5 英寸的默认版心宽度）：
+# 列宽占比为 宽度 / max(各列宽度之和, 该值)，HTML 中写出截断取整后的百分比
+PANDOC_MIN_TABLE_WIDTH = 9360
+
+
+def _zero_width_columns(grid):
+    """
+    统计 pandoc 会写出 width: 0% 的列数
+
+    宽度为 0 的列在 pandoc 中视为未指定宽度（写出不带宽度的 <col />），不计入；
+    其余列的宽度占比不足 1% 时截断为 0%。
+    """
+    total = max(sum(grid), PANDOC_MIN_TABLE_WIDTH)
+    return sum(1 for width in grid if 0 < width and width * 100 < total)
+
+
+def scan_docx_tables(input_file):
+    """
+    流式解析 DOCX 正文，统计表格结构
+
+    Args:
+        input_file (str): DOCX 文件路径
+
+    Returns:
+        dict: {
+            'tables': 表格数量（含嵌套表格）,
+            'colspan_cells': 横向合并单元格数 (w:gridSpan > 1，不含纵向合并的延续单元格),
+            'rowspan_cells': 纵向合并单元格数 (w:vMerge 起始单元格),
+            'zero_width_cols': 零宽度列数（pandoc 写出 width: 0% 的 w:gridCol，见 _zero_width_columns）,
+            'issues': 检测到的问题列表,
+            'warnings': 警告列表
+        }
+
+    Raises:
+        ValueError: 文件不是有效的 DOCX
+    """
+    counts = {
+        'tables': 0,
+        'colspan_cells': 0,
+        'rowspan_cells': 0,
+        'zero_width_cols': 0,
+    }
+
+    # 当前单元格属性 (w:tcPr) 中的横向合并与纵向合并延续标记；
+    # 纵向合并的延续单元格在 HTML 中不存在，其 gridSpan 不计入 colspan
+    cell = {'grid_span': False, 'continued': False}
+    # 当前 w:tblGrid 中各列的宽度
+    grid = []
+
+    def start_element(name, attrs):
+        if name == _TBL:
+            counts['tables'] += 1
+        elif name == _GRID_SPAN:
+            cell['grid_span'] = int(attrs.get(_VAL, '1')) > 1
+        elif name == _V_MERGE:
+            if attrs.get(_VAL) == 'restart':
+                counts['rowspan_cells'] += 1
+            else:
+                cell['continued'] = True
+        elif name == _TBL_GRID:
+            grid.clear()
+        elif name == _GRID_COL:
+            try:
+                grid.append(float(attrs.get(_WIDTH, '0')))
+            except ValueError:
+                grid.append(0.0)
+
+    def end_element(name):
+        if name == _TBL_GRID:
+            counts['zero_width_cols'] += _zero_width_columns(grid)
+        elif name == _TC_PR:
+            if cell['grid_span'] and not cell['continued']:
+                counts['colspan_cells'] += 1
+            cell['grid_span'] = False
+            cell['continued'] = False
+
+    # 只注册标签回调，不构建元素树，内存占用与文档大小无关
+    parser = expat.ParserCreate(namespace_separator=' ')
+    parser.StartElementHandler = start_element
+    parser.EndElementHandler = end_element
+
+    try:
+        with zipfile.ZipFile(input_file) as archive, archive.open(DOCUMENT_PART) as document:
+            parser.ParseFile(document)
+    except (zipfile.BadZipFile, KeyError, expat.ExpatError, ValueError) as e:
+        raise ValueError(f"无法解析 DOCX 文件 {input_file}: {e}") from e
+
+    issues = []
+    warnings = []
+    if counts['colspan_cells']:
+        warnings.append(f"检测到 {counts['colspan_cells']} 个合并单元格 (colspan)")
+    if counts['rowspan_cells']:
+        warnings.append(f"检测到 {counts['rowspan_cells']} 个合并单元格 (rowspan)")
+    if counts['zero_width_cols']:
+        issues.append(f"检测到 {counts['zero_width_cols']} 个零宽度列")
+
+    counts['issues'] = issues
+    counts['warnings'] = warnings
+    return counts
+
+
+def analysis_from_validation(validation):
+    """
+    由表格验证报告生成分析结果
+
+    Args:
+        validation (dict): validate_table_structure() 或 scan_docx_tables() 的返回值
+
+    Returns:
+        dict: 分析结果
+    """
+    return {
+        'table_count': validation['tables'],
+        'has_issues': len(validation['issues']) > 0,
+        'issues': validation['issues'],
+        'colspan_count': validation.get('colspan_cells', 0),
+        'rowspan_count': validation.get('rowspan_cells', 0),
+    }
+
+
+def build_recommendations(analysis):
+    """
+    根据分析结果给出转换建议
+
+    Args:
+        analysis (dict): analysis_from_validation() 的返回值
+
+    Returns:
+        list: 建议列表，每项包含 method / format / reason
+    """
+    recommendations = []
+
+    if analysis['table_count'] == 0:
+        recommendations.append({
+            'method': '普通转换',
+            'format': 'markdown',
+            'reason': '文件中没有表格，使用普通转换即可'
+        })
+    elif analysis['colspan_count'] > 5 or analysis['rowspan_count'] > 5:
+        recommendations.append({
+            'method': '先转HTML再转管道表',
+            'format': 'gfm',
+            'reason': f'检测到 {analysis["colspan_count"] + analysis["rowspan_count"]} 个合并单元格，建议使用两步法'
+        })
+        recommendations.append({
+            'method': '转网格表',
+            'format': 'markdown+grid_tables',
+            'reason': '网格表对复杂表格支持更好'
+        })
+    elif analysis['table_count'] > 5:
+        recommendations.append({
+            'method': '转管道表 (GFM)',
+            'format': 'gfm',
+            'reason': f'检测到 {analysis["table_count"]} 个表格，GFM 格式支持较好'
+        })
+        recommendations.append({
+            'method': '转网格表',
+            'format': 'markdown+grid_tables',
+            'reason': '多个表格，网格表更稳定'
+        })
+    else:
+        recommendations.append({
+            'method': '转管道表 (GFM)',
+            'format': 'gfm',
+            'reason': '简单表格，推荐 GFM 格式'
+        })
+
+    if analysis['has_issues']:
+        recommendations.insert(0, {
+            'method': '先转HTML再转管道表',
+            'format': 'gfm',
+            'reason': f'检测到问题: {", ".join(analysis["issues"])}'
+        })
+
+    return recommendations
+
+
+def analyze_docx_complexity(input_file):
+    """
+    快速分析 DOCX 文件复杂度，不调用 pandoc
+
+    Args:
+        input_file (str): DOCX 文件路径
+
+    Returns:
+        dict: {'analysis': 分析结果, 'recommendations': 转换建议}，
+            结构与 analyze_file_complexity() 相同
+    """
+    analysis = analysis_from_validation(scan_docx_tables(input_file))
+    return {
+        'analysis': analysis,
+        'recommendations': build_recommendations(analysis)
+    }
+
+
+def main():
+    """命令行入口: 批量分类 DOCX 文件"""
+    import glob
+
+    args = sys.argv[1:]
+    as_json = False
+    if args and args[0] == '--json':
+        as_json = True
+        args = args[1:]
+
+    if not args:
+        print("用法:")
+        print("  python docx_analyzer.py [--json] <docx 文件或通配符> ...")
+        print("")
+        print("示例:")
+        print("  python docx_analyzer.py report.docx")
+        print("  python docx_analyzer.py \"docs/*.docx\"")
+        print("  python docx_analyzer.py --json \"docs/**/*.docx\" > triage.jsonl")
+        sys.exit(1)
+
+    files = []
+    for pattern in args:
+        matched = sorted(glob.glob(pattern, recursive=True))
+        files.extend(matched if matched else [pattern])
+
+    failed = 0
+    for input_file in files:
+        try:
+            result = analyze_docx_complexity(input_file)
+        except (OSError, ValueError) as e:
+            failed += 1
+            if as_json:
+                print(json.dumps({'input': input_file, 'error': str(e)}, ensure_ascii=False))
+            else:
+                print(f"[ERROR] {e}")
+            continue
+
+        analysis = result['analysis']
+        best = result['recommendations'][0]
+        if as_json:
+            print(json.dumps({
+                'input': input_file,
+                'analysis': analysis,
+                'method': best['method'],
+                'format': best['format'],
+            }, ensure_ascii=False))
+        else:
+            print(f"[INFO] {input_file}: 表格 {analysis['table_count']}，"
+                  f"colspan {analysis['colspan_count']}，rowspan {analysis['rowspan_count']}"
+                  f"{'，存在问题' if analysis['has_issues'] else ''} -> {best['method']} ({best['format']})")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+"""
+文件发现 - 基于 os.scandir 的惰性递归文件匹配
+与 glob() 不同，匹配结果逐个产出而不是先收集成完整列表：在数百万文件的目录树上
+第一个文件立即可用，内存占用与匹配的文件数量无关。支持 ** 递归匹配任意层目录，
+以及按文件名或相对路径的包含/排除过滤；排除规则同时用于剪枝，不会进入被排除的目录。
+"""
+
+import os
+import re
+from fnmatch import fnmatch, translate
+from pathlib import Path
+
+
+_MAGIC_RE = re.compile(r'[*?[]')
+
+
+def _has_magic(part):
+    return _MAGIC_RE.search(part) is not None
+
+
+def _split_pattern(input_pattern):
+    """
+    将模式拆分为不含通配符的基础目录和其余各级模式
+
+    Returns:
+        tuple: (基础目录, 模式各级组成部分列表)
+    """
+    parts = Path(input_pattern).parts
+    index = 0
+    while index < len(parts) and not _has_magic(parts[index]):
+        index += 1
+    base = str(Path(*parts[:index])) if index else '.'
+    return base, list(parts[index:])
+
+
+class _PatternMatcher:
+    """
+    将模式各级编译为正则，并以状态集合（当前可匹配的模式层级下标）逐级匹配，
+    每个文件只需对少数几个状态做一次正则匹配
+    """
+
+    def __init__(self, parts):
+        self.parts = parts
+        self.last = len(parts) - 1
+        self.regexes = [None if part == '**' else re.compile(translate(os.path.normcase(part))) for part in parts]
+
+    def _closure(self, states):
+        """** 可以匹配零级目录，把其后的层级也加入状态集合"""
+        result = set()
+        for state in states:
+            while state <= self.last:
+                result.add(state)
+                if self.parts[state] != '**':
+                    break
+                state += 1
+        return frozenset(result)
+
+    def initial(self):
+        return self._closure([0])
+
+    def _match_name(self, name, state):
+        """单级名称匹配；与 glob 一致，通配符不匹配以 . 开头的隐藏文件"""
+        if name.startswith('.') and not self.parts[state].startswith('.'):
+            return False
+        return self.regexes[state].match(os.path.normcase(name)) is not None
+
+    def match_file(self, name, states):
+        for state in states:
+            if state != self.last:
+                continue
+            if self.parts[state] == '**':
+                # 末尾的 ** 匹配任意非隐藏文件
+                if not name.startswith('.'):
+                    return True
+            elif self._match_name(name, state):
+                return True
+        return False
+
+    def enter_dir(self, name, states):
+        """进入子目录后的状态集合，为空表示子目录中不可能有匹配的文件（剪枝）"""
+        hidden = name.startswith('.')
+        next_states = []
+        for state in states:
+            if self.parts[state] == '**':
+                # ** 不进入隐藏目录
+                if not hidden:
+                    next_states.append(state)
+            elif state < self.last and self._match_name(name, state):
+                next_states.append(state + 1)
+        return self._closure(next_states)
+
+
+def pattern_base(input_pattern):
+    """
+    模式中不含通配符的基础目录（如 'docs/**/*.docx' 为 'docs'），
+    批量转换据此在输出目录中保留子目录结构
+
+    Returns:
+        str: 基础目录
+    """
+    if not _has_magic(input_pattern):
+        return os.path.dirname(input_pattern) or '.'
+    return _split_pattern(input_pattern)[0]
+
+
+def _matches_any(rel_path, name, patterns):
+    """相对路径或文件名匹配任一过滤模式"""
+    return any(fnmatch(rel_path, p) or fnmatch(name, p) for p in patterns)
+
+
+def iter_files(input_pattern, include=None, exclude=None):
+    """
+    惰性产出匹配模式的文件路径
+
+    Args:
+        input_pattern (str): 文件模式，支持 *、?、[...] 以及匹配任意层目录的 **
+            （如 'docs/**/*.docx'）
+        include (list, optional): 包含过滤，文件名或相对基础目录的路径须匹配其中之一
+        exclude (list, optional): 排除过滤，匹配的文件被跳过，匹配的目录不会进入
+
+    Yields:
+        str: 匹配的文件路径（与模式的写法一致，相对模式产出相对路径）
+
+    说明:
+        按目录树深度优先遍历，同一目录内的顺序与 os.scandir 一致（与 glob 相同，不排序）；
+        不跟随指向目录的符号链接，避免循环。
+    """
+    include = list(include or [])
+    exclude = list(exclude or [])
+    if not _has_magic(input_pattern):
+        # 不含通配符时直接检查文件，无需遍历目录
+        name = os.path.basename(input_pattern)
+        if os.path.isfile(input_pattern) and not (exclude and _matches_any(name, name, exclude)) \
+                and not (include and not _matches_any(name, name, include)):
+            yield input_pattern
+        return
+
+    base, parts = _split_pattern(input_pattern)
+    matcher = _PatternMatcher(parts)
+    # 产出的路径保留模式的写法（包括开头的 ./）
+    prefix = '' if base == '.' else os.path.join(base, '')
+    if input_pattern.startswith(('./', '.' + os.sep)):
+        prefix = '.' + os.sep + prefix
+
+    # 栈中保存 (目录路径, 产出路径前缀, 相对基础目录的路径前缀, 模式状态集合)
+    stack = [(base, prefix, '', matcher.initial())]
+    while stack:
+        directory, path_prefix, rel_prefix, states = stack.pop()
+        try:
+            scanner = os.scandir(directory)
+        except OSError:
+            continue
+
+        subdirs = []
+        with scanner:
+            for entry in scanner:
+                name = entry.name
+                rel_path = rel_prefix + name
+                if exclude and _matches_any(rel_path, name, exclude):
+                    continue
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+
+                if is_dir:
+                    child_states = matcher.enter_dir(name, states)
+                    if child_states:
+                        subdirs.append((entry.path, path_prefix + name + os.sep, rel_path + '/', child_states))
+                elif matcher.match_file(name, states):
+                    if include and not _matches_any(rel_path, name, include):
+                        continue
+                    yield path_prefix + name
+
+        # 逆序入栈，使子目录按发现顺序遍历
+        stack.extend(reversed(subdirs))
+
+
+def _put(items, value, stop):
+    """向有界队列放入一项，消费方已停止时返回 False"""
+    import queue
+
+    while not stop.is_set():
+        try:
+            items.put(value, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def prefetch(iterable, maxsize):
+    """
+    在后台线程中迭代 iterable，结果经有界队列逐个交给调用方
+
+    用于让目录遍历与转换并行进行: 队列满时遍历暂停，内存占用固定；
+    调用方提前结束迭代时后台线程随之停止。遍历中的异常在调用方重新抛出。
+
+    Args:
+        iterable: 任意可迭代对象（如 iter_files() 的结果）
+        maxsize (int): 队列容量
+
+    Yields:
+        iterable 中的各项
+    """
+    import queue
+    import threading
+
+    items = queue.Queue(max(1, maxsize))
+    stop = threading.Event()
+    finished = object()
+
+    def produce():
+        try:
+            for item in iterable:
+                if not _put(items, (item, None), stop):
+                    return
+        except BaseException as e:
+            _put(items, (finished, e), stop)
+        else:
+            _put(items, (finished, None), stop)
+
+    thread = threading.Thread(target=produce, name='file-discovery', daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = items.get()
+            if item is finished:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
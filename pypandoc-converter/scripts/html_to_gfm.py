@@ -0,0 +1,702 @@
+"""
+HTML → GFM 原生渲染 - 两步转换法第二步的快速路径
+pandoc 生成的中间 HTML 通常只包含标题、段落、列表和表格，对这一子集直接在 Python 中
+渲染为 GitHub Flavored Markdown，省去第二个 pandoc 进程。合并单元格（colspan/rowspan）
+展开为管道表中的空单元格，始终输出管道表。
+
+遇到子集之外的内容（图片、脚注、上下标、带属性的 span/div、单元格中的多个段落等）时
+抛出 UnsupportedHtmlError，由调用方回退为 pandoc 转换。
+
+输入可以分块写入（renderer.write() / feed()），每个顶层块结束后立即渲染输出并释放，
+内存占用与文档大小无关。
+"""
+
+import re
+import unicodedata
+from html.parser import HTMLParser
+
+
+# 可以使用原生渲染的 pandoc 参数（其余参数可能改变输出，需要交给 pandoc）
+NATIVE_ARGS = {'--wrap=none', '--markdown-headings=atx', '--atx-headers'}
+
+# 分块读取时每次处理的字符数
+RENDER_CHUNK_SIZE = 1024 * 1024
+
+_HEADINGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+_VOID_TAGS = {'br', 'col', 'hr', 'meta', 'link', 'img', 'input', 'wbr'}
+# 可以包含块元素的容器；li、td、th 中还可以直接出现行内内容
+_BLOCK_TAGS = _HEADINGS | {'p', 'ul', 'ol', 'table', 'blockquote', 'pre', 'hr', 'div'}
+_INLINE_TAGS = {'strong', 'b', 'em', 'i', 'code', 'a', 'br', 'span', 'del', 's'}
+_TABLE_TAGS = {'colgroup', 'col', 'thead', 'tbody', 'tfoot', 'tr', 'th', 'td'}
+_LIST_ITEM_BLOCKS = {'p', 'ul', 'ol', 'pre', 'blockquote', 'div'}
+
+# 各标签允许的属性（id 对所有标签都允许，渲染时忽略）
+_ALLOWED_ATTRS = {
+    'table': {'style', 'class'},
+    'colgroup': {'style', 'span'},
+    'col': {'style', 'span'},
+    'thead': {'class'},
+    'tbody': {'class'},
+    'tfoot': {'class'},
+    'tr': {'class'},
+    'th': {'style', 'colspan', 'rowspan'},
+    'td': {'style', 'colspan', 'rowspan'},
+    'a': {'href'},
+    'ol': {'start', 'type'},
+    'span': {'class'},
+}
+_ALLOWED_ATTRS.update({tag: {'class'} for tag in _HEADINGS})
+
+_WHITESPACE_RE = re.compile(r'[ \t\n\r\f]+')
+_SPACES_RE = re.compile(r' {2,}')
+# 单词内部的下划线不会被解析为强调，无需转义；紧接 [ 的 ! 会与之组成图片语法，需要转义
+_ESCAPE_RE = re.compile(r'([\\`*\[\]<>]|(?<!\w)_|_(?!\w)|!(?=\[))')
+_TABLE_ESCAPE_RE = re.compile(r'([\\`*\[\]<>|]|(?<!\w)_|_(?!\w)|!(?=\[))')
+_SPECIAL_CHAR_RE = re.compile(r'[\\`*_\[\]<>|&~]')
+_ENTITY_LIKE_RE = re.compile(r'&(?=#?\w+;)')
+_LINE_START_RES = (
+    re.compile(r'^(#{1,6})(?=[ \t]|$)'),
+    re.compile(r'^([-+])(?=[ \t]|$)'),
+    re.compile(r'^(\d{1,9})([.)])(?=[ \t]|$)'),
+    re.compile(r'^([=-]+)(?=[ \t]*$)'),
+)
+_TEXT_ALIGN_RE = re.compile(r'text-align:\s*(left|right|center)', re.IGNORECASE)
+_ALIGN_RULES = {'left': ':---', 'right': '---:', 'center': ':---:', None: '---'}
+
+HORIZONTAL_RULE = '-' * 72
+
+
+class UnsupportedHtmlError(ValueError):
+    """HTML 中含有原生渲染不支持的内容，需要回退为 pandoc"""
+
+
+def native_gfm_supported(format_type, extra_args):
+    """
+    输出格式和 pandoc 参数是否可以使用原生渲染
+
+    Args:
+        format_type (str): 输出格式，只支持不带扩展的 gfm
+        extra_args (list): pandoc 参数
+
+    Returns:
+        bool: 是否可以使用原生渲染
+    """
+    return format_type == 'gfm' and all(arg in NATIVE_ARGS for arg in extra_args or [])
+
+
+class _Node:
+    __slots__ = ('tag', 'attrs', 'children')
+
+    def __init__(self, tag, attrs):
+        self.tag = tag
+        self.attrs = attrs
+        self.children = []
+
+
+def _unsupported(what):
+    raise UnsupportedHtmlError(f"原生 GFM 渲染不支持 {what}")
+
+
+def _is_text(child):
+    return isinstance(child, str)
+
+
+def _is_blank(child):
+    return _is_text(child) and not child.strip(' \t\n\r\f')
+
+
+def _escape(text, in_table=False):
+    # 大部分文本不含需要转义的字符，先整体检查一次
+    if _SPECIAL_CHAR_RE.search(text) is None:
+        return text
+    text = (_TABLE_ESCAPE_RE if in_table else _ESCAPE_RE).sub(r'\\\1', text)
+    if '&' in text:
+        text = _ENTITY_LIKE_RE.sub(r'\\&', text)
+    return text.replace('~~', '\\~\\~')
+
+
+def _escape_line_starts(text):
+    """转义行首会被解析为标题、列表或 setext 下划线的字符"""
+    lines = text.split('\n')
+    for index, line in enumerate(lines):
+        for pattern in _LINE_START_RES:
+            match = pattern.match(line)
+            if match:
+                if pattern.groups == 2:
+                    line = match.group(1) + '\\' + line[match.end(1):]
+                else:
+                    line = '\\' + line
+                break
+        lines[index] = line
+    return '\n'.join(lines)
+
+
+def _is_punctuation(char):
+    return unicodedata.category(char)[0] in 'PS'
+
+
+def _tidy_inline(text):
+    """合并相邻节点间重复的空格，去掉首尾和换行前后的空格"""
+    text = _SPACES_RE.sub(' ', text)
+    return text.replace(' \\\n', '\\\n').replace('\n ', '\n').strip(' ')
+
+
+def _neighbor(parts, index, step):
+    """parts[index] 之前（step=-1）或之后（step=1）紧邻的字符，没有时返回 None"""
+    index += step
+    while 0 <= index < len(parts):
+        if parts[index]:
+            return parts[index][-1 if step < 0 else 0]
+        index += step
+    return None
+
+
+def _ends_with_bang(text):
+    """text 是否以未转义的 ! 结尾"""
+    stripped = text[:-1]
+    return text.endswith('!') and (len(stripped) - len(stripped.rstrip('\\'))) % 2 == 0
+
+
+def _escape_bang_before_bracket(parts):
+    """相邻节点拼接后 ! 后紧跟 [（链接或转义的方括号）时转义该 !，避免被解析为图片"""
+    for index, part in enumerate(parts):
+        if not _ends_with_bang(part):
+            continue
+        following = next((item for item in parts[index + 1:] if item), '')
+        if following.startswith(('[', '\\[')):
+            parts[index] = part[:-1] + '\\!'
+
+
+def _flanking_ok(char):
+    """强调分隔符外侧的字符为空白、标点或行内内容边界时，以标点开头/结尾的强调仍可解析"""
+    return char is None or char.isspace() or _is_punctuation(char)
+
+
+def _indent(text, width):
+    """除第一行外的非空行缩进 width 个空格"""
+    prefix = ' ' * width
+    lines = text.split('\n')
+    return '\n'.join([lines[0]] + [prefix + line if line else line for line in lines[1:]])
+
+
+class GfmRenderer(HTMLParser):
+    """
+    增量 HTML → GFM 渲染器
+
+    用法:
+        renderer = GfmRenderer(writer)
+        renderer.write(html_chunk)   # 可多次调用，也可作为 preprocess_html_stream 的 writer
+        renderer.close()
+
+    不支持的内容会在 write() 或 close() 中抛出 UnsupportedHtmlError，此时已写入 writer 的
+    内容不完整，调用方应丢弃。
+    """
+
+    def __init__(self, writer):
+        super().__init__(convert_charrefs=True)
+        self.writer = writer
+        self.blocks = 0
+        self._root = _Node(None, {})
+        self._stack = [self._root]
+        # <head> 中的内容（title、style、meta 等）不输出
+        self._skip_depth = 0
+        self._last_list = None
+
+    def write(self, data):
+        self.feed(data)
+
+    def close(self):
+        super().close()
+        if len(self._stack) > 1:
+            _unsupported(f"未闭合的 <{self._stack[-1].tag}>")
+        self._flush()
+        if self.blocks:
+            self.writer.write('\n')
+
+    # 解析
+
+    def handle_starttag(self, tag, attrs):
+        if self._skip_depth:
+            if tag not in _VOID_TAGS:
+                self._skip_depth += 1
+            return
+        if tag == 'head':
+            self._skip_depth = 1
+            return
+        if tag in ('html', 'body'):
+            return
+        if tag not in _BLOCK_TAGS and tag not in _INLINE_TAGS and tag not in _TABLE_TAGS and tag != 'li':
+            _unsupported(f"<{tag}>")
+
+        attrs = dict(attrs)
+        allowed = _ALLOWED_ATTRS.get(tag, ())
+        for name in attrs:
+            if name != 'id' and name not in allowed:
+                _unsupported(f"<{tag}> 的 {name} 属性")
+
+        node = _Node(tag, attrs)
+        self._stack[-1].children.append(node)
+        if tag not in _VOID_TAGS:
+            self._stack.append(node)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in _VOID_TAGS and not self._skip_depth:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if self._skip_depth:
+            if tag not in _VOID_TAGS:
+                self._skip_depth -= 1
+            return
+        if tag in ('html', 'body', 'head') or tag in _VOID_TAGS:
+            return
+        if len(self._stack) == 1 or self._stack[-1].tag != tag:
+            _unsupported(f"不匹配的 </{tag}>")
+        self._stack.pop()
+        if len(self._stack) == 1:
+            self._flush()
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        if len(self._stack) == 1:
+            if data.strip(' \t\n\r\f'):
+                _unsupported("块级位置的文本")
+            return
+        self._stack[-1].children.append(data)
+
+    def handle_comment(self, data):
+        pass
+
+    def handle_decl(self, decl):
+        pass
+
+    def handle_pi(self, data):
+        _unsupported("处理指令")
+
+    def unknown_decl(self, data):
+        _unsupported("CDATA")
+
+    def _flush(self):
+        """渲染已结束的顶层块并释放"""
+        for node in self._root.children:
+            text = self._render_block(node)
+            if text is None:
+                continue
+            self.writer.write(('\n\n' if self.blocks else '') + text)
+            self.blocks += 1
+        self._root.children.clear()
+
+    # 块级渲染
+
+    def _render_blocks(self, children):
+        """渲染块容器的子节点，相邻的同类列表之间插入空注释，避免被合并为一个列表"""
+        parts = []
+        for child in children:
+            if _is_blank(child):
+                continue
+            if _is_text(child) or child.tag not in _BLOCK_TAGS:
+                _unsupported("块级位置的行内内容")
+            text = self._render_block(child)
+            if text is not None:
+                parts.append(text)
+        return '\n\n'.join(parts)
+
+    def _render_block(self, node):
+        tag = node.tag
+        list_kind = tag if tag in ('ul', 'ol') else None
+        if list_kind is None:
+            self._last_list = None
+
+        if tag in _HEADINGS:
+            text = _tidy_inline(self._render_inline(node.children, allow_break=False))
+            if text.endswith('#'):
+                text = text[:-1] + '\\#'
+            return '#' * int(tag[1]) + (' ' + text if text else '')
+        if tag == 'p':
+            text = _tidy_inline(self._render_inline(node.children))
+            return _escape_line_starts(text) if text else None
+        if tag == 'div':
+            if node.attrs:
+                _unsupported("带属性的 <div>")
+            return self._render_blocks(node.children) or None
+        if tag == 'blockquote':
+            text = self._render_blocks(node.children)
+            return '\n'.join('> ' + line if line else '>' for line in text.split('\n'))
+        if tag == 'pre':
+            return self._render_code_block(node)
+        if tag == 'hr':
+            return HORIZONTAL_RULE
+        if tag == 'table':
+            return self._render_table(node)
+        if list_kind:
+            separator = '<!-- -->\n\n' if self._last_list == list_kind else ''
+            text = self._render_list(node)
+            self._last_list = list_kind
+            return separator + text
+        _unsupported(f"块级位置的 <{tag}>")
+
+    def _render_code_block(self, node):
+        if node.attrs:
+            _unsupported("带属性的 <pre>")
+        parts = []
+        for child in node.children:
+            if _is_text(child):
+                parts.append(child)
+            elif child.tag == 'code' and not child.attrs and all(_is_text(c) for c in child.children):
+                parts.extend(child.children)
+            else:
+                _unsupported("<pre> 中的标记")
+        code = ''.join(parts)
+        if code.startswith('\n'):
+            code = code[1:]
+        code = code.rstrip('\n')
+        runs = re.findall(r'^\s*(`{3,})', code, re.MULTILINE)
+        fence = '`' * max([3] + [len(run) + 1 for run in runs])
+        return f"{fence}\n{code}\n{fence}"
+
+    def _render_list(self, node):
+        ordered = node.tag == 'ol'
+        if ordered:
+            if node.attrs.get('type', '1') != '1':
+                _unsupported("非十进制编号的有序列表")
+            try:
+                number = int(node.attrs.get('start', 1))
+            except ValueError:
+                _unsupported("无效的 start 属性")
+        items = []
+        for child in node.children:
+            if _is_blank(child):
+                continue
+            if _is_text(child) or child.tag != 'li':
+                _unsupported(f"<{node.tag}> 中的非列表项内容")
+            items.append(child)
+
+        # 任一列表项含有段落时为松散列表，各项之间空行分隔
+        loose = any(not _is_text(c) and c.tag == 'p' for item in items for c in item.children)
+        rendered = []
+        for item in items:
+            if item.attrs:
+                _unsupported("带属性的 <li>")
+            marker = f"{number}." if ordered else '-'
+            if ordered:
+                number += 1
+            body = self._render_mixed(item.children, _LIST_ITEM_BLOCKS, '\n\n' if loose else '\n')
+            rendered.append(marker + (' ' + _indent(body, len(marker) + 1) if body else ''))
+        self._last_list = None
+        return ('\n\n' if loose else '\n').join(rendered)
+
+    def _render_mixed(self, children, block_tags, separator):
+        """渲染可同时含行内内容和块元素的容器（如列表项）"""
+        parts = []
+        inline = []
+
+        def flush_inline():
+            text = _tidy_inline(self._render_inline(inline))
+            if text:
+                parts.append(_escape_line_starts(text))
+                self._last_list = None
+            inline.clear()
+
+        for child in children:
+            if _is_text(child) or child.tag in _INLINE_TAGS:
+                inline.append(child)
+                continue
+            if child.tag not in block_tags:
+                _unsupported(f"<{child.tag}> 嵌套在列表项中")
+            flush_inline()
+            text = self._render_block(child)
+            if text is not None:
+                parts.append(text)
+        flush_inline()
+        self._last_list = None
+        return separator.join(parts)
+
+    # 表格
+
+    def _render_table(self, node):
+        if node.attrs.get('class'):
+            _unsupported("带 class 的 <table>")
+        head_rows = []
+        body_rows = []
+        for child in node.children:
+            if _is_blank(child):
+                continue
+            if _is_text(child):
+                _unsupported("<table> 中的文本")
+            if child.tag in ('colgroup', 'col'):
+                # 列宽在管道表中无法表示
+                continue
+            if child.tag == 'tr':
+                body_rows.append(child)
+            elif child.tag in ('thead', 'tbody', 'tfoot'):
+                rows = head_rows if child.tag == 'thead' else body_rows
+                for row in child.children:
+                    if _is_blank(row):
+                        continue
+                    if _is_text(row) or row.tag != 'tr':
+                        _unsupported(f"<{child.tag}> 中的非表格行内容")
+                    rows.append(row)
+            else:
+                _unsupported(f"<table> 中的 <{child.tag}>")
+
+        if len(head_rows) > 1:
+            _unsupported("多行表头")
+        if not head_rows and body_rows and all(cell.tag == 'th' for cell in self._cells(body_rows[0])):
+            head_rows = [body_rows.pop(0)]
+
+        grid, aligns = self._expand_spans(head_rows + body_rows)
+        width = max([len(row) for row in grid] + [1])
+        for row in grid:
+            row.extend([''] * (width - len(row)))
+        aligns.extend([None] * (width - len(aligns)))
+
+        if head_rows:
+            header, body = grid[0], grid[1:]
+        else:
+            header, body = [''] * width, grid
+        lines = [self._table_row(header), '|' + '|'.join(_ALIGN_RULES[align] for align in aligns) + '|']
+        lines.extend(self._table_row(row) for row in body)
+        return '\n'.join(lines)
+
+    @staticmethod
+    def _table_row(cells):
+        return '| ' + ' | '.join(cells) + ' |'
+
+    @staticmethod
+    def _cells(row):
+        cells = []
+        for child in row.children:
+            if _is_blank(child):
+                continue
+            if _is_text(child) or child.tag not in ('th', 'td'):
+                _unsupported("<tr> 中的非单元格内容")
+            cells.append(child)
+        return cells
+
+    @staticmethod
+    def _span(cell, name, limit):
+        try:
+            value = int(cell.attrs.get(name, 1))
+        except ValueError:
+            return 1
+        return limit if value == 0 else max(1, min(value, limit))
+
+    def _expand_spans(self, rows):
+        """
+        将合并单元格展开为网格: 合并区域左上角保留内容，其余位置为空单元格
+
+        Returns:
+            tuple: (各行单元格文本列表, 各列对齐方式)
+        """
+        grid = [[] for _ in rows]
+        aligns = []
+        for r, row in enumerate(rows):
+            line = grid[r]
+            c = 0
+            for cell in self._cells(row):
+                while c < len(line) and line[c] is not None:
+                    c += 1
+                colspan = self._span(cell, 'colspan', 1000)
+                rowspan = self._span(cell, 'rowspan', len(rows) - r)
+                text = self._render_cell(cell)
+                for dr in range(rowspan):
+                    target = grid[r + dr]
+                    if len(target) < c + colspan:
+                        target.extend([None] * (c + colspan - len(target)))
+                    for dc in range(colspan):
+                        target[c + dc] = text if dr == 0 and dc == 0 else ''
+                if len(aligns) <= c:
+                    aligns.extend([None] * (c + 1 - len(aligns)))
+                    match = _TEXT_ALIGN_RE.search(cell.attrs.get('style', ''))
+                    aligns[c] = match.group(1).lower() if match else None
+                c += colspan
+        return [[text or '' for text in line] for line in grid], aligns
+
+    def _render_cell(self, cell):
+        """单元格内容: 行内内容或单个段落，换行输出为 <br>"""
+        children = [child for child in cell.children if not _is_blank(child)]
+        paragraphs = [child for child in children if not _is_text(child) and child.tag == 'p']
+        if paragraphs:
+            if len(children) != 1:
+                _unsupported("单元格中的多个段落")
+            children = paragraphs[0].children
+        for child in children:
+            if not _is_text(child) and child.tag not in _INLINE_TAGS:
+                _unsupported(f"单元格中的 <{child.tag}>")
+        return _tidy_inline(self._render_inline(children, in_table=True))
+
+    # 行内渲染
+
+    def _render_inline(self, children, in_table=False, allow_break=True):
+        parts = []
+        # 以标点开头或结尾的强调: (下标, 是否检查前一个字符, 是否检查后一个字符)
+        checks = []
+        for child in children:
+            if _is_text(child):
+                parts.append(_escape(_WHITESPACE_RE.sub(' ', child), in_table))
+                continue
+            tag = child.tag
+            if tag not in _INLINE_TAGS:
+                _unsupported(f"行内位置的 <{tag}>")
+            if tag == 'br':
+                if not allow_break:
+                    _unsupported("标题中的换行")
+                parts.append('<br>' if in_table else '\\\n')
+            elif tag in ('strong', 'b', 'em', 'i', 'del', 's'):
+                if child.attrs:
+                    _unsupported(f"带属性的 <{tag}>")
+                delimiter = {'strong': '**', 'b': '**', 'em': '*', 'i': '*'}.get(tag, '~~')
+                text, check_before, check_after = self._emphasis(
+                    self._render_inline(child.children, in_table, allow_break), delimiter)
+                if check_before or check_after:
+                    checks.append((len(parts), check_before, check_after))
+                parts.append(text)
+            elif tag == 'code':
+                parts.append(self._code_span(child, in_table))
+            elif tag == 'a':
+                parts.append(self._link(child, in_table, allow_break))
+            elif tag == 'span':
+                parts.append(self._span_node(child, in_table, allow_break))
+
+        for index, check_before, check_after in checks:
+            if (check_before and not _flanking_ok(_neighbor(parts, index, -1))) or \
+                    (check_after and not _flanking_ok(_neighbor(parts, index, 1))):
+                _unsupported("紧邻文字且首尾为标点的强调")
+        _escape_bang_before_bracket(parts)
+        return ''.join(parts)
+
+    @staticmethod
+    def _emphasis(inner, delimiter):
+        """
+        添加强调分隔符，首尾空格移到分隔符外侧
+
+        Returns:
+            tuple: (文本, 是否需要检查前一个字符, 是否需要检查后一个字符)。内容以标点开头（结尾）且
+                分隔符外侧紧邻文字时，CommonMark 不会将其识别为强调，需要由调用方检查
+        """
+        core = inner.strip(' ')
+        if not core:
+            return inner, False, False
+        if core.endswith('\\\n') or core.startswith('\\\n'):
+            _unsupported("首尾为换行的强调")
+        leading = inner[:len(inner) - len(inner.lstrip(' '))]
+        trailing = inner[len(inner.rstrip(' ')):]
+        return (f"{leading}{delimiter}{core}{delimiter}{trailing}",
+                not leading and _is_punctuation(core[0]),
+                not trailing and _is_punctuation(core[-1]))
+
+    @staticmethod
+    def _code_span(node, in_table):
+        if node.attrs or not all(_is_text(child) for child in node.children):
+            _unsupported("带属性或标记的 <code>")
+        code = _WHITESPACE_RE.sub(' ', ''.join(node.children))
+        if not code:
+            return ''
+        if in_table:
+            code = code.replace('|', '\\|')
+        longest = max([len(run) for run in re.findall(r'`+', code)] + [0])
+        fence = '`' * (longest + 1)
+        if code.startswith('`') or code.endswith('`'):
+            code = f" {code} "
+        return f"{fence}{code}{fence}"
+
+    def _link(self, node, in_table, allow_break):
+        href = node.attrs.get('href')
+        if href is None or re.search(r'[\s<>]', href):
+            _unsupported("无法表示的链接")
+        if in_table:
+            href = href.replace('|', '%7C')
+        if '(' in href or ')' in href:
+            href = f"<{href}>"
+        text = _tidy_inline(self._render_inline(node.children, in_table, allow_break))
+        return f"[{text}]({href})"
+
+    def _span_node(self, node, in_table, allow_break):
+        """无属性的 span 只输出内容；空的锚点 span 原样保留，使文档内链接仍然有效"""
+        if not node.attrs:
+            return self._render_inline(node.children, in_table, allow_break)
+        if 'id' in node.attrs and node.attrs.get('class', 'anchor') == 'anchor' \
+                and all(_is_blank(child) for child in node.children):
+            anchor_id = node.attrs['id']
+            if re.search(r'[\s"<>&|]', anchor_id):
+                _unsupported("无法表示的锚点")
+            class_attr = ' class="anchor"' if 'class' in node.attrs else ''
+            return f'<span id="{anchor_id}"{class_attr}></span>'
+        _unsupported("带属性的 <span>")
+
+
+def render_gfm(reader, writer, chunk_size=RENDER_CHUNK_SIZE):
+    """
+    从 reader 分块读取 HTML，渲染后写入 writer
+
+    Args:
+        reader: 文本读取对象
+        writer: 文本写入对象
+        chunk_size (int): 每次读取的字符数
+
+    Returns:
+        int: 输出的块数
+
+    Raises:
+        UnsupportedHtmlError: HTML 中含有原生渲染不支持的内容（writer 中的输出不完整）
+    """
+    renderer = GfmRenderer(writer)
+    while True:
+        chunk = reader.read(chunk_size)
+        if not chunk:
+            break
+        renderer.write(chunk)
+    renderer.close()
+    return renderer.blocks
+
+
+def html_to_gfm(html_content):
+    """
+    将 HTML 字符串渲染为 GFM
+
+    Args:
+        html_content (str): HTML 内容
+
+    Returns:
+        str: GFM 内容
+
+    Raises:
+        UnsupportedHtmlError: HTML 中含有原生渲染不支持的内容
+    """
+    import io
+
+    writer = io.StringIO()
+    renderer = GfmRenderer(writer)
+    renderer.write(html_content)
+    renderer.close()
+    return writer.getvalue()
+
+
+def main():
+    """命令行入口: 渲染 HTML 文件，不支持时以退出码 2 结束"""
+    import sys
+
+    args = sys.argv[1:]
+    if not args or args[0] in ('-h', '--help'):
+        print("用法:")
+        print("  python html_to_gfm.py <input.html> [output.md]")
+        sys.exit(0 if args else 1)
+
+    with open(args[0], 'r', encoding='utf-8') as reader:
+        try:
+            if len(args) > 1:
+                with open(args[1], 'w', encoding='utf-8') as writer:
+                    render_gfm(reader, writer)
+                print(f"[OK] 渲染完成: {args[0]} -> {args[1]}")
+            else:
+                # 先完整渲染再输出，不支持时不输出不完整的内容
+                sys.stdout.write(html_to_gfm(reader.read()))
+        except UnsupportedHtmlError as e:
+            print(f"[ERROR] {e}", file=sys.stderr)
+            sys.exit(2)
+
+
+if __name__ == '__main__':
+    main()
@@ -17,14 +17,47 @@ from convert_to_markdown import (
     batch_convert
 )
 from preprocess_html import validate_table_structure, preprocess_html_file
+from docx_analyzer import analyze_docx_complexity, analysis_from_validation, build_recommendations
+from pandoc_probe import atx_heading_args
 
 
-def analyze_file_complexity(input_file):
+# 会话内的分析缓存: {(路径, 修改时间, 大小): {'html': 中间 HTML, 'result': 分析结果}}
+# 分析时生成的 HTML 可直接用于随后的两步法转换，避免同一文件转换两次
+_analysis_cache = {}
+_ANALYSIS_CACHE_SIZE = 4
+
+
+def _analysis_cache_key(input_path):
+    """缓存键，文件被修改后自动失效"""
+    stat = input_path.stat()
+    return (str(input_path.resolve()), stat.st_mtime_ns, stat.st_size)
+
+
+def get_analysis_html(input_file):
+    """
+    获取分析时生成的中间 HTML
+
+    Args:
+        input_file (str): 输入文件路径
+
+    Returns:
+        str | None: 本次会话中已分析过且文件未修改时返回 HTML，否则返回 None
+    """
+    input_path = Path(input_file)
+    if not input_path.exists():
+        return None
+    entry = _analysis_cache.get(_analysis_cache_key(input_path))
+    return entry['html'] if entry else None
+
+
+def analyze_file_complexity(input_file, fast=False):
     """
     分析文件复杂度，提供转换建议
 
     Args:
         input_file (str): 输入文件路径
+        fast (bool): 对 DOCX 文件直接解析 word/document.xml，不调用 pandoc，
+            也不会生成可供两步法复用的 HTML
 
     Returns:
         dict: 分析结果和建议
@@ -34,94 +67,46 @@ def analyze_file_complexity(input_file):
     if not input_path.exists():
         raise FileNotFoundError(f"输入文件不存在: {input_file}")
 
-    # 生成临时 HTML 用于分析
-    from tempfile import NamedTemporaryFile
+    if fast and input_path.suffix.lower() == '.docx':
+        try:
+            return analyze_docx_complexity(input_path)
+        except ValueError as e:
+            print(f"[警告] 快速分析失败，改用 pandoc 分析: {e}")
+
+    cache_key = _analysis_cache_key(input_path)
+    if cache_key in _analysis_cache:
+        print("[分析] 使用本次会话中的分析结果")
+        return _analysis_cache[cache_key]['result']
+
     import pypandoc
 
     print("[分析] 正在分析文件复杂度...")
 
     try:
-        # 创建临时 HTML 文件
-        with NamedTemporaryFile(mode='w', suffix='.html', delete=False, encoding='utf-8') as temp_file:
-            temp_html_path = Path(temp_file.name)
-
-        # 转换为 HTML
-        pypandoc.convert_file(
+        # 转换为 HTML（保留在内存中，供随后的两步法转换复用）
+        html_content = pypandoc.convert_file(
             str(input_path),
             'html',
-            outputfile=str(temp_html_path),
             extra_args=['--standalone']
         )
 
-        # 读取 HTML
-        with open(temp_html_path, 'r', encoding='utf-8') as f:
-            html_content = f.read()
-
         # 验证表格结构
         validation = validate_table_structure(html_content)
 
-        # 删除临时文件
-        temp_html_path.unlink()
-
-        # 分析结果
-        analysis = {
-            'table_count': validation['tables'],
-            'has_issues': len(validation['issues']) > 0,
-            'issues': validation['issues'],
-            'colspan_count': sum(1 for w in validation['warnings'] if 'colspan' in w) if validation['warnings'] else 0,
-            'rowspan_count': sum(1 for w in validation['warnings'] if 'rowspan' in w) if validation['warnings'] else 0,
-        }
-
-        # 提供建议
-        recommendations = []
-
-        if analysis['table_count'] == 0:
-            recommendations.append({
-                'method': '普通转换',
-                'format': 'markdown',
-                'reason': '文件中没有表格，使用普通转换即可'
-            })
-        elif analysis['colspan_count'] > 5 or analysis['rowspan_count'] > 5:
-            recommendations.append({
-                'method': '先转HTML再转管道表',
-                'format': 'gfm',
-                'reason': f'检测到 {analysis["colspan_count"]} 个合并单元格，建议使用两步法'
-            })
-            recommendations.append({
-                'method': '转网格表',
-                'format': 'markdown+grid_tables',
-                'reason': '网格表对复杂表格支持更好'
-            })
-        elif analysis['table_count'] > 5:
-            recommendations.append({
-                'method': '转管道表 (GFM)',
-                'format': 'gfm',
-                'reason': f'检测到 {analysis["table_count"]} 个表格，GFM 格式支持较好'
-            })
-            recommendations.append({
-                'method': '转网格表',
-                'format': 'markdown+grid_tables',
-                'reason': '多个表格，网格表更稳定'
-            })
-        else:
-            recommendations.append({
-                'method': '转管道表 (GFM)',
-                'format': 'gfm',
-                'reason': '简单表格，推荐 GFM 格式'
-            })
+        analysis = analysis_from_validation(validation)
+        recommendations = build_recommendations(analysis)
 
-        if analysis['has_issues']:
-            recommendations.insert(0, {
-                'method': '先转HTML再转管道表',
-                'format': 'gfm',
-                'reason': f'检测到问题: {", ".join(analysis["issues"])}'
-            })
-
-        return {
+        result = {
             'analysis': analysis,
             'recommendations': recommendations
         }
 
+        if len(_analysis_cache) >= _ANALYSIS_CACHE_SIZE:
+            _analysis_cache.pop(next(iter(_analysis_cache)))
+        _analysis_cache[cache_key] = {'html': html_content, 'result': result}
+
+        return result
+
     except Exception as e:
         print(f"[警告] 无法分析文件复杂度: {e}")
         return {
@@ -250,16 +235,20 @@ def single_file_conversion():
                     str(input_path),
                     output_file,
                     format_type='gfm',  # 先用 GFM
-                    extra_args=['--wrap=none']
+                    extra_args=['--wrap=none'],
+                    in_memory=True,
+                    html_content=get_analysis_html(input_path)
                 )
                 print(f"  [提示] 网格表已转换，可能需要手动调整")
             else:
-                # 标准 GFM 两步法
+                # 标准 GFM 两步法（复用分析时生成的 HTML）
                 convert_with_html_intermediate(
                     str(input_path),
                     output_file,
                     format_type=format_type,
-                    extra_args=['--wrap=none']
+                    extra_args=['--wrap=none'],
+                    in_memory=True,
+                    html_content=get_analysis_html(input_path)
                 )
         else:
             # 单步转换
@@ -269,10 +258,8 @@ def single_file_conversion():
                 output_path = Path(output_file).absolute()
                 output_path.parent.mkdir(parents=True, exist_ok=True)
 
-                extra_args = [
-                    '--wrap=none',
-                    '--atx-headers'
-                ]
+                # --atx-headers 在 pandoc 2.11.2 后改为 --markdown-headings=atx，按探测结果选择
+                extra_args = ['--wrap=none'] + atx_heading_args()
 
                 pypandoc.convert_file(
                     str(input_path),
@@ -0,0 +1,127 @@
+"""
+共享媒体库 - 批量转换中按内容去重保存文档中的图片
+pandoc 的 --extract-media 为每个文档各写一份图片，同一 logo、信头在大量文档中反复出现时，
+输出中保存着成千上万份相同的文件。这里每个文档先提取到媒体库内的临时目录，
+图片按内容哈希移入库中（同一内容只保存一份），再把输出文档中的图片路径改写为库中的文件。
+"""
+
+import os
+import re
+from pathlib import Path
+from urllib.parse import quote
+
+from conversion_cache import hash_file
+
+
+# 各文档的临时提取目录所在的子目录（与库位于同一文件系统，图片移入库中只需重命名）
+INCOMING_DIR = '.incoming'
+
+
+def media_path(store_dir, digest, suffix):
+    """库中文件路径，按哈希前两位分目录，避免单目录文件过多"""
+    return Path(store_dir) / digest[:2] / f"{digest}{suffix.lower()}"
+
+
+def extraction_dir(store_dir):
+    """
+    为一个文档创建临时提取目录，作为 --extract-media 的参数
+
+    Returns:
+        tempfile.TemporaryDirectory: 临时目录，退出上下文时连同未入库的文件一起删除
+    """
+    from tempfile import TemporaryDirectory
+
+    incoming = Path(store_dir).absolute() / INCOMING_DIR
+    incoming.mkdir(parents=True, exist_ok=True)
+    return TemporaryDirectory(prefix='doc-', dir=incoming)
+
+
+def _store_file(store_dir, file_path):
+    """
+    将提取的文件移入库中，内容相同的文件已存在时直接删除
+
+    Returns:
+        tuple: (库中文件路径, 是否新写入)
+    """
+    target = media_path(store_dir, hash_file(file_path), os.path.splitext(file_path)[1])
+    if target.exists():
+        os.unlink(file_path)
+        return target, False
+    target.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        # 硬链接在目标已存在时失败，多个进程同时写入同一内容时只有一个成功
+        os.link(file_path, target)
+    except FileExistsError:
+        os.unlink(file_path)
+        return target, False
+    except OSError:
+        # 不支持硬链接的文件系统
+        os.replace(file_path, target)
+        return target, True
+    os.unlink(file_path)
+    return target, True
+
+
+def _rewrite_references(output_file, references):
+    """将输出文件中的提取路径替换为库中文件的相对路径（逐行写入临时文件后替换）"""
+    output_path = Path(output_file)
+    output_dir = output_path.absolute().parent
+    replacements = {}
+    for reference, target in references.items():
+        relative = os.path.relpath(target, output_dir).replace(os.sep, '/')
+        # pandoc 写出的路径可能经过 URL 编码（如空格写为 %20）
+        replacements[reference] = relative
+        replacements[quote(reference)] = quote(relative)
+    pattern = re.compile('|'.join(re.escape(r) for r in sorted(replacements, key=len, reverse=True)))
+
+    partial_path = output_path.with_name(output_path.name + '.partial')
+    try:
+        with open(output_path, 'r', encoding='utf-8') as reader, \
+                open(partial_path, 'w', encoding='utf-8') as writer:
+            for line in reader:
+                writer.write(pattern.sub(lambda m: replacements[m.group(0)], line))
+        os.replace(partial_path, output_path)
+    finally:
+        if partial_path.exists():
+            partial_path.unlink()
+
+
+def collect_media(store_dir, extract_dir, output_files):
+    """
+    将临时目录中提取的图片按内容存入媒体库，并改写输出文档中的图片路径
+
+    Args:
+        store_dir (str): 媒体库目录
+        extract_dir (str): 转换时 --extract-media 使用的临时目录（见 extraction_dir）
+        output_files (list): 引用这些图片的输出文件（多格式输出时为多个）
+
+    Returns:
+        dict: {
+            'files': 提取的图片数,
+            'stored': 新写入库中的图片数,
+            'deduplicated': 库中已有、未重复保存的图片数,
+            'bytes_saved': 去重节省的字节数
+        }
+    """
+    stats = {'files': 0, 'stored': 0, 'deduplicated': 0, 'bytes_saved': 0}
+    references = {}
+    for root, _, names in os.walk(extract_dir):
+        for name in names:
+            file_path = os.path.join(root, name)
+            size = os.path.getsize(file_path)
+            target, stored = _store_file(store_dir, file_path)
+            stats['files'] += 1
+            if stored:
+                stats['stored'] += 1
+            else:
+                stats['deduplicated'] += 1
+                stats['bytes_saved'] += size
+            # pandoc 以 "提取目录/相对路径" 引用图片，Windows 上分隔符可能为 / 或 \
+            relative = os.path.relpath(file_path, extract_dir)
+            references[os.path.join(extract_dir, relative)] = target
+            references[extract_dir + '/' + relative.replace(os.sep, '/')] = target
+
+    if references:
+        for output_file in output_files:
+            _rewrite_references(output_file, references)
+    return stats
@@ -0,0 +1,152 @@
+"""
+多格式输出 - 文档只解析一次，从 JSON AST 渲染多种输出格式
+同一文档需要 gfm、markdown 和网格表格式等多个版本时，DOCX 只由 pandoc 读取一次，
+得到的 JSON AST 写入磁盘（指定缓存目录时存入转换缓存，之后再增加格式也不必重新解析），
+各格式再从 AST 并发渲染。读取阶段的参数（如 --extract-media）只在生成 AST 时传入。
+"""
+
+import os
+import re
+from pathlib import Path
+
+from conversion_cache import hash_file, make_cache_key, lookup_cache, store_cache
+from conversion_metrics import stage
+
+
+# 交互式工具使用的网格表格式
+GRID_FORMAT = 'markdown+grid_tables-simple_tables-pipe_tables-multiline_tables'
+
+# 格式别名，也用作输出文件名中的格式标签
+FORMAT_ALIASES = {
+    'grid': GRID_FORMAT,
+}
+
+
+def parse_formats(format_type):
+    """
+    解析输出格式列表
+
+    Args:
+        format_type (str | list): 单个格式、逗号分隔的多个格式（如 'gfm,markdown,grid'）或格式列表，
+            支持 FORMAT_ALIASES 中的别名
+
+    Returns:
+        list: 去重后的格式列表（保持原顺序）
+    """
+    if isinstance(format_type, str):
+        format_type = format_type.split(',')
+    formats = []
+    for name in format_type:
+        name = FORMAT_ALIASES.get(name.strip(), name.strip())
+        if name and name not in formats:
+            formats.append(name)
+    return formats
+
+
+def format_label(format_type):
+    """输出文件名中的格式标签: 别名或将格式中的扩展符号替换为下划线"""
+    for alias, name in FORMAT_ALIASES.items():
+        if name == format_type:
+            return alias
+    return re.sub(r'[^A-Za-z0-9_]+', '_', format_type).strip('_')
+
+
+def format_output_path(output_file, format_type):
+    """
+    多格式输出时各格式的输出文件路径（如 doc.md -> doc.gfm.md、doc.grid.md）
+
+    Returns:
+        Path: 输出文件路径
+    """
+    output_path = Path(output_file)
+    return output_path.with_name(f"{output_path.stem}.{format_label(format_type)}{output_path.suffix}")
+
+
+def convert_formats(input_file, output_file, formats, extra_args, cache_dir=None, pandoc_version=None,
+                    metrics=None, jobs=None):
+    """
+    读取一次输入文件，渲染多种输出格式
+
+    Args:
+        input_file (str): 输入文件路径
+        output_file (str): 输出文件路径，各格式的实际路径见 format_output_path()
+        formats (list): 输出格式列表
+        extra_args (list): pandoc 参数，读取阶段的参数用于生成 AST，其余用于渲染各格式
+        cache_dir (str, optional): 转换缓存目录。各格式的输出与单格式转换共用缓存条目，
+            AST 也存入缓存，之后请求其他格式时不必重新读取输入文件
+        pandoc_version (str, optional): pandoc 版本号（用于缓存键）
+        metrics (callable, optional): 指标回调（见 conversion_metrics）
+        jobs (int, optional): 并发渲染的 pandoc 进程数，默认为 CPU 核心数
+
+    Returns:
+        dict: {'outputs': {格式: 输出文件路径}, 'cache_hits': 命中缓存的格式列表}
+    """
+    import pypandoc
+    from concurrent.futures import ThreadPoolExecutor
+    from tempfile import TemporaryDirectory
+
+    from split_converter import _split_args
+
+    input_path = Path(input_file).absolute()
+    reader_args, writer_args = _split_args(extra_args)
+    outputs = {name: format_output_path(output_file, name) for name in formats}
+
+    # 各格式和 AST 的缓存键都由同一个输入哈希生成，输入文件只读取一次
+    input_hash = hash_file(input_path) if cache_dir is not None else None
+
+    # 各格式先查缓存，全部命中时不需要 pandoc 读取输入文件
+    pending = []
+    cache_hits = []
+    for name, path in outputs.items():
+        cache_key = None
+        if cache_dir is not None:
+            with stage(metrics, 'cache_lookup', input=str(input_path), format=name) as record:
+                cache_key = make_cache_key(input_path, name, extra_args, pandoc_version=pandoc_version,
+                                           input_hash=input_hash)
+                cache_hit = lookup_cache(cache_dir, cache_key, path)
+                record['result'] = 'hit' if cache_hit else 'miss'
+            if cache_hit:
+                print(f"[CACHE] 命中缓存: {input_path} -> {path} (格式: {name})")
+                cache_hits.append(name)
+                continue
+        pending.append((name, path, cache_key))
+
+    if pending:
+        with TemporaryDirectory(prefix='pypandoc-ast-') as work_dir:
+            ast_path = Path(work_dir) / 'document.json'
+
+            # 读取一次，得到整篇文档的 AST
+            with stage(metrics, 'read_ast', input=str(input_path)) as record:
+                record['input_bytes'] = input_path
+                ast_key = None
+                if cache_dir is not None:
+                    ast_key = make_cache_key(input_path, 'json', reader_args, pandoc_version=pandoc_version,
+                                             input_hash=input_hash)
+                if ast_key is not None and lookup_cache(cache_dir, ast_key, ast_path):
+                    record['result'] = 'hit'
+                else:
+                    pypandoc.convert_file(str(input_path), 'json', outputfile=str(ast_path), extra_args=reader_args)
+                    if ast_key is not None:
+                        store_cache(cache_dir, ast_key, ast_path)
+                record['output_bytes'] = ast_path
+
+            def render(item):
+                name, path, cache_key = item
+                pypandoc.convert_file(str(ast_path), name, format='json', outputfile=str(path),
+                                      extra_args=writer_args)
+                if cache_key is not None:
+                    store_cache(cache_dir, cache_key, path)
+
+            if not jobs or jobs < 0:
+                jobs = os.cpu_count() or 1
+            with stage(metrics, 'render_formats', input=str(input_path)) as record:
+                record['formats'] = len(pending)
+                with ThreadPoolExecutor(max_workers=min(jobs, len(pending))) as executor:
+                    list(executor.map(render, pending))
+                record['output_bytes'] = sum(path.stat().st_size for _, path, _ in pending)
+
+    for name, path in outputs.items():
+        if name not in cache_hits:
+            print(f"[OK] 转换成功: {input_path} -> {path} (格式: {name})")
+
+    return {'outputs': outputs, 'cache_hits': cache_hits}
@@ -0,0 +1,313 @@
+"""
+pandoc 能力探测 - 记录 pandoc 路径、版本、支持的格式、扩展和命令行选项
+探测结果缓存在磁盘上，pandoc 可执行文件变化（路径、修改时间或大小不同）时自动重新探测；
+同一进程内只读取一次。转换前用它检查输出格式和 pandoc 参数，无效的选项立即报错，
+不必等到为每个文件启动 pandoc 之后才失败。
+"""
+
+import json
+import os
+import re
+import shutil
+from pathlib import Path
+
+
+# 探测结果格式版本，变更记录字段时递增，使旧缓存自动失效
+PROBE_FORMAT_VERSION = 1
+
+# 默认缓存文件位置
+DEFAULT_PROBE_CACHE = Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache') / 'pypandoc-converter' / 'pandoc_probe.json'
+
+# 已被新版 pandoc 移除的选项及其替代写法
+REMOVED_OPTIONS = {
+    '--atx-headers': '--markdown-headings=atx',
+    '--base-header-level': '--shift-heading-level-by',
+    '--smart': '格式扩展 +smart',
+}
+
+_OPTION_RE = re.compile(r'(?<![\w-])(--[a-z0-9][a-z0-9-]*|-[A-Za-z])(?![\w-])')
+
+# 当前进程中已加载的探测结果
+_probe = None
+
+# {(PYPANDOC_PANDOC, PATH): pandoc 路径}
+_candidates = {}
+
+
+def _run_pandoc(pandoc_path, *args):
+    """运行 pandoc 并返回标准输出"""
+    import subprocess
+
+    result = subprocess.run([pandoc_path, *args], capture_output=True, timeout=30)
+    if result.returncode != 0:
+        raise OSError(result.stderr.decode('utf-8', errors='replace').strip() or f"pandoc {' '.join(args)} 失败")
+    return result.stdout.decode('utf-8', errors='replace')
+
+
+def _binary_signature(pandoc_path):
+    """pandoc 可执行文件的 (修改时间, 大小)，文件不存在时返回 None"""
+    try:
+        stat = os.stat(pandoc_path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _pypandoc_path():
+    """由 pypandoc 查找的 pandoc 路径（例如 pypandoc_binary 自带的 pandoc），找不到时返回 None"""
+    try:
+        import pypandoc
+        return pypandoc.get_pandoc_path()
+    except (ImportError, OSError):
+        return None
+
+
+def _candidate_path():
+    """
+    当前实际使用的 pandoc 路径: PYPANDOC_PANDOC 环境变量、PATH 中的 pandoc，
+    都没有时与 pypandoc 一致（由 pypandoc 查找），找不到时返回 None
+    """
+    # 按环境变量缓存查找结果，避免每次检查都遍历 PATH
+    env = (os.environ.get('PYPANDOC_PANDOC'), os.environ.get('PATH'))
+    if env not in _candidates:
+        path = env[0] or shutil.which('pandoc') or _pypandoc_path()
+        _candidates[env] = str(Path(path).resolve()) if path else None
+    return _candidates[env]
+
+
+def _parse_extensions(text):
+    """解析 --list-extensions 的输出，返回 {扩展名: 是否默认启用}"""
+    extensions = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if len(line) > 1 and line[0] in '+-':
+            extensions[line[1:]] = line[0] == '+'
+    return extensions
+
+
+def _run_probe(pandoc_path):
+    """调用 pandoc 收集能力信息"""
+    version_text = _run_pandoc(pandoc_path, '--version')
+    match = re.search(r'pandoc(?:\.exe)?\s+(\d+(?:\.\d+)*)', version_text)
+    help_text = _run_pandoc(pandoc_path, '--help')
+
+    return {
+        'version': match.group(1) if match else None,
+        'input_formats': _run_pandoc(pandoc_path, '--list-input-formats').split(),
+        'output_formats': _run_pandoc(pandoc_path, '--list-output-formats').split(),
+        'options': sorted(set(_OPTION_RE.findall(help_text))),
+        # 各格式支持的扩展按需探测（见 format_extensions）
+        'extensions': {},
+    }
+
+
+def _load_cache(cache_file):
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get('probe_format') != PROBE_FORMAT_VERSION:
+        return None
+    return data
+
+
+def _save_cache(cache_file, data):
+    """写入缓存文件（先写临时文件再原子替换，支持多进程并发写入）"""
+    cache_path = Path(cache_file)
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        # 缓存不可写时只是每次重新探测
+        print(f"[WARNING] 无法写入 pandoc 探测缓存: {e}")
+
+
+def probe_pandoc(cache_file=None, refresh=False):
+    """
+    获取 pandoc 的能力信息
+
+    优先使用进程内和磁盘上的缓存；缓存中记录的可执行文件路径与当前实际使用的
+    pandoc（见 _candidate_path）不同，或修改时间、大小不一致时重新探测。
+
+    Args:
+        cache_file (str, optional): 缓存文件路径，默认为 DEFAULT_PROBE_CACHE
+        refresh (bool): 忽略缓存，强制重新探测
+
+    Returns:
+        dict: {'path', 'signature', 'version', 'input_formats', 'output_formats',
+            'options': 支持的命令行选项, 'extensions': {格式: {扩展名: 是否默认启用}}}
+
+    Raises:
+        OSError: 找不到 pandoc 或 pandoc 无法运行
+    """
+    global _probe
+
+    cache_file = cache_file or DEFAULT_PROBE_CACHE
+    pandoc_path = _candidate_path()
+    if pandoc_path is None:
+        # 找不到 pandoc 时不使用缓存，缓存中的路径不一定是 pypandoc 会使用的 pandoc
+        raise OSError("找不到 pandoc，请安装 pandoc 或 pypandoc_binary，或设置 PYPANDOC_PANDOC")
+
+    if not refresh:
+        for data in (_probe, _load_cache(cache_file)):
+            if data is None or data['path'] != pandoc_path:
+                continue
+            if data['signature'] == _binary_signature(data['path']):
+                _probe = data
+                return data
+
+    data = {
+        'probe_format': PROBE_FORMAT_VERSION,
+        'path': pandoc_path,
+        'signature': _binary_signature(pandoc_path),
+        **_run_probe(pandoc_path),
+    }
+    _save_cache(cache_file, data)
+    _probe = data
+    return data
+
+
+def format_extensions(base_format, cache_file=None):
+    """
+    获取格式支持的扩展（首次查询某格式时调用 pandoc，结果写入探测缓存）
+
+    Returns:
+        dict | None: {扩展名: 是否默认启用}；该版本 pandoc 不支持查询时返回 None
+    """
+    data = probe_pandoc(cache_file)
+    if base_format not in data['extensions']:
+        try:
+            extensions = _parse_extensions(_run_pandoc(data['path'], f'--list-extensions={base_format}'))
+        except OSError:
+            extensions = None
+        data['extensions'][base_format] = extensions
+        _save_cache(cache_file or DEFAULT_PROBE_CACHE, data)
+    return data['extensions'][base_format]
+
+
+def supports_option(option, cache_file=None):
+    """pandoc 是否支持命令行选项（如 '--markdown-headings'）"""
+    return option in probe_pandoc(cache_file)['options']
+
+
+def atx_heading_args(cache_file=None):
+    """
+    要求 ATX 标题（# 标题）的参数：新版 pandoc 使用 --markdown-headings=atx，
+    旧版使用 --atx-headers
+
+    Returns:
+        list: pandoc 参数
+    """
+    if supports_option('--markdown-headings', cache_file):
+        return ['--markdown-headings=atx']
+    if supports_option('--atx-headers', cache_file):
+        return ['--atx-headers']
+    return []
+
+
+def _check_format(format_spec, known_formats, kind, cache_file):
+    """检查格式名称和扩展，返回问题列表"""
+    problems = []
+    parts = re.split(r'([+-])', format_spec)
+    base_format = parts[0]
+    if known_formats and base_format not in known_formats:
+        problems.append(f"pandoc {kind}格式不受支持: {base_format}")
+        return problems
+
+    if len(parts) > 1:
+        extensions = format_extensions(base_format, cache_file)
+        if extensions is not None:
+            for extension in parts[2::2]:
+                if extension not in extensions:
+                    problems.append(f"{base_format} 格式不支持扩展: {extension}")
+    return problems
+
+
+def validate_options(format_type, extra_args=None, input_format=None, cache_file=None):
+    """
+    根据探测结果检查输出格式、输入格式和 pandoc 参数
+
+    Args:
+        format_type (str): 输出格式（可带扩展，如 markdown+grid_tables-simple_tables）
+        extra_args (list, optional): pandoc 参数
+        input_format (str, optional): 输入格式
+        cache_file (str, optional): 探测缓存文件路径
+
+    Returns:
+        list: 问题描述列表，为空表示全部有效
+    """
+    data = probe_pandoc(cache_file)
+    problems = _check_format(format_type, data['output_formats'], '输出', cache_file)
+    if input_format:
+        problems += _check_format(input_format, data['input_formats'], '输入', cache_file)
+
+    options = set(data['options'])
+    if not options:
+        return problems
+    for arg in extra_args or []:
+        if arg.startswith('--'):
+            name = arg.split('=', 1)[0]
+        elif arg.startswith('-') and len(arg) > 1 and arg[1].isalpha():
+            name = arg[:2]
+        else:
+            # 选项的值（如 --metadata 后的 key=value）
+            continue
+        if name not in options:
+            hint = REMOVED_OPTIONS.get(name)
+            problems.append(f"pandoc {data['version']} 不支持参数 {name}" + (f"，请改用 {hint}" if hint else ""))
+    return problems
+
+
+def check_options(format_type, extra_args=None, input_format=None, cache_file=None):
+    """
+    与 validate_options 相同，发现问题时抛出 ValueError
+
+    Raises:
+        ValueError: 格式或参数无效
+    """
+    problems = validate_options(format_type, extra_args, input_format, cache_file)
+    if problems:
+        raise ValueError('; '.join(problems))
+
+
+def main():
+    """命令行入口: 显示探测结果"""
+    import sys
+
+    args = sys.argv[1:]
+    if args and args[0] in ('-h', '--help'):
+        print("用法:")
+        print("  python pandoc_probe.py [--refresh] [--json]")
+        print("  python pandoc_probe.py --check <format> [pandoc 参数...]")
+        sys.exit(0)
+
+    if args and args[0] == '--check':
+        if len(args) < 2:
+            print("[ERROR] --check 需要输出格式")
+            sys.exit(1)
+        problems = validate_options(args[1], args[2:])
+        for problem in problems:
+            print(f"[ERROR] {problem}")
+        if problems:
+            sys.exit(1)
+        print("[OK] 格式和参数均受支持")
+        return
+
+    data = probe_pandoc(refresh='--refresh' in args)
+    if '--json' in args:
+        print(json.dumps(data, ensure_ascii=False, indent=2))
+        return
+    print(f"pandoc 路径: {data['path']}")
+    print(f"pandoc 版本: {data['version']}")
+    print(f"输入格式: {len(data['input_formats'])} 种")
+    print(f"输出格式: {len(data['output_formats'])} 种")
+    print(f"命令行选项: {len(data['options'])} 个")
+    print(f"缓存文件: {DEFAULT_PROBE_CACHE}")
+
+
+if __name__ == '__main__':
+    main()
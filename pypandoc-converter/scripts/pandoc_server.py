@@ -0,0 +1,306 @@
+"""
+常驻 pandoc 服务 - 通过 `pandoc server` 复用同一个 pandoc 进程完成多次转换
+对大量小文档的批量转换，可以省去每个文件启动 pandoc 进程的开销。
+服务不可用或参数不受支持时返回 None，由调用方回退为逐个启动 pandoc 进程。
+"""
+
+import base64
+import json
+import socket
+import time
+from pathlib import Path
+
+
+# 单次转换的超时时间（秒），同时作为 `pandoc server --timeout` 的参数
+DEFAULT_CONVERSION_TIMEOUT = 300
+
+# 根据扩展名确定输入格式（server 模式必须显式指定）
+INPUT_FORMATS = {
+    '.docx': 'docx',
+    '.odt': 'odt',
+    '.epub': 'epub',
+    '.html': 'html',
+    '.htm': 'html',
+    '.md': 'markdown',
+    '.markdown': 'markdown',
+    '.txt': 'markdown',
+    '.rst': 'rst',
+    '.tex': 'latex',
+    '.rtf': 'rtf',
+    '.org': 'org',
+    '.ipynb': 'ipynb',
+}
+
+# 需要 base64 编码传输的二进制输入格式
+BINARY_FORMATS = {'docx', 'odt', 'epub'}
+
+# 各进程内记录的服务健康状态 {url: bool}
+_server_health = {}
+
+
+class PandocServerError(Exception):
+    """pandoc server 返回的转换错误"""
+
+
+class PandocServer:
+    """
+    pandoc server 客户端
+
+    既可以连接已有的服务（PandocServer(url)），也可以用 PandocServer.launch()
+    在本机启动一个服务进程，此时 close() 会结束该进程。
+    """
+
+    def __init__(self, url, process=None):
+        self.url = url.rstrip('/')
+        self.process = process
+
+    @classmethod
+    def launch(cls, port=None, timeout=DEFAULT_CONVERSION_TIMEOUT, startup_timeout=10):
+        """
+        在本机启动 pandoc server
+
+        Args:
+            port (int, optional): 监听端口，默认自动选择空闲端口
+            timeout (int): 单次转换的超时时间（秒）
+            startup_timeout (float): 等待服务就绪的最长时间（秒）
+
+        Returns:
+            PandocServer: 已就绪的服务
+        """
+        import subprocess
+
+        from pandoc_probe import probe_pandoc
+
+        if port is None:
+            with socket.socket() as sock:
+                sock.bind(('127.0.0.1', 0))
+                port = sock.getsockname()[1]
+
+        process = subprocess.Popen(
+            [probe_pandoc()['path'], 'server', '--port', str(port), '--timeout', str(timeout)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        server = cls(f"http://127.0.0.1:{port}", process=process)
+
+        deadline = time.monotonic() + startup_timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"pandoc server 启动失败 (退出码 {process.returncode})")
+            if server.is_healthy():
+                return server
+            time.sleep(0.1)
+
+        server.close()
+        raise RuntimeError(f"pandoc server 在 {startup_timeout} 秒内未就绪")
+
+    def is_healthy(self, timeout=2):
+        """检查服务是否可用"""
+        import urllib.error
+        import urllib.request
+
+        try:
+            with urllib.request.urlopen(f"{self.url}/version", timeout=timeout) as response:
+                return response.status == 200
+        except (urllib.error.URLError, OSError):
+            return False
+
+    def convert(self, data, from_format, to_format, options=None, timeout=DEFAULT_CONVERSION_TIMEOUT):
+        """
+        发送一次转换请求
+
+        Args:
+            data (str | bytes): 输入内容，二进制格式传入 bytes
+            from_format (str): 输入格式
+            to_format (str): 输出格式
+            options (dict, optional): pandoc server 的转换选项
+            timeout (float): 请求超时时间（秒）
+
+        Returns:
+            str: 转换结果
+
+        Raises:
+            PandocServerError: 转换失败
+            OSError: 无法连接服务
+        """
+        import urllib.error
+        import urllib.request
+
+        request_body = dict(options or {})
+        request_body['from'] = from_format
+        request_body['to'] = to_format
+        if isinstance(data, bytes):
+            request_body['text'] = base64.b64encode(data).decode('ascii')
+        else:
+            request_body['text'] = data
+
+        request = urllib.request.Request(
+            f"{self.url}/",
+            data=json.dumps(request_body).encode('utf-8'),
+            headers={'Content-Type': 'application/json', 'Accept': 'application/json'}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                payload = json.loads(response.read().decode('utf-8'))
+        except urllib.error.HTTPError as e:
+            raise PandocServerError(e.read().decode('utf-8', errors='replace').strip() or str(e))
+
+        if 'error' in payload:
+            raise PandocServerError(payload['error'])
+        output = payload.get('output', '')
+        if payload.get('base64'):
+            raise PandocServerError(f"不支持二进制输出格式: {to_format}")
+        return output
+
+    def close(self):
+        """结束由 launch() 启动的服务进程"""
+        if self.process is not None and self.process.poll() is None:
+            import subprocess
+
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def server_options(extra_args):
+    """
+    将 pandoc 命令行参数转换为 pandoc server 的 JSON 选项
+
+    Args:
+        extra_args (list): pandoc 命令行参数
+
+    Returns:
+        dict | None: 转换后的选项；包含无法映射的参数时返回 None
+    """
+    flags = {
+        '--standalone': 'standalone',
+        '-s': 'standalone',
+        '--toc': 'table-of-contents',
+        '--table-of-contents': 'table-of-contents',
+        '--number-sections': 'number-sections',
+        '-N': 'number-sections',
+        '--strip-comments': 'strip-comments',
+        '--reference-links': 'reference-links',
+        '--ascii': 'ascii',
+    }
+    valued = {
+        '--wrap': ('wrap', str),
+        '--columns': ('columns', int),
+        '--toc-depth': ('toc-depth', int),
+        '--shift-heading-level-by': ('shift-heading-level-by', int),
+        '--track-changes': ('track-changes', str),
+        '--tab-stop': ('tab-stop', int),
+    }
+
+    options = {}
+    for arg in extra_args or []:
+        if arg in flags:
+            options[flags[arg]] = True
+            continue
+        name, _, value = arg.partition('=')
+        if name == '--markdown-headings' and value in ('atx', 'setext'):
+            options['setext-headings'] = value == 'setext'
+        elif name in valued and value:
+            key, cast = valued[name]
+            try:
+                options[key] = cast(value)
+            except ValueError:
+                return None
+        else:
+            return None
+    return options
+
+
+def _server_for(server_url):
+    """返回可用的服务客户端；同一进程内只做一次健康检查，失败后不再重试"""
+    healthy = _server_health.get(server_url)
+    server = PandocServer(server_url)
+    if healthy is None:
+        healthy = server.is_healthy()
+        _server_health[server_url] = healthy
+        if not healthy:
+            print(f"[WARNING] pandoc server 不可用: {server_url}，回退为逐个启动 pandoc")
+    return server if healthy else None
+
+
+def try_convert(server_url, data, from_format, to_format, extra_args, outputfile=None, timeout=None):
+    """
+    尝试通过 pandoc server 转换内容
+
+    Args:
+        server_url (str): 服务地址
+        data (str | bytes): 输入内容
+        from_format (str): 输入格式
+        to_format (str): 输出格式
+        extra_args (list): pandoc 命令行参数
+        outputfile (str, optional): 输出文件路径
+        timeout (float, optional): 请求超时时间（秒），默认为 DEFAULT_CONVERSION_TIMEOUT
+
+    Returns:
+        str | None: 与 pypandoc 一致，指定 outputfile 时返回空字符串，否则返回转换结果；
+            需要回退为逐个启动 pandoc 时返回 None
+
+    Raises:
+        PandocServerError: 服务正常但文档转换失败
+        TimeoutError: 指定了 timeout 且服务未在此时间内完成转换
+    """
+    options = server_options(extra_args)
+    if options is None:
+        return None
+
+    server = _server_for(server_url)
+    if server is None:
+        return None
+
+    if timeout is not None and timeout <= 0:
+        raise TimeoutError("转换超时，未发送 pandoc server 请求")
+    try:
+        output = server.convert(data, from_format, to_format, options,
+                                timeout=DEFAULT_CONVERSION_TIMEOUT if timeout is None else timeout)
+    except OSError as e:
+        # 调用方给定的截止时间已到，服务本身不一定不可用
+        if timeout is not None and (isinstance(e, socket.timeout) or isinstance(getattr(e, 'reason', None),
+                                                                                socket.timeout)):
+            raise TimeoutError("pandoc server 未在截止时间前完成转换") from None
+        _server_health[server_url] = False
+        print(f"[WARNING] pandoc server 连接失败: {e}，回退为逐个启动 pandoc")
+        return None
+
+    if outputfile is None:
+        return output
+    with open(outputfile, 'w', encoding='utf-8') as f:
+        f.write(output)
+    return ''
+
+
+def try_convert_file(server_url, input_file, to_format, extra_args, outputfile=None):
+    """
+    尝试通过 pandoc server 转换文件，输入格式由扩展名确定
+
+    Returns:
+        str | None: 同 try_convert()；无法确定输入格式或无法读取文件（如不是 UTF-8 编码）时返回 None，
+            由 pandoc 自行读取并报告错误
+    """
+    input_path = Path(input_file)
+    from_format = INPUT_FORMATS.get(input_path.suffix.lower())
+    if from_format is None:
+        return None
+
+    try:
+        if from_format in BINARY_FORMATS:
+            data = input_path.read_bytes()
+        else:
+            data = input_path.read_text(encoding='utf-8')
+    except (UnicodeDecodeError, OSError):
+        return None
+
+    return try_convert(server_url, data, from_format, to_format, extra_args, outputfile=outputfile)
@@ -3,10 +3,260 @@ HTML 表格预处理工具
 用于修复 DOCX 转换为 HTML 后的表格问题，确保正确转换为 Markdown
 """
 
+import heapq
+import os
 import re
 from pathlib import Path
 
 
+# 扫描时需要逐个处理的标签：以 <col 开头的标签（含 <colgroup>）和 </colgroup>
+# （以字面前缀开头，便于正则引擎快速定位）。与原先的正则一致，<col 前缀不区分大小写，
+# 带空列样式的 <colgroup ...> 开始标签也按空列删除
+_COL_TAG_RE = re.compile(r'<col[^>]*>', re.IGNORECASE)
+_COLGROUP_END_RE = re.compile(r'</colgroup>', re.IGNORECASE)
+# 只需计数的标签，直接在当前块上统计
+_TABLE_RE = re.compile(r'<table[^>]*>', re.IGNORECASE)
+_COLSPAN_CELL_RE = re.compile(r'<td[^>]*colspan=["\']\d+["\']', re.IGNORECASE)
+_ROWSPAN_CELL_RE = re.compile(r'<td[^>]*rowspan=["\']\d+["\']', re.IGNORECASE)
+# 需要删除的空列样式（width: 0% 或 display: none），在单个 <col...> 标签内查找
+_EMPTY_COL_STYLE_RE = re.compile(
+    r'style=["\'][^"\']*(?:width:\s*0%|display:\s*none)[^"\']*["\']', re.IGNORECASE)
+# 零宽度列样式（用于验证报告）
+_ZERO_WIDTH_STYLE_RE = re.compile(r'style=["\'][^"\']*width:\s*0%[^"\']*["\']', re.IGNORECASE)
+# 标签间空白
+_INTER_TAG_WS_RE = re.compile(r'>\s+<')
+
+# 扫描时每次处理的字符数，块内容在 CPU 缓存中完成全部正则处理
+SCAN_CHUNK_SIZE = 1024 * 1024
+
+# 跨块保留的未闭合标签长度上限，超过后按文本输出，保证流式处理的内存上限
+_MAX_PENDING_MARKUP = 1024 * 1024
+
+
+class _TableScanner:
+    """
+    HTML 表格增量扫描器
+
+    对输入做一次线性扫描，同时完成预处理（删除空列、删除空的 colgroup、
+    标准化标签间空白）和结构验证统计。只有列定义和 colgroup 标签需要逐个处理，
+    其余内容按段原样输出，表格/合并单元格计数和空白标准化在当前块上用正则整体完成。
+    可多次调用 feed() 逐块输入，块末尾未闭合的标签会保留到下一块再处理。
+
+    处理结果与原先逐条正则替换的顺序语义一致：先删除空列（标签名不区分大小写），
+    再删除空的 colgroup（只匹配小写的 <colgroup> 和 </colgroup>），最后标准化剩余内容中
+    标签间的空白。验证统计与原先一样基于原始输入，空的 colgroup 不区分大小写。
+    """
+
+    def __init__(self, collapse_whitespace=True, emit=True):
+        self.collapse_whitespace = collapse_whitespace
+        self.emit = emit
+        self.out = []
+        self._tail = ''
+        self._held = ''
+        self._closed = False
+        # 正在缓冲的 <colgroup>（内容只有空白和被删除的列时整体删除）
+        self._colgroup = None
+        # 原始输入中最近的 <colgroup>（不区分大小写）之后是否只有空白，用于验证统计
+        self._open_colgroup = False
+
+        # 预处理统计
+        self.removed_cols = 0
+        self.removed_colgroups = 0
+        self.collapsed_whitespace = False
+
+        # 验证统计（基于原始输入）
+        self.tables = 0
+        self.colspan_cells = 0
+        self.rowspan_cells = 0
+        self.empty_colgroups = 0
+        self.zero_width_cols = 0
+
+    def feed(self, data):
+        """输入一段 HTML 文本"""
+        if self._tail:
+            data = self._tail + data
+            self._tail = ''
+
+        # 最后一个 '<' 之后没有 '>'，说明标签被截断，留到下一块
+        cut = data.rfind('<')
+        if cut < 0 or data.find('>', cut) >= 0 or len(data) - cut > _MAX_PENDING_MARKUP:
+            cut = len(data)
+        else:
+            self._tail = data[cut:]
+
+        tokens = heapq.merge(
+            _COL_TAG_RE.finditer(data, 0, cut),
+            _COLGROUP_END_RE.finditer(data, 0, cut),
+            key=lambda match: match.start()
+        )
+
+        pos = 0
+        for match in tokens:
+            start = match.start()
+            if start > pos:
+                self._segment(data[pos:start])
+            pos = match.end()
+            self._token(match.re is _COLGROUP_END_RE, match.group())
+
+        if cut > pos:
+            self._segment(data[pos:cut])
+
+        self.tables += len(_TABLE_RE.findall(data, 0, cut))
+        self.colspan_cells += len(_COLSPAN_CELL_RE.findall(data, 0, cut))
+        self.rowspan_cells += len(_ROWSPAN_CELL_RE.findall(data, 0, cut))
+
+    def close(self):
+        """结束输入"""
+        if self._tail:
+            tail, self._tail = self._tail, ''
+            self._segment(tail)
+        if self._colgroup is not None:
+            self._replay_colgroup()
+        self._closed = True
+
+    def drain(self):
+        """取出目前已生成的输出并清空缓冲"""
+        text = self._held + ''.join(self.out)
+        self.out.clear()
+        self._held = ''
+
+        if self.collapse_whitespace and text:
+            if not self._closed:
+                # 末尾的 '>' 和空白可能与下一块开头的 '<' 组成标签间空白，暂不输出
+                stripped = text.rstrip()
+                if stripped.endswith('>'):
+                    split = len(stripped) - 1
+                    text, self._held = text[:split], text[split:]
+            collapsed = _INTER_TAG_WS_RE.sub('><', text)
+            if len(collapsed) != len(text):
+                self.collapsed_whitespace = True
+            text = collapsed
+
+        return text
+
+    def changes(self):
+        """预处理修改记录"""
+        changes = []
+        if self.removed_cols:
+            changes.append(f"删除了 {self.removed_cols} 个空列")
+        if self.removed_colgroups:
+            changes.append("删除了空的 colgroup 标签")
+        if self.collapsed_whitespace:
+            changes.append("标准化了标签间的空白字符")
+        return changes
+
+    def validation(self):
+        """结构验证报告"""
+        issues = []
+        warnings = []
+
+        if self.colspan_cells:
+            warnings.append(f"检测到 {self.colspan_cells} 个合并单元格 (colspan)")
+        if self.rowspan_cells:
+            warnings.append(f"检测到 {self.rowspan_cells} 个合并单元格 (rowspan)")
+        if self.empty_colgroups:
+            issues.append(f"检测到 {self.empty_colgroups} 个空的 colgroup 标签")
+        if self.zero_width_cols:
+            issues.append(f"检测到 {self.zero_width_cols} 个零宽度列")
+
+        return {
+            'tables': self.tables,
+            'colspan_cells': self.colspan_cells,
+            'rowspan_cells': self.rowspan_cells,
+            'issues': issues,
+            'warnings': warnings
+        }
+
+    def _segment(self, text):
+        if not text.isspace():
+            self._open_colgroup = False
+        if self._colgroup is not None:
+            if text.isspace():
+                self._colgroup.append(text)
+                return
+            self._replay_colgroup()
+        if self.emit:
+            self.out.append(text)
+
+    def _token(self, is_end, markup):
+        if is_end:
+            if self._open_colgroup:
+                self.empty_colgroups += 1
+            self._open_colgroup = False
+            if self._colgroup is not None and markup == '</colgroup>':
+                # 只含空白（及被删除的空列）的 colgroup，整体删除
+                self.removed_colgroups += 1
+                self._colgroup = None
+                return
+        else:
+            self._open_colgroup = markup.lower() == '<colgroup>'
+            if _ZERO_WIDTH_STYLE_RE.search(markup):
+                self.zero_width_cols += 1
+            if _EMPTY_COL_STYLE_RE.search(markup):
+                self.removed_cols += 1
+                return
+
+        if self._colgroup is not None:
+            self._replay_colgroup()
+
+        if markup == '<colgroup>':
+            self._colgroup = [markup]
+        elif self.emit:
+            self.out.append(markup)
+
+    def _replay_colgroup(self):
+        """colgroup 非空，按原样输出已缓冲的内容"""
+        buffered, self._colgroup = self._colgroup, None
+        if self.emit:
+            self.out.extend(buffered)
+
+
+def _print_changes(changes):
+    """输出预处理报告"""
+    print("\n[HTML 预处理报告]")
+    for change in changes:
+        print(f"  - {change}")
+    if not changes:
+        print("  - 未发现需要修复的问题")
+
+
+def scan_html_tables(html_content, verbose=False, collapse_whitespace=True):
+    """
+    单次扫描同时完成 HTML 表格预处理和结构验证
+
+    Args:
+        html_content (str): HTML 内容
+        verbose (bool): 是否显示详细处理信息
+        collapse_whitespace (bool): 是否删除标签间的空白字符
+
+    Returns:
+        dict: {
+            'processed_html': 预处理后的 HTML 内容,
+            'changes': 修改记录列表,
+            'validation': 与 validate_table_structure() 相同结构的验证结果（基于原始内容）
+        }
+    """
+    scanner = _TableScanner(collapse_whitespace=collapse_whitespace)
+    pieces = ['']
+    for start in range(0, len(html_content), SCAN_CHUNK_SIZE):
+        scanner.feed(html_content[start:start + SCAN_CHUNK_SIZE])
+        pieces.append(scanner.drain())
+    scanner.close()
+    pieces.append(scanner.drain())
+
+    changes = scanner.changes()
+    pieces[0] = _summary_comment(changes)
+
+    if verbose:
+        _print_changes(changes)
+
+    return {
+        'processed_html': ''.join(pieces),
+        'changes': changes,
+        'validation': scanner.validation()
+    }
+
+
 def preprocess_html_table(html_content, verbose=False):
     """
     预处理 HTML 表格，修复常见问题：
@@ -24,40 +274,10 @@ def preprocess_html_table(html_content, verbose=False):
             'changes': 修改记录列表
         }
     """
-    changes = []
-
-    # 1. 删除空列（width: 0% 或 display: none）
-    empty_col_pattern = r'<col[^>]*style=["\'][^"\']*(?:width:\s*0%|display:\s*none)[^"\']*["\'][^>]*/?>'
-    removed_cols = re.findall(empty_col_pattern, html_content, flags=re.IGNORECASE)
-    if removed_cols:
-        html_content = re.sub(empty_col_pattern, '', html_content, flags=re.IGNORECASE)
-        changes.append(f"删除了 {len(removed_cols)} 个空列")
-
-    # 2. 删除空的 colgroup 定义
-    if re.search(r'<colgroup>\s*</colgroup>', html_content):
-        html_content = re.sub(r'<colgroup>\s*</colgroup>', '', html_content)
-        changes.append("删除了空的 colgroup 标签")
-
-    # 3. 标准化空白字符
-    original_length = len(html_content)
-    html_content = re.sub(r'>\s+<', '><', html_content)
-    if len(html_content) != original_length:
-        changes.append("标准化了标签间的空白字符")
-
-    # 4. 添加处理标记
-    header_comment = f"<!-- HTML 预处理: {', '.join(changes) if changes else '无需修改'} -->\n"
-    html_content = header_comment + html_content
-
-    if verbose:
-        print("\n[HTML 预处理报告]")
-        for change in changes:
-            print(f"  - {change}")
-        if not changes:
-            print("  - 未发现需要修复的问题")
-
+    result = scan_html_tables(html_content, verbose=verbose)
     return {
-        'processed_html': html_content,
-        'changes': changes
+        'processed_html': result['processed_html'],
+        'changes': result['changes']
     }
 
 
@@ -71,44 +291,100 @@ def validate_table_structure(html_content):
     Returns:
         dict: {
             'tables': 表格数量,
+            'colspan_cells': 含 colspan 的单元格数,
+            'rowspan_cells': 含 rowspan 的单元格数,
             'issues': 检测到的问题列表,
             'warnings': 警告列表
         }
     """
-    issues = []
-    warnings = []
+    scanner = _TableScanner(emit=False)
+    for start in range(0, len(html_content), SCAN_CHUNK_SIZE):
+        scanner.feed(html_content[start:start + SCAN_CHUNK_SIZE])
+    scanner.close()
+    return scanner.validation()
+
+
+def _print_validation(name, validation):
+    """输出表格结构验证结果"""
+    print(f"\n[验证表格结构] {name}")
+    if validation['tables'] > 0:
+        print(f"  检测到 {validation['tables']} 个表格")
+        if validation['issues']:
+            print("  发现的问题:")
+            for issue in validation['issues']:
+                print(f"    [!] {issue}")
+        if validation['warnings']:
+            print("  注意事项:")
+            for warning in validation['warnings']:
+                print(f"    [i] {warning}")
+    else:
+        print("  未检测到表格")
 
-    # 统计表格数量
-    tables = re.findall(r'<table[^>]*>', html_content, flags=re.IGNORECASE)
 
-    # 检测 colspan
-    colspan_cells = re.findall(r'<td[^>]*colspan=["\'](\d+)["\'][^>]*>', html_content, flags=re.IGNORECASE)
-    if colspan_cells:
-        warnings.append(f"检测到 {len(colspan_cells)} 个合并单元格 (colspan)")
+def _summary_comment(changes):
+    """预处理标记注释"""
+    return f"<!-- HTML 预处理: {', '.join(changes) if changes else '无需修改'} -->\n"
 
-    # 检测 rowspan
-    rowspan_cells = re.findall(r'<td[^>]*rowspan=["\'](\d+)["\'][^>]*>', html_content, flags=re.IGNORECASE)
-    if rowspan_cells:
-        warnings.append(f"检测到 {len(rowspan_cells)} 个合并单元格 (rowspan)")
 
-    # 检测空的 colgroup
-    empty_colgroups = re.findall(r'<colgroup>\s*</colgroup>', html_content, flags=re.IGNORECASE)
-    if empty_colgroups:
-        issues.append(f"检测到 {len(empty_colgroups)} 个空的 colgroup 标签")
+def preprocess_html_stream(reader, writer, chunk_size=SCAN_CHUNK_SIZE, collapse_whitespace=True, comment=True):
+    """
+    流式预处理 HTML：按块读取、处理并写出，内存占用与文件大小无关
+
+    由于修改记录在读完全部内容后才能确定，预处理标记注释追加在输出末尾。
 
-    # 检测零宽度列
-    zero_width_cols = re.findall(r'<col[^>]*style=["\'][^"\']*width:\s*0%[^"\']*["\'][^>]*/?>', html_content, flags=re.IGNORECASE)
-    if zero_width_cols:
-        issues.append(f"检测到 {len(zero_width_cols)} 个零宽度列")
+    Args:
+        reader: 可读文本对象（需支持 read(size)）
+        writer: 可写文本对象
+        chunk_size (int): 每次读取的字符数
+        collapse_whitespace (bool): 是否删除标签间的空白字符
+        comment (bool): 是否在末尾追加预处理标记注释
+
+    Returns:
+        dict: {
+            'changes': 修改记录列表,
+            'validation': 与 validate_table_structure() 相同结构的验证结果
+        }
+    """
+    scanner = _TableScanner(collapse_whitespace=collapse_whitespace)
+    while True:
+        chunk = reader.read(chunk_size)
+        if not chunk:
+            break
+        scanner.feed(chunk)
+        writer.write(scanner.drain())
+    scanner.close()
+    writer.write(scanner.drain())
+
+    changes = scanner.changes()
+    if comment:
+        writer.write('\n' + _summary_comment(changes))
 
     return {
-        'tables': len(tables),
-        'issues': issues,
-        'warnings': warnings
+        'changes': changes,
+        'validation': scanner.validation()
     }
 
 
-def preprocess_html_file(input_file, output_file=None, verbose=True):
+def validate_html_file(input_file, chunk_size=SCAN_CHUNK_SIZE):
+    """
+    按块读取并验证 HTML 文件的表格结构，不把整个文件读入内存
+
+    Args:
+        input_file (str): HTML 文件路径
+        chunk_size (int): 每次读取的字符数
+
+    Returns:
+        dict: 与 validate_table_structure() 相同结构的验证结果
+    """
+    scanner = _TableScanner(emit=False)
+    with open(input_file, 'r', encoding='utf-8') as f:
+        for chunk in iter(lambda: f.read(chunk_size), ''):
+            scanner.feed(chunk)
+    scanner.close()
+    return scanner.validation()
+
+
+def preprocess_html_file(input_file, output_file=None, verbose=True, chunk_size=None):
     """
     预处理 HTML 文件
 
@@ -116,6 +392,8 @@ def preprocess_html_file(input_file, output_file=None, verbose=True):
         input_file (str): 输入 HTML 文件路径
         output_file (str, optional): 输出 HTML 文件路径。如果为 None，则覆盖原文件
         verbose (bool): 是否显示详细信息
+        chunk_size (int, optional): 指定时使用流式模式，按该字符数分块读写，
+            内存占用固定；预处理标记注释追加在文件末尾，返回结果中 processed_html 为 None
 
     Returns:
         dict: 处理结果
@@ -131,29 +409,19 @@ def preprocess_html_file(input_file, output_file=None, verbose=True):
     else:
         output_path = Path(output_file).absolute()
 
+    if chunk_size:
+        return _preprocess_html_file_streaming(input_path, output_path, verbose, chunk_size)
+
     # 读取文件
     with open(input_path, 'r', encoding='utf-8') as f:
         html_content = f.read()
 
-    # 验证表格结构
-    if verbose:
-        print(f"\n[验证表格结构] {input_path.name}")
-        validation = validate_table_structure(html_content)
-        if validation['tables'] > 0:
-            print(f"  检测到 {validation['tables']} 个表格")
-            if validation['issues']:
-                print("  发现的问题:")
-                for issue in validation['issues']:
-                    print(f"    [!] {issue}")
-            if validation['warnings']:
-                print("  注意事项:")
-                for warning in validation['warnings']:
-                    print(f"    [i] {warning}")
-        else:
-            print("  未检测到表格")
+    # 单次扫描完成验证和预处理
+    result = scan_html_tables(html_content)
 
-    # 预处理
-    result = preprocess_html_table(html_content, verbose=verbose)
+    if verbose:
+        _print_validation(input_path.name, result['validation'])
+        _print_changes(result['changes'])
 
     # 写入文件
     with open(output_path, 'w', encoding='utf-8') as f:
@@ -168,23 +436,61 @@ def preprocess_html_file(input_file, output_file=None, verbose=True):
     return result
 
 
+def _preprocess_html_file_streaming(input_path, output_path, verbose, chunk_size):
+    """preprocess_html_file() 的流式实现"""
+    # 覆盖原文件时先写入同目录的临时文件，完成后再替换
+    if output_path == input_path:
+        from tempfile import NamedTemporaryFile
+
+        temp_file = NamedTemporaryFile(mode='w', suffix='.html', delete=False, encoding='utf-8',
+                                       dir=str(input_path.parent))
+        temp_file.close()
+        write_path = Path(temp_file.name)
+    else:
+        write_path = output_path
+
+    try:
+        with open(input_path, 'r', encoding='utf-8') as reader, \
+                open(write_path, 'w', encoding='utf-8') as writer:
+            result = preprocess_html_stream(reader, writer, chunk_size=chunk_size)
+        if write_path != output_path:
+            os.replace(write_path, output_path)
+    except Exception:
+        if write_path != output_path and write_path.exists():
+            write_path.unlink()
+        raise
+
+    if verbose:
+        _print_validation(input_path.name, result['validation'])
+        _print_changes(result['changes'])
+        if output_path != input_path:
+            print(f"\n[完成] 已保存到: {output_path}")
+        else:
+            print(f"\n[完成] 已覆盖原文件")
+
+    result['processed_html'] = None
+    return result
+
+
 def main():
     """命令行入口"""
     import sys
 
-    if len(sys.argv) < 2:
+    if len(sys.argv) < 2 or sys.argv[1] in ('-h', '--help'):
         print("用法:")
         print("  python preprocess_html.py <input_html> [output_html]")
         print("  python preprocess_html.py --validate <input_html>")
+        print("  python preprocess_html.py --stream <input_html> [output_html]   # 分块流式处理大文件")
         print("")
         print("示例:")
         print("  python preprocess_html.py temp.html")
         print("  python preprocess_html.py temp.html processed.html")
         print("  python preprocess_html.py --validate temp.html")
-        sys.exit(1)
+        print("  python preprocess_html.py --stream export.html processed.html")
+        sys.exit(0 if len(sys.argv) >= 2 else 1)
 
     if sys.argv[1] == '--validate':
-        # 仅验证模式
+        # 仅验证模式（按块读取，不需要把整个文件读入内存）
         input_file = sys.argv[2]
         input_path = Path(input_file).absolute()
 
@@ -192,10 +498,7 @@ def main():
             print(f"错误: 文件不存在: {input_file}")
             sys.exit(1)
 
-        with open(input_path, 'r', encoding='utf-8') as f:
-            html_content = f.read()
-
-        validation = validate_table_structure(html_content)
+        validation = validate_html_file(input_path)
         print(f"\n[表格验证报告] {input_path.name}")
         print(f"表格数量: {validation['tables']}")
 
@@ -214,11 +517,20 @@ def main():
 
     else:
         # 预处理模式
-        input_file = sys.argv[1]
-        output_file = sys.argv[2] if len(sys.argv) > 2 else None
+        args = sys.argv[1:]
+        chunk_size = None
+        if args[0] == '--stream':
+            chunk_size = SCAN_CHUNK_SIZE
+            args = args[1:]
+            if not args:
+                print("错误: --stream 模式需要指定输入文件")
+                sys.exit(1)
+
+        input_file = args[0]
+        output_file = args[1] if len(args) > 1 else None
 
         try:
-            preprocess_html_file(input_file, output_file)
+            preprocess_html_file(input_file, output_file, chunk_size=chunk_size)
         except Exception as e:
             print(f"错误: {e}")
             sys.exit(1)
@@ -0,0 +1,448 @@
+"""
+本地 HTTP 转换服务 - 固定大小的工作线程池、有界请求队列和背压
+只依赖标准库，在本机运行，不需要任何外部服务。请求体即文档内容，转换在内存中完成
+（见 bytes_converter），同时运行的 pandoc 进程数不超过工作线程数；队列已满时立即返回 503，
+而不是无限堆积请求。每个请求有截止时间（包括排队时间），到期时结束对应的 pandoc 进程并返回 504。
+
+端点:
+    POST /convert?from=docx&to=markdown            单步转换，响应为转换结果
+    POST /two-step?from=docx&to=gfm[&fast_gfm=1][&preprocess=0]
+                                                   两步转换法（DOCX -> HTML -> MD）
+    POST /validate                                 验证 HTML 表格结构，返回 JSON
+    POST /analyze                                  快速分析 DOCX 表格复杂度（不调用 pandoc），返回 JSON
+    GET  /metrics                                  队列、工作线程、请求计数和各阶段耗时汇总（JSON）
+    GET  /health                                   健康检查
+
+用法:
+    python serve.py [--host 127.0.0.1] [--port 8080] [--workers N] [--queue N] [--timeout 120]
+    curl --data-binary @input.docx 'http://127.0.0.1:8080/two-step?from=docx&to=gfm'
+"""
+
+import io
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+# 添加 scripts 目录到路径
+scripts_dir = Path(__file__).parent
+if str(scripts_dir) not in sys.path:
+    sys.path.insert(0, str(scripts_dir))
+
+from conversion_metrics import stage, aggregate_metrics
+
+
+# 默认请求超时（秒）
+DEFAULT_TIMEOUT = 120
+
+# 默认请求体上限: 100 MB
+DEFAULT_MAX_BODY_BYTES = 100 * 1024 ** 2
+
+# /metrics 按阶段汇总时保留的最近指标记录数
+METRICS_HISTORY = 10000
+
+# 工作线程在截止时间之后仍未返回时，请求线程再等待的秒数（如验证大文档的纯 Python 计算无法中断）
+TIMEOUT_GRACE = 5
+
+
+class QueueFullError(Exception):
+    """请求队列已满"""
+
+
+class ConversionService:
+    """
+    固定大小的工作线程池和有界请求队列
+
+    工作在 pandoc 子进程中完成，线程只负责等待，因此使用线程池；
+    工作线程数即同时运行的 pandoc 进程数上限。
+    队列位置可以在读取请求体之前预留（reserve），队列已满时不必先接收整个请求体再拒绝。
+
+    用法:
+        service = ConversionService(workers=4, queue_size=16)
+        future = service.submit('convert', lambda timeout: convert_bytes(data, 'docx', timeout=timeout))
+        result = future.result()
+        service.close()
+    """
+
+    def __init__(self, workers=None, queue_size=None, timeout=DEFAULT_TIMEOUT):
+        """
+        Args:
+            workers (int, optional): 工作线程数，默认为 CPU 核心数
+            queue_size (int, optional): 等待中的请求数上限，默认为工作线程数的 4 倍
+            timeout (float): 每个请求的超时时间（秒），从进入队列开始计算
+        """
+        self.workers = workers if workers and workers > 0 else os.cpu_count() or 1
+        self.queue_size = queue_size if queue_size and queue_size > 0 else self.workers * 4
+        self.timeout = timeout
+        self._queue = queue.Queue(self.queue_size)
+        # 队列位置: 预留后直到工作线程取出请求才释放，因此入队时队列不会已满
+        self._slots = threading.BoundedSemaphore(self.queue_size)
+        self._lock = threading.Lock()
+        self._records = deque(maxlen=METRICS_HISTORY)
+        self._counts = {'accepted': 0, 'rejected': 0, 'succeeded': 0, 'failed': 0, 'timed_out': 0}
+        self._busy = 0
+        self._started = time.time()
+        self._threads = [threading.Thread(target=self._work, name=f'conversion-worker-{i}', daemon=True)
+                         for i in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def record(self, record):
+        """指标回调: 保存最近的记录供 /metrics 汇总"""
+        self._records.append(record)
+
+    def _count(self, key):
+        with self._lock:
+            self._counts[key] += 1
+
+    def reserve(self):
+        """
+        预留一个队列位置，之后须调用 submit(..., reserved=True) 或 release()
+
+        Raises:
+            QueueFullError: 队列已满
+        """
+        if not self._slots.acquire(blocking=False):
+            self._count('rejected')
+            raise QueueFullError(f"请求队列已满 ({self.queue_size})")
+
+    def release(self):
+        """释放未使用的预留位置（如请求体读取失败）"""
+        self._slots.release()
+
+    def submit(self, endpoint, func, reserved=False):
+        """
+        将请求放入队列
+
+        Args:
+            endpoint (str): 端点名称（用于指标）
+            func (callable): func(timeout) 执行转换，timeout 为剩余秒数
+            reserved (bool): 是否已通过 reserve() 预留队列位置
+
+        Returns:
+            Future: 转换结果
+
+        Raises:
+            QueueFullError: 队列已满（未预留位置时）
+        """
+        if not reserved:
+            self.reserve()
+        future = Future()
+        deadline = time.monotonic() + self.timeout
+        self._queue.put_nowait((endpoint, func, deadline, time.monotonic(), future))
+        self._count('accepted')
+        return future
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            self._slots.release()
+            endpoint, func, deadline, queued_at, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            with self._lock:
+                self._busy += 1
+            try:
+                with stage(self.record, 'request', input=endpoint) as record:
+                    record['queue_seconds'] = time.monotonic() - queued_at
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError("请求在队列中等待超时")
+                    result = func(remaining)
+                future.set_result(result)
+                self._count('succeeded')
+            except TimeoutError as e:
+                future.set_exception(e)
+                self._count('timed_out')
+            except Exception as e:
+                future.set_exception(e)
+                self._count('failed')
+            finally:
+                with self._lock:
+                    self._busy -= 1
+
+    def wait(self, future):
+        """等待请求结果，超过截止时间（加上宽限时间）时抛出 TimeoutError"""
+        from concurrent.futures import TimeoutError as FutureTimeoutError
+
+        try:
+            return future.result(timeout=self.timeout + TIMEOUT_GRACE)
+        except FutureTimeoutError:
+            raise TimeoutError("转换超时") from None
+
+    def snapshot(self):
+        """
+        当前服务状态和指标
+
+        Returns:
+            dict: {'workers', 'busy', 'queue_size', 'queued', 'uptime', 'requests', 'stages'}
+        """
+        with self._lock:
+            counts = dict(self._counts)
+            busy = self._busy
+        return {
+            'workers': self.workers,
+            'busy': busy,
+            'queue_size': self.queue_size,
+            'queued': self._queue.qsize(),
+            'uptime': time.time() - self._started,
+            'requests': counts,
+            'stages': aggregate_metrics(list(self._records)),
+        }
+
+    def close(self):
+        """处理完队列中已有的请求后结束工作线程"""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+
+def _content_type(format_type):
+    """输出格式对应的 Content-Type"""
+    base = format_type.split('+', 1)[0].split('-', 1)[0]
+    if base.startswith('html'):
+        return 'text/html; charset=utf-8'
+    if base == 'json':
+        return 'application/json'
+    if base in ('markdown', 'gfm', 'commonmark', 'commonmark_x') or base.startswith('markdown_'):
+        return 'text/markdown; charset=utf-8'
+    if base in ('docx', 'odt', 'epub', 'pptx'):
+        return 'application/octet-stream'
+    return 'text/plain; charset=utf-8'
+
+
+def _flag(params, name, default):
+    """查询参数中的布尔开关（1/true/yes 为真）"""
+    value = params.get(name)
+    if value is None:
+        return default
+    return value.lower() in ('1', 'true', 'yes')
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """请求处理: 解析参数、读取请求体，转换提交给 ConversionService"""
+
+    server_version = 'pypandoc-converter'
+
+    def _send(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self._send(status, body, 'application/json; charset=utf-8', headers)
+
+    def _send_error(self, status, message, headers=None):
+        self._send_json(status, {'error': message}, headers)
+
+    def _read_body(self):
+        """读取请求体，缺少长度或超过上限时返回 None（已发送错误响应）"""
+        length = self.headers.get('Content-Length')
+        if length is None:
+            self._send_error(411, "需要 Content-Length")
+            return None
+        try:
+            length = int(length)
+        except ValueError:
+            self._send_error(400, f"无效的 Content-Length: {length}")
+            return None
+        if length > self.server.max_body_bytes:
+            self._send_error(413, f"请求体超过上限 ({self.server.max_body_bytes} 字节)")
+            # 未读取的请求体留在连接中，响应后关闭连接
+            self.close_connection = True
+            return None
+        return self.rfile.read(length)
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == '/health':
+            self._send_json(200, {'status': 'ok'})
+        elif path == '/metrics':
+            self._send_json(200, self.server.service.snapshot())
+        else:
+            self._send_error(404, f"未知路径: {path}")
+
+    def do_POST(self):
+        from bytes_converter import convert_bytes, convert_bytes_with_html_intermediate
+        from docx_analyzer import analyze_docx_complexity
+        from pandoc_probe import check_options
+        from preprocess_html import validate_table_structure
+
+        url = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        service = self.server.service
+        pandoc_server = self.server.pandoc_server
+
+        if url.path not in ('/convert', '/two-step', '/validate', '/analyze'):
+            self._send_error(404, f"未知路径: {url.path}")
+            return
+
+        endpoint = url.path.lstrip('/')
+        input_format = params.get('from', 'docx')
+        output_format = params.get('to', 'gfm' if endpoint == 'two-step' else 'markdown')
+        if endpoint in ('convert', 'two-step'):
+            # 排队之前检查格式，无效的格式返回 400 而不是 pandoc 转换失败的 422
+            try:
+                check_options(output_format, input_format=input_format)
+            except (ValueError, OSError) as e:
+                self._send_error(400 if isinstance(e, ValueError) else 500, str(e))
+                # 未读取的请求体留在连接中，响应后关闭连接
+                self.close_connection = True
+                return
+
+        # 先预留队列位置再读取请求体，队列已满时不接收请求体
+        try:
+            service.reserve()
+        except QueueFullError as e:
+            self._send_error(503, str(e), {'Retry-After': '1'})
+            # 未读取的请求体留在连接中，响应后关闭连接
+            self.close_connection = True
+            return
+        try:
+            data = self._read_body()
+        except BaseException:
+            service.release()
+            raise
+        if data is None:
+            service.release()
+            return
+
+        if endpoint == 'convert':
+            def task(timeout):
+                return convert_bytes(data, input_format, output_format, pandoc_server=pandoc_server,
+                                     metrics=service.record, timeout=timeout)
+        elif endpoint == 'two-step':
+            fast_gfm = _flag(params, 'fast_gfm', False)
+            preprocess = _flag(params, 'preprocess', True)
+
+            def task(timeout):
+                return convert_bytes_with_html_intermediate(data, input_format, output_format,
+                                                            preprocess=preprocess, fast_gfm=fast_gfm,
+                                                            metrics=service.record, timeout=timeout)
+        elif endpoint == 'validate':
+            def task(timeout):
+                return validate_table_structure(data.decode('utf-8', errors='replace'))
+        else:
+            def task(timeout):
+                return analyze_docx_complexity(io.BytesIO(data))
+
+        try:
+            result = service.wait(service.submit(endpoint, task, reserved=True))
+        except TimeoutError as e:
+            self._send_error(504, str(e))
+        except ValueError as e:
+            # 格式或参数无效、无法解析的文档
+            self._send_error(400, str(e))
+        except RuntimeError as e:
+            # pandoc 转换失败
+            self._send_error(422, str(e))
+        except Exception as e:
+            self._send_error(500, str(e))
+        else:
+            if endpoint in ('validate', 'analyze'):
+                self._send_json(200, result)
+            else:
+                self._send(200, result, _content_type(output_format))
+
+
+def create_server(host='127.0.0.1', port=8080, workers=None, queue_size=None, timeout=DEFAULT_TIMEOUT,
+                  max_body_bytes=DEFAULT_MAX_BODY_BYTES, pandoc_server=None):
+    """
+    创建转换服务（未开始监听循环）
+
+    Args:
+        host (str): 监听地址，默认只监听本机
+        port (int): 端口，0 表示由系统分配
+        workers (int, optional): 工作线程数（同时运行的转换数），默认为 CPU 核心数
+        queue_size (int, optional): 等待中的请求数上限，默认为工作线程数的 4 倍
+        timeout (float): 每个请求的超时时间（秒）
+        max_body_bytes (int): 请求体大小上限
+        pandoc_server (str, optional): 单步转换优先使用的常驻 pandoc server 地址
+
+    Returns:
+        ThreadingHTTPServer: 服务对象，server.service 为 ConversionService；
+            调用 serve_forever() 开始处理请求，结束时调用 shutdown() 和 service.close()
+    """
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.service = ConversionService(workers, queue_size, timeout)
+    server.max_body_bytes = max_body_bytes
+    server.pandoc_server = pandoc_server
+    return server
+
+
+def main():
+    """命令行入口"""
+    args = sys.argv[1:]
+    if args and args[0] in ('-h', '--help'):
+        print("用法:")
+        print("  python serve.py [--host 127.0.0.1] [--port 8080] [--workers N] [--queue N] [--timeout 120]")
+        print("                  [--max-body BYTES] [--pandoc-server URL]")
+        print("")
+        print("示例:")
+        print("  curl --data-binary @input.docx 'http://127.0.0.1:8080/convert?from=docx&to=gfm'")
+        print("  curl --data-binary @input.docx 'http://127.0.0.1:8080/two-step?from=docx&to=gfm&fast_gfm=1'")
+        print("  curl --data-binary @input.docx http://127.0.0.1:8080/analyze")
+        print("  curl --data-binary @temp.html http://127.0.0.1:8080/validate")
+        print("  curl http://127.0.0.1:8080/metrics")
+        sys.exit(0)
+
+    options = {'host': '127.0.0.1', 'port': 8080, 'workers': None, 'queue_size': None,
+               'timeout': DEFAULT_TIMEOUT, 'max_body_bytes': DEFAULT_MAX_BODY_BYTES, 'pandoc_server': None}
+    names = {'--host': ('host', str), '--port': ('port', int), '--workers': ('workers', int),
+             '--queue': ('queue_size', int), '--timeout': ('timeout', float), '--max-body': ('max_body_bytes', int),
+             '--pandoc-server': ('pandoc_server', str)}
+
+    i = 0
+    while i < len(args):
+        if args[i] in names and i + 1 < len(args):
+            key, cast = names[args[i]]
+            try:
+                options[key] = cast(args[i + 1])
+            except ValueError:
+                print(f"错误: {args[i]} 参数无效: {args[i + 1]}")
+                sys.exit(1)
+            i += 2
+        else:
+            print(f"未知参数: {args[i]}")
+            sys.exit(1)
+
+    from pandoc_probe import probe_pandoc
+
+    try:
+        probe_pandoc()
+    except OSError as e:
+        print(f"[ERROR] pandoc 不可用: {e}")
+        sys.exit(1)
+
+    server = create_server(**options)
+    service = server.service
+    host, port = server.server_address[:2]
+    print(f"[OK] 转换服务已启动: http://{host}:{port} (工作线程: {service.workers}，队列: {service.queue_size}，"
+          f"超时: {service.timeout} 秒)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[INFO] 正在停止转换服务...")
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == '__main__':
+    main()
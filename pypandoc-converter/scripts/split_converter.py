@@ -0,0 +1,220 @@
+"""
+分段并行转换 - 加速超大文档的转换
+文档只由 pandoc 读取一次，得到 JSON AST 后按一级标题切分为若干段，
+各段并发写出 Markdown，再按原顺序拼接。
+
+由于标题锚点和媒体路径在读取阶段就已确定，切分后保持与整篇转换一致；
+只有各段输出可以直接拼接的格式才分段（见 SPLIT_FORMATS），其余 Markdown 格式整篇写出。
+脚注编号在 AST 中处理: 每段开头插入与之前各段脚注数相同的占位脚注，pandoc 写出时
+该段的脚注即从正确的编号开始；拼接时删除占位脚注，各段的脚注定义统一放到文末。
+"""
+
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from conversion_metrics import stage
+
+
+# convert_split() 接受的输出格式
+MARKDOWN_FORMATS = {'markdown', 'gfm', 'commonmark', 'commonmark_x', 'markdown_mmd', 'markdown_phpextra',
+                    'markdown_strict'}
+
+# 各段输出可以直接拼接的格式: 脚注语法为 [^N]，且不写出显式的标题标识符。
+# commonmark / markdown_strict 没有 [^N] 脚注；markdown / commonmark_x / markdown_mmd 中
+# 与段内自动生成的标识符不同的标题（如第二个同名标题 intro-1）会写出 {#intro-1}，
+# 整篇写出时则没有。这些格式读取 AST 一次后整篇写出
+SPLIT_FORMATS = {'gfm', 'markdown_phpextra'}
+
+# 作用于读取阶段的 pandoc 参数，只在生成 AST 时传入
+READER_OPTIONS = {'--extract-media', '--track-changes', '--default-image-extension', '--resource-path',
+                  '--abbreviations', '--indented-code-classes', '--tab-stop', '--preserve-tabs', '--file-scope',
+                  '--strip-comments'}
+
+# 依赖整篇文档的参数，出现时不分段
+WHOLE_DOCUMENT_OPTIONS = {'--toc', '--table-of-contents', '--reference-links', '--number-sections', '-N'}
+
+# 占位脚注的内容（只含字母，写出时不会被转义）
+_PLACEHOLDER = 'PYPANDOCCONVERTERNOTEPLACEHOLDER'
+
+
+def _split_args(extra_args):
+    """将 pandoc 参数分为读取参数和写出参数"""
+    reader_args = []
+    writer_args = []
+    for arg in extra_args:
+        name = arg.split('=', 1)[0]
+        (reader_args if name in READER_OPTIONS else writer_args).append(arg)
+    return reader_args, writer_args
+
+
+def _count_notes(node):
+    """统计 AST 片段中的脚注数量"""
+    count = 0
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            if item.get('t') == 'Note':
+                count += 1
+            stack.extend(item.values())
+        elif isinstance(item, list):
+            stack.extend(item)
+    return count
+
+
+def split_blocks(blocks, level=1):
+    """
+    按标题切分块列表
+
+    Args:
+        blocks (list): AST 中的 blocks
+        level (int): 在该级别及以上的标题处切分
+
+    Returns:
+        list: 段落列表，每段为块列表；第一个标题之前的内容单独成段
+    """
+    sections = [[]]
+    for block in blocks:
+        if block.get('t') == 'Header' and block['c'][0] <= level and sections[-1]:
+            sections.append([])
+        sections[-1].append(block)
+    return [section for section in sections if section]
+
+
+def group_sections(sections, max_groups):
+    """
+    将相邻的段落合并为不超过 max_groups 组，各组的 JSON 大小尽量接近
+
+    Returns:
+        list: 合并后的块列表
+    """
+    if len(sections) <= max_groups:
+        return sections
+
+    sizes = [len(json.dumps(section)) for section in sections]
+    target = sum(sizes) / max_groups
+    groups = [[]]
+    group_size = 0
+    for section, size in zip(sections, sizes):
+        if groups[-1] and group_size + size / 2 > target and len(groups) < max_groups:
+            groups.append([])
+            group_size = 0
+        groups[-1].extend(section)
+        group_size += size
+    return groups
+
+
+def _with_note_offset(blocks, offset):
+    """在块列表开头插入 offset 个占位脚注，写出时该段的脚注从 offset + 1 开始编号"""
+    if not offset:
+        return blocks
+    note = {'t': 'Note', 'c': [{'t': 'Plain', 'c': [{'t': 'Str', 'c': _PLACEHOLDER}]}]}
+    return [{'t': 'Plain', 'c': [note] * offset}] + blocks
+
+
+def _strip_placeholders(text, offset):
+    """删除占位脚注的引用（段首一行）和定义"""
+    if not offset:
+        return text
+    references = ''.join(f'[^{number}]' for number in range(1, offset + 1))
+    definitions = {f'[^{number}]: {_PLACEHOLDER}' for number in range(1, offset + 1)}
+    return '\n'.join(line for line in text.split('\n') if line != references and line not in definitions)
+
+
+def _split_notes(text, first_note, note_count):
+    """将一段输出拆为正文和文末的脚注定义（从编号 first_note 开始）"""
+    if not note_count:
+        return text, ''
+    match = re.search(rf'^\[\^{first_note}\]:', text, re.MULTILINE)
+    if match is None:
+        return text, ''
+    return text[:match.start()], text[match.start():]
+
+
+def convert_split(input_file, output_file, format_type='markdown', extra_args=None, jobs=None, level=1,
+                  metrics=None):
+    """
+    分段并行转换
+
+    Args:
+        input_file (str): 输入文件路径
+        output_file (str): 输出文件路径
+        format_type (str): 输出格式，须为 MARKDOWN_FORMATS 中的格式（可带扩展，如 gfm+hard_line_breaks）；
+            不在 SPLIT_FORMATS 中或禁用了脚注扩展时整篇写出，不分段
+        extra_args (list, optional): 额外的 pandoc 参数
+        jobs (int, optional): 并发 pandoc 进程数，默认为 CPU 核心数
+        level (int): 在该级别及以上的标题处切分，默认 1
+        metrics (callable, optional): 指标回调（见 conversion_metrics）
+
+    Returns:
+        dict: {'sections': 实际并发转换的段数, 'footnotes': 脚注总数}
+    """
+    import pypandoc
+
+    extra_args = list(extra_args or [])
+    base_format = re.split(r'[+-]', format_type, maxsplit=1)[0]
+    if base_format not in MARKDOWN_FORMATS:
+        raise ValueError(f"分段转换只支持 Markdown 输出格式: {format_type}")
+    splittable = base_format in SPLIT_FORMATS and '-footnotes' not in format_type
+    if not splittable:
+        print(f"[INFO] {format_type} 格式的分段输出不能直接拼接，读取一次后整篇写出")
+
+    reader_args, writer_args = _split_args(extra_args)
+    whole_document = any(arg.split('=', 1)[0] in WHOLE_DOCUMENT_OPTIONS for arg in writer_args)
+    notes_at_end = not any(arg.startswith('--reference-location') and not arg.endswith('=document')
+                           for arg in writer_args)
+    standalone = any(arg in ('-s', '--standalone') for arg in writer_args)
+
+    # 读取一次，得到整篇文档的 AST
+    with stage(metrics, 'read_ast', input=str(input_file)) as record:
+        record['input_bytes'] = os.path.getsize(input_file)
+        ast_json = pypandoc.convert_file(str(input_file), 'json', extra_args=reader_args)
+        record['output_bytes'] = ast_json
+        document = json.loads(ast_json)
+        del ast_json
+
+    if not jobs or jobs < 0:
+        jobs = os.cpu_count() or 1
+    sections = split_blocks(document['blocks'], level)
+    if whole_document or not splittable or jobs == 1:
+        sections = [document['blocks']]
+    groups = group_sections(sections, jobs * 2)
+
+    # 各段之前的脚注数
+    note_counts = [_count_notes(group) for group in groups]
+    offsets = [sum(note_counts[:index]) for index in range(len(groups))]
+
+    def render(index):
+        # 元数据只交给第一段，避免 --standalone 时重复输出标题块
+        section_doc = {
+            'pandoc-api-version': document['pandoc-api-version'],
+            'meta': document['meta'] if index == 0 else {},
+            'blocks': _with_note_offset(groups[index], offsets[index]),
+        }
+        args = writer_args
+        if standalone and index > 0:
+            args = [arg for arg in writer_args if arg not in ('-s', '--standalone')]
+        return pypandoc.convert_text(json.dumps(section_doc), format_type, format='json', extra_args=args)
+
+    with stage(metrics, 'render_sections', input=str(input_file), format=format_type) as record:
+        record['sections'] = len(groups)
+        with ThreadPoolExecutor(max_workers=min(jobs, len(groups))) as executor:
+            outputs = list(executor.map(render, range(len(groups))))
+
+    # 按顺序拼接，脚注定义放到文末
+    bodies = []
+    notes = []
+    for offset, note_count, text in zip(offsets, note_counts, outputs):
+        text = _strip_placeholders(text, offset)
+        body, note_text = _split_notes(text, offset + 1, note_count) if notes_at_end else (text, '')
+        bodies.append(body.strip('\n'))
+        if note_text:
+            notes.append(note_text.strip('\n'))
+
+    content = '\n\n'.join(part for part in bodies + notes if part) + '\n'
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+    return {'sections': len(groups), 'footnotes': sum(note_counts)}
@@ -0,0 +1,57 @@
+--[[
+表格规范化 pandoc Lua 过滤器 - 单次转换完成两步转换法的表格修复
+
+两步转换法 (DOCX -> HTML -> MD) 在两次 pandoc 之间删除 HTML 中的零宽度列定义
+(<col style="width: 0%">) 和随之变空的 <colgroup>，再由 pandoc 读回 HTML。
+读回的结果取决于 pandoc 的 HTML 读取器: pandoc 2.x 对列定义与列数不一致的表格
+使用默认列宽；pandoc 3.x 以 <colgroup> 为准，只保留与剩余列定义同样多的列，
+每行超出的单元格（通常是最后几列）被丢弃，合并单元格的跨度随之截断。
+
+本过滤器对含有零宽度列的表格做同样的往返: 只把这张表格写为 HTML，按
+preprocess_html.py 的规则删除零宽度列和空的 colgroup、标准化标签间空白，
+再用同一个 pandoc 的 HTML 读取器读回，因此输出与当前 pandoc 下的两步转换法一致
+（包括 pandoc 3.x 丢弃列的行为）。其余内容不经过 HTML，整篇文档只启动一次 pandoc。
+需要 pandoc 2.17 以上版本（pandoc.write）。用法:
+
+    pandoc input.docx -t gfm --lua-filter=table_filter.lua -o output.md
+]]
+
+-- HTML 写出的列宽为 truncate(100 * 宽度) 的百分比，小于 1% 的列即为 width: 0%
+local ZERO_WIDTH = 0.01
+
+local function has_zero_width_column(colspecs)
+  for _, colspec in ipairs(colspecs) do
+    local width = colspec[2]
+    if type(width) == 'number' and width < ZERO_WIDTH then
+      return true
+    end
+  end
+  return false
+end
+
+-- 与 preprocess_html.py 相同: 删除 width: 0% 或 display: none 的列定义
+local function is_empty_col(markup)
+  local style = markup:match('style="([^"]*)"') or markup:match("style='([^']*)'")
+  return style ~= nil and (style:find('width:%s*0%%') ~= nil or style:find('display:%s*none') ~= nil)
+end
+
+local function preprocess(html)
+  html = html:gsub('<col%f[%s/>][^>]*>', function(markup)
+    if is_empty_col(markup) then
+      return ''
+    end
+  end)
+  html = html:gsub('<colgroup>%s*</colgroup>', '')
+  return (html:gsub('>%s+<', '><'))
+end
+
+function Table(tbl)
+  if not has_zero_width_column(tbl.colspecs) then
+    return nil
+  end
+  if pandoc.write == nil then
+    error('table_filter.lua 需要 pandoc 2.17 以上版本')
+  end
+  local html = preprocess(pandoc.write(pandoc.Pandoc({tbl}), 'html'))
+  return pandoc.read(html, 'html').blocks
+end
@@ -0,0 +1,232 @@
+"""
+监视模式 - 持续把目录中新增或修改的文档转换为 Markdown
+定期轮询匹配的文件，只转换新增或内容变化的文件；文件的修改时间、大小和内容哈希
+记录在状态文件中，重启后不会重复转换。源文件被删除时删除或标记对应的输出。
+"""
+
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+# 添加 scripts 目录到路径
+scripts_dir = Path(__file__).parent
+if str(scripts_dir) not in sys.path:
+    sys.path.insert(0, str(scripts_dir))
+
+from conversion_cache import hash_file
+from file_discovery import iter_files, pattern_base
+from convert_to_markdown import _convert_one, _batch_output_path
+
+
+STATE_FORMAT_VERSION = 1
+
+# 默认状态文件名（位于输出目录中）
+DEFAULT_STATE_FILE = '.convert_state.json'
+
+
+def load_state(state_file):
+    """
+    读取状态文件
+
+    Returns:
+        dict: {'version', 'files': {源文件: {'mtime_ns', 'size', 'hash', 'output', 'error'}},
+            'orphaned': {输出文件: 已删除的源文件}}
+    """
+    empty = {'version': STATE_FORMAT_VERSION, 'files': {}, 'orphaned': {}}
+    try:
+        with open(state_file, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return empty
+    except (OSError, ValueError) as e:
+        print(f"[WARNING] 无法读取状态文件，将重新转换所有文件: {e}")
+        return empty
+
+    if state.get('version') != STATE_FORMAT_VERSION:
+        return empty
+    state.setdefault('orphaned', {})
+    return state
+
+
+def save_state(state_file, state):
+    """写入状态文件（先写临时文件再原子替换）"""
+    state_path = Path(state_file)
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = state_path.with_name(f"{state_path.name}.{os.getpid()}.tmp")
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, state_path)
+
+
+def _signature(path):
+    """文件的 (修改时间, 大小)，文件已不存在时返回 None"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class Watcher:
+    """
+    增量转换监视器
+
+    每次调用 poll() 完成一轮检查: 对比当前文件与状态文件中的记录，
+    转换内容已变化且写入完成（修改时间和大小在 settle 秒内保持不变）的文件，
+    处理已删除的源文件，然后保存状态。
+    """
+
+    def __init__(self, input_pattern, output_dir=None, state_file=None, use_two_step=False, options=None,
+                 settle=2.0, on_delete='flag', metrics=None, include=None, exclude=None):
+        """
+        Args:
+            input_pattern (str): 输入文件模式（支持通配符，** 匹配任意层目录）
+            output_dir (str, optional): 输出目录，默认与源文件相同
+            state_file (str, optional): 状态文件路径，默认为输出目录（或当前目录）下的 .convert_state.json
+            use_two_step (bool): 是否使用两步转换法
+            options (dict, optional): 传给转换函数的关键字参数（format_type、cache_dir 等）
+            settle (float): 文件在多少秒内未变化才视为写入完成
+            on_delete (str): 源文件被删除时的处理方式: 'remove' 删除输出，'flag' 保留输出并在状态中标记
+            metrics (callable, optional): 指标回调（见 conversion_metrics）
+            include (list, optional): 包含过滤（见 file_discovery.iter_files）
+            exclude (list, optional): 排除过滤（见 file_discovery.iter_files）
+        """
+        if on_delete not in ('remove', 'flag'):
+            raise ValueError(f"on_delete 只能是 'remove' 或 'flag': {on_delete}")
+
+        self.input_pattern = input_pattern
+        self.output_dir = output_dir
+        self.state_file = state_file or str(Path(output_dir or '.') / DEFAULT_STATE_FILE)
+        self.use_two_step = use_two_step
+        self.options = options or {}
+        self.settle = settle
+        self.on_delete = on_delete
+        self.metrics = metrics
+        self.include = include
+        self.exclude = exclude
+        self._base_dir = os.path.abspath(pattern_base(input_pattern))
+        self.state = load_state(self.state_file)
+        # 正在等待写入完成的文件 {源文件: (签名, 首次看到该签名的时间)}
+        self._pending = {}
+
+    def _is_settled(self, source, signature, now):
+        """签名在 settle 秒内保持不变时返回 True"""
+        seen = self._pending.get(source)
+        if seen is None or seen[0] != signature:
+            self._pending[source] = (signature, now)
+            return self.settle <= 0
+        return now - seen[1] >= self.settle
+
+    def poll(self):
+        """
+        执行一轮检查
+
+        Returns:
+            dict: {'converted', 'failed', 'unchanged', 'pending', 'deleted'} 各类文件数量
+        """
+        now = time.monotonic()
+        counts = {'converted': 0, 'failed': 0, 'unchanged': 0, 'pending': 0, 'deleted': 0}
+        files = self.state['files']
+        changed_state = False
+
+        current = set()
+        for file_name in iter_files(self.input_pattern, self.include, self.exclude):
+            source = str(Path(file_name).absolute())
+            signature = _signature(source)
+            if signature is None:
+                continue
+            current.add(source)
+
+            entry = files.get(source)
+            if entry is not None and (entry['mtime_ns'], entry['size']) == signature:
+                counts['unchanged'] += 1
+                self._pending.pop(source, None)
+                continue
+
+            # 新文件或已修改，等待写入完成
+            if not self._is_settled(source, signature, now):
+                counts['pending'] += 1
+                continue
+            self._pending.pop(source, None)
+
+            try:
+                content_hash = hash_file(source)
+            except OSError as e:
+                print(f"[WARNING] 无法读取 {source}: {e}")
+                continue
+
+            # 与 batch_convert() 相同的输出路径规则（绝对路径，便于记录在状态文件中）
+            output_path = Path(_batch_output_path(source, self.output_dir, self._base_dir)).absolute()
+            if entry is not None and entry.get('hash') == content_hash and not entry.get('error') \
+                    and output_path.exists():
+                # 只有修改时间变化（例如被 touch），内容未变
+                entry['mtime_ns'], entry['size'] = signature
+                changed_state = True
+                counts['unchanged'] += 1
+                continue
+
+            result = _convert_one(source, str(output_path), self.use_two_step, self.options,
+                                  collect_metrics=self.metrics is not None)
+            for record in result['metrics']:
+                self.metrics(record)
+            files[source] = {
+                'mtime_ns': signature[0],
+                'size': signature[1],
+                'hash': content_hash,
+                'output': str(output_path),
+                # 转换失败的文件在内容再次变化前不重试
+                'error': result['error'],
+            }
+            self.state['orphaned'].pop(str(output_path), None)
+            changed_state = True
+            counts['converted' if result['success'] else 'failed'] += 1
+
+        for source in [s for s in files if s not in current]:
+            entry = files.pop(source)
+            self._pending.pop(source, None)
+            changed_state = True
+            counts['deleted'] += 1
+
+            output_path = Path(entry['output'])
+            if not output_path.exists():
+                continue
+            if self.on_delete == 'remove':
+                try:
+                    output_path.unlink()
+                    print(f"[INFO] 源文件已删除，删除输出: {output_path}")
+                except OSError as e:
+                    print(f"[WARNING] 无法删除输出 {output_path}: {e}")
+            else:
+                self.state['orphaned'][str(output_path)] = source
+                print(f"[WARNING] 源文件已删除，保留输出并标记: {output_path}")
+
+        # 已经不存在的待处理文件不再跟踪
+        for source in [s for s in self._pending if s not in current]:
+            del self._pending[source]
+
+        if changed_state:
+            save_state(self.state_file, self.state)
+        return counts
+
+    def run(self, interval=2.0, once=False):
+        """
+        持续监视，直到被 Ctrl+C 中断
+
+        Args:
+            interval (float): 轮询间隔（秒）
+            once (bool): 只执行到当前没有待处理文件为止（适合定时任务）
+        """
+        print(f"[INFO] 开始监视: {self.input_pattern} (状态文件: {self.state_file})")
+        try:
+            while True:
+                counts = self.poll()
+                if counts['converted'] or counts['failed'] or counts['deleted']:
+                    print(f"[INFO] 本轮: 转换 {counts['converted']}，失败 {counts['failed']}，"
+                          f"删除 {counts['deleted']}，等待写入完成 {counts['pending']}")
+                if once and not counts['pending']:
+                    break
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            print("\n[INFO] 已停止监视")